@@ -0,0 +1,67 @@
+"""
+Citation rendering benchmark: single-pass ``render_citation_links`` vs the
+previous five-pass regex conversion in ``_convert_citations_to_links``.
+
+Synthetic answers mimic LLM output: prose with a ``[n]`` marker every ~150
+characters, some with hallucinated ``ref=``/``href=`` suffixes. Throughput is
+reported in MB/s of input text; outputs are checked to be identical.
+
+Usage:
+    python benchmarks/citation_render_benchmark.py
+    python benchmarks/citation_render_benchmark.py --lengths 4000 64000 --repeat 20
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.citation_stream_benchmark import legacy_convert  # noqa: E402
+from services.citation_links import render_citation_links  # noqa: E402
+
+
+def synthetic_answer(length: int, seed: int) -> str:
+    rng = random.Random(seed)
+    words = "the column oven detector flow valve pressure check replace inlet septum liner".split()
+    suffixes = ["", "", "", "", "ref=doc_1", "href=x.pdf"]
+    parts = []
+    size = 0
+    while size < length:
+        sentence = " ".join(rng.choice(words) for _ in range(rng.randint(15, 30)))
+        end = ".\n" if rng.random() < 0.2 else ". "
+        sentence += f" [{rng.randint(1, 8)}]{rng.choice(suffixes)}{end}"
+        parts.append(sentence)
+        size += len(sentence)
+    return "".join(parts)[:length]
+
+
+def throughput(fn, text, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - start)
+    return len(text.encode("utf-8")) / best / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lengths", type=int, nargs="+", default=[1000, 4000, 16000, 64000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'chars':>8} {'legacy MB/s':>12} {'single-pass MB/s':>17} {'speedup':>8} {'identical':>10}")
+    for length in args.lengths:
+        text = synthetic_answer(length, args.seed)
+        identical = legacy_convert(text) == render_citation_links(text)
+        legacy = throughput(legacy_convert, text, args.repeat)
+        single = throughput(render_citation_links, text, args.repeat)
+        print(f"{length:>8} {legacy:>12.1f} {single:>17.1f} {single / legacy:>7.1f}x {str(identical):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Streaming citation linking benchmark: incremental linker vs re-converting the
+accumulated answer on every delta (the previous ``stream_rag_response`` loop).
+
+Synthetic answers mimic LLM output: prose with a ``[n]`` marker every ~150
+characters, streamed in token-sized deltas (2-6 characters).
+
+Usage:
+    python benchmarks/citation_stream_benchmark.py
+    python benchmarks/citation_stream_benchmark.py --lengths 2000 8000 32000 --repeat 3
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.citation_links import StreamingCitationLinker, citation_anchor  # noqa: E402
+
+
+def legacy_convert(answer: str) -> str:
+    """The three-pass regex conversion previously run on the whole answer for every delta."""
+
+    def repl(match):
+        return citation_anchor(match.group(1))
+
+    result = re.sub(r"\[(\d+)\]ref=[^\]\s]+", r"[\1]", answer)
+    result = re.sub(r"\[(\d+)\]href=[^\]\s]+", r"[\1]", result)
+    result = re.sub(r"^\[(\d+)\]$", repl, result, flags=re.MULTILINE)
+    result = re.sub(r"(?<=[\s\)\]\>\.,;:\"'\-_/])\[(\d+)\]", repl, result)
+    return re.sub(r"(?<!>)\[(\d+)\]", repl, result)
+
+
+def legacy_stream(deltas):
+    full_answer = ""
+    last_yielded = 0
+    out = []
+    for delta in deltas:
+        full_answer += delta
+        linked = legacy_convert(full_answer)
+        new_content = linked[last_yielded:]
+        if new_content:
+            out.append(new_content)
+            last_yielded = len(linked)
+    return out
+
+
+def incremental_stream(deltas):
+    linker = StreamingCitationLinker()
+    out = [linker.feed(delta) for delta in deltas]
+    out.append(linker.flush())
+    return out
+
+
+def synthetic_deltas(length: int, seed: int):
+    rng = random.Random(seed)
+    words = "the column oven detector flow valve pressure check replace inlet septum liner".split()
+    parts = []
+    size = 0
+    while size < length:
+        sentence = " ".join(rng.choice(words) for _ in range(rng.randint(15, 30)))
+        sentence += f" [{rng.randint(1, 8)}]. "
+        parts.append(sentence)
+        size += len(sentence)
+    text = "".join(parts)[:length]
+    deltas = []
+    i = 0
+    while i < len(text):
+        step = rng.randint(2, 6)
+        deltas.append(text[i : i + step])
+        i += step
+    return deltas
+
+
+def timed(fn, deltas, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(deltas)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lengths", type=int, nargs="+", default=[1000, 4000, 16000, 32000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'chars':>8} {'deltas':>7} {'legacy ms':>10} {'incremental ms':>15} {'speedup':>8}")
+    for length in args.lengths:
+        deltas = synthetic_deltas(length, args.seed)
+        legacy = timed(legacy_stream, deltas, args.repeat)
+        incremental = timed(incremental_stream, deltas, args.repeat)
+        print(
+            f"{length:>8} {len(deltas):>7} {1000 * legacy:>10.1f} {1000 * incremental:>15.2f} "
+            f"{legacy / incremental:>7.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
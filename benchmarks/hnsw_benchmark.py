@@ -0,0 +1,88 @@
+"""
+Recall/latency benchmark: HNSW vs exact (brute-force) vector search.
+
+Runs against a local vector store exported with
+``services.vector_store.export_search_index`` or, when no path is given,
+against synthetic clustered vectors shaped like the KB embeddings (1536 dims).
+
+Usage:
+    python benchmarks/hnsw_benchmark.py --store data/vector_store
+    python benchmarks/hnsw_benchmark.py --n 5000 --dim 1536 --ef 16 32 64 128 256
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.hnsw_index import HNSWIndex  # noqa: E402
+from services.vector_store import NumpyVectorStore  # noqa: E402
+
+
+def synthetic_vectors(n: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    """Clustered gaussian vectors; real embeddings are far from uniform on the sphere."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, n)
+    return centers[labels] + 0.35 * rng.standard_normal((n, dim)).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", help="NumpyVectorStore directory with exported chunk vectors")
+    parser.add_argument("--n", type=int, default=5000, help="Synthetic vector count")
+    parser.add_argument("--dim", type=int, default=1536, help="Synthetic vector dimensionality")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--M", type=int, default=16)
+    parser.add_argument("--ef-construction", type=int, default=200)
+    parser.add_argument("--ef", type=int, nargs="+", default=[16, 32, 64, 128, 256])
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    if args.store:
+        vectors = np.asarray(NumpyVectorStore.load(args.store, mmap=False).vectors)
+    else:
+        vectors = synthetic_vectors(args.n, args.dim, clusters=max(8, args.n // 100), seed=args.seed)
+
+    rng = np.random.default_rng(args.seed + 1)
+    picks = rng.integers(0, len(vectors), args.queries)
+    queries = vectors[picks] + 0.1 * rng.standard_normal((args.queries, vectors.shape[1])).astype(np.float32)
+
+    exact = NumpyVectorStore(vectors, [{} for _ in range(len(vectors))])
+    print(f"vectors={len(vectors)} dim={vectors.shape[1]} queries={args.queries} k={args.k}")
+
+    start = time.perf_counter()
+    truth = []
+    for q in queries:
+        qn = q / np.linalg.norm(q)
+        scores = exact.vectors @ qn
+        top = np.argpartition(-scores, args.k - 1)[: args.k]
+        truth.append(set(top.tolist()))
+    exact_ms = (time.perf_counter() - start) * 1000 / args.queries
+    print(f"{'exact':>10}  recall@{args.k}=1.000  {exact_ms:8.3f} ms/query")
+
+    start = time.perf_counter()
+    index = HNSWIndex(vectors.shape[1], M=args.M, ef_construction=args.ef_construction)
+    index.add(vectors)
+    print(f"HNSW build: {time.perf_counter() - start:.1f}s (M={args.M}, ef_construction={args.ef_construction})")
+
+    for ef in args.ef:
+        hits = 0
+        latencies = []
+        for q, expected in zip(queries, truth):
+            start = time.perf_counter()
+            found = index.search(q, k=args.k, ef_search=ef)
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits += len(expected & {node for node, _ in found})
+        recall = hits / (args.k * args.queries)
+        p50, p95 = np.percentile(latencies, [50, 95])
+        print(f"{'ef=' + str(ef):>10}  recall@{args.k}={recall:.3f}  {np.mean(latencies):8.3f} ms/query  (p50 {p50:.3f}, p95 {p95:.3f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Redis codec benchmark: encode/decode time and stored bytes per codec setting.
+
+Payloads are citation values as stored in Redis (``citation_chunk:*`` chunks,
+session citation entries from the ``session:{<id>}:citations:sources`` hashes,
+cached search results). With ``--redis`` they are sampled from a live Redis;
+otherwise synthetic KB-like chunks are used.
+
+Usage:
+    python benchmarks/redis_codec_benchmark.py
+    python benchmarks/redis_codec_benchmark.py --redis --sample 500
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import redis_codec  # noqa: E402
+from services.redis_codec import RedisCodec  # noqa: E402
+
+# String keys sampled with MGET
+SAMPLE_PATTERNS = ["citation_chunk:*", "search_cache:*"]
+# Hash keys whose field values are sampled with HGETALL
+SAMPLE_HASH_PATTERNS = ["session:*:citations:sources"]
+
+
+def synthetic_payloads(count: int, seed: int):
+    rng = random.Random(seed)
+    words = (
+        "OpenLab CDS instrument column oven detector flow valve pressure check replace inlet septum "
+        "liner method sequence injection calibration signal baseline noise firmware driver license "
+        "server client workstation acquisition report template audit trail"
+    ).split()
+    payloads = []
+    for i in range(count):
+        lines = []
+        for step in range(rng.randint(3, 12)):
+            sentence = " ".join(rng.choice(words) for _ in range(rng.randint(8, 25)))
+            lines.append(f"{step + 1}. {sentence}.")
+        content = "## " + " ".join(rng.choice(words) for _ in range(5)) + "\n\n" + "\n".join(lines)
+        payloads.append({
+            "title": f"KB{rng.randint(1000, 99999)} {rng.choice(words)} guide.pdf",
+            "content": content,
+            "url": f"https://kb.example.com/articles/{i}",
+        })
+        payloads.append({"citation_id": i + 1, "title": payloads[-1]["title"], "id": f"source_{i + 1}", "hash": "%012x" % rng.getrandbits(48)})
+    payloads.append([{"chunk": p["content"], "title": p["title"], "parent_id": "p", "relevance": 0.03} for p in payloads[:16:2]])
+    return payloads
+
+
+def redis_payloads(sample: int):
+    from services.redis_service import redis_service
+
+    if not redis_service.is_connected():
+        raise SystemExit("Redis is not reachable")
+    payloads = []
+    for pattern in SAMPLE_PATTERNS:
+        keys = redis_service.keys(pattern)[:sample]
+        payloads.extend(value for value in redis_service.mget(keys) if value is not None)
+    for pattern in SAMPLE_HASH_PATTERNS:
+        values = []
+        for key in redis_service.keys(pattern):
+            values.extend(value for value in (redis_service.hgetall(key) or {}).values() if value is not None)
+            if len(values) >= sample:
+                break
+        payloads.extend(values[:sample])
+    if not payloads:
+        raise SystemExit("No citation payloads found in Redis")
+    return payloads
+
+
+def measure(codec, payloads, repeat):
+    encoded = [codec.encode(p) for p in payloads]
+    stored = sum(len(e) for e in encoded)
+    encode_best = decode_best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for p in payloads:
+            codec.encode(p)
+        encode_best = min(encode_best, time.perf_counter() - start)
+        start = time.perf_counter()
+        for e in encoded:
+            codec.decode(e)
+        decode_best = min(decode_best, time.perf_counter() - start)
+    return stored, encode_best, decode_best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--redis", action="store_true", help="sample payloads from the configured Redis")
+    parser.add_argument("--sample", type=int, default=200, help="keys (hash fields for hashes) sampled per pattern with --redis")
+    parser.add_argument("--count", type=int, default=500, help="synthetic chunks")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    payloads = redis_payloads(args.sample) if args.redis else synthetic_payloads(args.count, args.seed)
+    settings = [("legacy", "none"), ("json", "none"), ("json", "zlib"), ("json", "zstd")]
+    if redis_codec.msgpack is not None:
+        settings += [("msgpack", "none"), ("msgpack", "zstd")]
+
+    print(f"{len(payloads)} payloads (orjson={'yes' if redis_codec.orjson else 'no'}, "
+          f"msgpack={'yes' if redis_codec.msgpack else 'no'}, zstd={'yes' if redis_codec.zstandard else 'no'})")
+    print(f"{'codec':>16} {'bytes':>10} {'vs legacy':>10} {'encode ms':>10} {'decode ms':>10}")
+    baseline = None
+    for serializer, compression in settings:
+        codec = RedisCodec(serializer=serializer, compression=compression)
+        stored, encode, decode = measure(codec, payloads, args.repeat)
+        baseline = baseline or stored
+        if compression == "zstd" and redis_codec.zstandard is None:
+            compression = "zstd->zlib"
+        label = f"{serializer}+{compression}"
+        print(f"{label:>16} {stored:>10} {stored / baseline:>9.0%} {1000 * encode:>10.2f} {1000 * decode:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
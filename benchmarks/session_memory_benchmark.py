@@ -0,0 +1,180 @@
+"""
+Session memory benchmark: legacy vs day-partitioned ``session_memory`` schema.
+
+Loads the same synthetic history (millions of turns spread over many
+sessions and days) into both schemas of ``PostgresSessionMemory``, then
+measures on the loaded tables:
+
+- ``store_turn`` latency (ctid-subquery trim vs per-session counter trim)
+- ``get_turns`` latency
+- TTL cleanup: ``DELETE ... WHERE created_at < cutoff`` vs dropping partitions
+
+Everything runs in a scratch schema of the configured PostgreSQL database
+(``POSTGRES_*`` settings), which is dropped at the end unless ``--keep``.
+
+Usage:
+    python benchmarks/session_memory_benchmark.py
+    python benchmarks/session_memory_benchmark.py --rows 5000000 --sessions 500000 --days 60 --ttl-days 30
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_manager  # noqa: E402
+from config import (  # noqa: E402
+    POSTGRES_DB,
+    POSTGRES_HOST,
+    POSTGRES_PASSWORD,
+    POSTGRES_PORT,
+    POSTGRES_SSL_MODE,
+    POSTGRES_USER,
+)
+from services.session_memory import COUNTERS_TABLE, PARTITIONED_TABLE, PostgresSessionMemory  # noqa: E402
+
+
+def connect(schema: str):
+    return psycopg2.connect(
+        host=POSTGRES_HOST,
+        port=POSTGRES_PORT,
+        dbname=POSTGRES_DB,
+        user=POSTGRES_USER,
+        password=POSTGRES_PASSWORD,
+        sslmode=POSTGRES_SSL_MODE,
+        options=f"-c search_path={schema}",
+    )
+
+
+def timed(label: str, conn, sql: str, params=()):
+    start = time.perf_counter()
+    with conn.cursor() as cur:
+        cur.execute(sql, params)
+        rowcount = cur.rowcount
+    conn.commit()
+    elapsed = time.perf_counter() - start
+    print(f"  {label}: {elapsed:.2f}s ({rowcount} rows)")
+    return elapsed
+
+
+def load_legacy(conn, rows: int, sessions: int, days: int):
+    timed(
+        "load legacy",
+        conn,
+        "INSERT INTO session_memory (turn_id, session_id, user_msg, bot_msg, summary, created_at) "
+        "SELECT 'seed-' || g, 's' || (g %% %s), repeat('question ', 20), repeat('answer ', 120), NULL, "
+        "(now() AT TIME ZONE 'utc') - (g %% %s) * interval '1 day' - random() * interval '1 day' "
+        "FROM generate_series(1, %s) g",
+        (sessions, days, rows),
+    )
+    timed("analyze legacy", conn, "ANALYZE session_memory")
+
+
+def load_partitioned(conn, memory: PostgresSessionMemory, rows: int, sessions: int, days: int):
+    today = datetime.now(timezone.utc).date()
+    memory._ensure_partitions(today - timedelta(days=offset) for offset in range(days + 2))
+    timed(
+        "load partitioned",
+        conn,
+        f"INSERT INTO {PARTITIONED_TABLE} (turn_id, session_id, turn_no, user_msg, bot_msg, summary, created_at) "
+        "SELECT 'seed-' || g, 's' || (g %% %s), g / %s + 1, repeat('question ', 20), repeat('answer ', 120), NULL, "
+        "now() - (g %% %s) * interval '1 day' - random() * interval '1 day' "
+        "FROM generate_series(1, %s) g",
+        (sessions, sessions, days, rows),
+    )
+    timed(
+        "load counters",
+        conn,
+        f"INSERT INTO {COUNTERS_TABLE} (session_id, turns, last_turn_at) "
+        f"SELECT session_id, MAX(turn_no), MAX(created_at) FROM {PARTITIONED_TABLE} GROUP BY session_id",
+    )
+    timed("analyze partitioned", conn, f"ANALYZE {PARTITIONED_TABLE}")
+
+
+def latencies(fn, session_ids):
+    samples = []
+    for session_id in session_ids:
+        start = time.perf_counter()
+        fn(session_id)
+        samples.append(1000 * (time.perf_counter() - start))
+    samples.sort()
+    return statistics.median(samples), samples[int(0.95 * (len(samples) - 1))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000, help="turns loaded into each schema")
+    parser.add_argument("--sessions", type=int, default=200_000)
+    parser.add_argument("--days", type=int, default=45, help="days of history the turns are spread over")
+    parser.add_argument("--ttl-days", type=int, default=30)
+    parser.add_argument("--max-turns", type=int, default=10)
+    parser.add_argument("--ops", type=int, default=500, help="store_turn/get_turns calls measured")
+    parser.add_argument("--schema", default="session_memory_bench", help="scratch schema (dropped afterwards)")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch schema")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    admin = connect("public")
+    with admin.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {args.schema} CASCADE")
+        cur.execute(f"CREATE SCHEMA {args.schema}")
+    admin.commit()
+
+    # Route DatabaseManager (and so PostgresSessionMemory) to the scratch schema
+    db_manager.connection_pool = db_manager.PostgresConnectionPool(lambda: connect(args.schema), maxconn=4)
+    conn = connect(args.schema)
+    rng = random.Random(args.seed)
+    session_ids = [f"s{rng.randrange(args.sessions)}" for _ in range(args.ops)]
+    results = {}
+    try:
+        for schema in ("legacy", "partitioned"):
+            print(f"{schema}:")
+            memory = PostgresSessionMemory(max_turns=args.max_turns, schema=schema, ttl_days=args.ttl_days)
+            if schema == "legacy":
+                load_legacy(conn, args.rows, args.sessions, args.days)
+            else:
+                load_partitioned(conn, memory, args.rows, args.sessions, args.days)
+            store = latencies(lambda sid: memory.store_turn(sid, "benchmark question", "benchmark answer"), session_ids)
+            read = latencies(lambda sid: memory.get_turns(sid, args.max_turns), session_ids)
+            print(f"  store_turn p50/p95: {store[0]:.2f}/{store[1]:.2f} ms")
+            print(f"  get_turns  p50/p95: {read[0]:.2f}/{read[1]:.2f} ms")
+
+            if schema == "legacy":
+                cleanup = timed(
+                    "ttl cleanup (DELETE)",
+                    conn,
+                    "DELETE FROM session_memory WHERE created_at < (now() AT TIME ZONE 'utc') - %s * interval '1 day'",
+                    (args.ttl_days,),
+                )
+            else:
+                start = time.perf_counter()
+                dropped = memory.maintain()
+                cleanup = time.perf_counter() - start
+                print(f"  ttl cleanup (DROP partitions): {cleanup:.2f}s ({dropped})")
+            results[schema] = (store, read, cleanup)
+    finally:
+        conn.close()
+        db_manager.connection_pool.closeall()
+        if not args.keep:
+            with admin.cursor() as cur:
+                cur.execute(f"DROP SCHEMA IF EXISTS {args.schema} CASCADE")
+            admin.commit()
+        admin.close()
+
+    if len(results) == 2:
+        (ls, lr, lc), (ps, pr, pc) = results["legacy"], results["partitioned"]
+        print(f"\n{'':>12} {'legacy':>10} {'partitioned':>12}")
+        print(f"{'store p95':>12} {ls[1]:>8.2f}ms {ps[1]:>10.2f}ms")
+        print(f"{'read p95':>12} {lr[1]:>8.2f}ms {pr[1]:>10.2f}ms")
+        print(f"{'ttl cleanup':>12} {lc:>9.2f}s {pc:>11.2f}s")
+
+
+if __name__ == "__main__":
+    main()
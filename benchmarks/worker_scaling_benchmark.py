@@ -0,0 +1,110 @@
+"""
+Worker scaling benchmark: throughput of the app under 1..N gunicorn workers.
+
+For each worker count, starts ``gunicorn main:app`` (``gunicorn.conf.py``,
+``WEB_CONCURRENCY`` set to the count), runs ``k6-tests/session_scaling.js``
+against it and records session turns per second and the pass rate of the
+k6 checks. The checks fail if a session's requests see different state on
+different workers. Scaling efficiency is ``turns/s(N) / (N * turns/s(1))``.
+
+Requires ``k6`` on PATH and the app's Redis, PostgreSQL and Azure settings.
+Virtual users scale with the worker count so every run is saturated.
+
+Usage:
+    python benchmarks/worker_scaling_benchmark.py
+    python benchmarks/worker_scaling_benchmark.py --workers 1 2 4 8 --vus-per-worker 16 --duration 2m
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+K6_SCRIPT = os.path.join(ROOT, "k6-tests", "session_scaling.js")
+
+
+def wait_for_port(port: int, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError(f"gunicorn did not listen on port {port} within {timeout}s")
+
+
+def run_k6(port: int, vus: int, duration: str) -> dict:
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as summary:
+        summary_path = summary.name
+    try:
+        subprocess.run(
+            [
+                "k6", "run", "--quiet",
+                "--env", "TARGET_HOST=127.0.0.1",
+                "--env", f"TARGET_PORT={port}",
+                "--env", f"VUS={vus}",
+                "--env", f"DURATION={duration}",
+                "--summary-export", summary_path,
+                K6_SCRIPT,
+            ],
+            check=False,
+        )
+        with open(summary_path) as f:
+            metrics = json.load(f)["metrics"]
+    finally:
+        os.unlink(summary_path)
+    checks = metrics.get("checks", {})
+    passes, fails = checks.get("passes", 0), checks.get("fails", 0)
+    return {
+        "turns_per_s": metrics.get("session_turns", {}).get("rate", 0.0),
+        "p95_ms": metrics.get("http_req_duration", {}).get("p(95)", 0.0),
+        "check_pass_rate": passes / (passes + fails) if passes + fails else 0.0,
+    }
+
+
+def run_workers(workers: int, port: int, vus: int, duration: str) -> dict:
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), PORT=str(port))
+    server = subprocess.Popen(
+        ["gunicorn", "main:app"], cwd=ROOT, env=env, start_new_session=True
+    )
+    try:
+        wait_for_port(port, timeout=120)
+        return run_k6(port, vus, duration)
+    finally:
+        os.killpg(server.pid, signal.SIGTERM)
+        server.wait(timeout=60)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--vus-per-worker", type=int, default=16)
+    parser.add_argument("--duration", default="1m")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    results = []
+    for workers in args.workers:
+        print(f"Running {workers} worker(s)...", flush=True)
+        results.append((workers, run_workers(workers, args.port, workers * args.vus_per_worker, args.duration)))
+
+    base = results[0][1]["turns_per_s"] / results[0][0] if results and results[0][0] else 0.0
+    print(f"\n{'workers':>7} {'turns/s':>9} {'p95 ms':>9} {'checks':>8} {'efficiency':>11}")
+    for workers, result in results:
+        efficiency = result["turns_per_s"] / (workers * base) if base else 0.0
+        print(
+            f"{workers:>7} {result['turns_per_s']:>9.2f} {result['p95_ms']:>9.0f} "
+            f"{result['check_pass_rate']:>7.1%} {efficiency:>10.1%}"
+        )
+    return 0 if all(result["check_pass_rate"] == 1.0 for _, result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
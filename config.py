@@ -12,6 +12,15 @@ AZURE_OPENAI_API_VERSION_O4_MINI = os.getenv("AZURE_OPENAI_API_VERSION_O4_MINI")
 EMBEDDING_DEPLOYMENT = os.getenv("EMBEDDING_DEPLOYMENT")
 CHAT_DEPLOYMENT_GPT4o = os.getenv("CHAT_DEPLOYMENT_GPT4o")
 CHAT_DEPLOYMENT_O4_MINI = os.getenv("CHAT_DEPLOYMENT_O4_MINI")
+# Chat deployments a session may select with the "model" setting (comma-separated;
+# CHAT_DEPLOYMENT_GPT4o is always allowed)
+CHAT_DEPLOYMENTS = [
+    name
+    for name in dict.fromkeys(
+        [CHAT_DEPLOYMENT_GPT4o] + [d.strip() for d in os.getenv("CHAT_DEPLOYMENTS", "").split(",")]
+    )
+    if name
+]
 
 # Azure Cognitive Search Configuration
 AZURE_SEARCH_SERVICE = os.getenv("AZURE_SEARCH_SERVICE")
@@ -19,6 +28,27 @@ AZURE_SEARCH_INDEX = os.getenv("AZURE_SEARCH_INDEX")
 AZURE_SEARCH_KEY = os.getenv("AZURE_SEARCH_KEY")
 VECTOR_FIELD = os.getenv("VECTOR_FIELD")
 
+# Retrieval backend: "azure" (Azure AI Search), "numpy" (exact, in-process) or
+# "hnsw" (approximate, in-process); local backends load from LOCAL_VECTOR_STORE_PATH
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "azure")
+LOCAL_VECTOR_STORE_PATH = os.getenv("LOCAL_VECTOR_STORE_PATH", "data/vector_store")
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+# Fuse a local BM25 leg (with synonym expansion) into local vector backends
+HYBRID_LEXICAL_SEARCH = os.getenv("HYBRID_LEXICAL_SEARCH", "false").lower() == "true"
+SYNONYM_MAP_PATH = os.getenv("SYNONYM_MAP_PATH", "data/synonyms-community.txt")
+
+# Multi-query retrieval: search the raw query, an LLM rewrite and optional sub-queries in parallel
+MULTI_QUERY_RETRIEVAL = os.getenv("MULTI_QUERY_RETRIEVAL", "false").lower() == "true"
+MULTI_QUERY_SUB_QUERIES = int(os.getenv("MULTI_QUERY_SUB_QUERIES", "0"))
+
+# Maximal-marginal-relevance re-ranking of RERANK_CANDIDATES results using their vectors
+# (off by default: it over-fetches candidates with their vectors on every search)
+MMR_RERANK = os.getenv("MMR_RERANK", "false").lower() == "true"
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+
 # Logging Configuration
 LOG_FORMAT = os.getenv("LOG_FORMAT", "%(asctime)s - %(levelname)s - %(message)s")
 LOG_FILE = os.getenv("LOG_FILE", "app.log")
@@ -34,6 +64,11 @@ POSTGRES_DB = os.getenv("POSTGRES_DB")
 POSTGRES_USER = os.getenv("POSTGRES_USER")
 POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
 POSTGRES_SSL_MODE = os.getenv("POSTGRES_SSL_MODE", "require")
+# Connection pool used by DatabaseManager
+POSTGRES_POOL_MAX = int(os.getenv("POSTGRES_POOL_MAX", "10"))
+POSTGRES_POOL_TIMEOUT = float(os.getenv("POSTGRES_POOL_TIMEOUT", "10"))  # seconds to wait for a free connection
+POSTGRES_POOL_IDLE_CHECK = float(os.getenv("POSTGRES_POOL_IDLE_CHECK", "30"))  # idle seconds before a SELECT 1 on borrow
+POSTGRES_POOL_MAX_LIFETIME = float(os.getenv("POSTGRES_POOL_MAX_LIFETIME", "1800"))
 
 def get_cost_rates(model: str) -> dict:
     """
@@ -2,46 +2,368 @@ from dotenv import load_dotenv
 from pathlib import Path
 load_dotenv(dotenv_path=Path(__file__).resolve().parent / ".env")
 import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
 from psycopg2.extras import RealDictCursor, Json
+import os
+import time
 import logging
 import json
+import threading
+import weakref
+from collections import deque
+from contextlib import contextmanager
 from datetime import datetime, timezone
+from typing import Any, Callable, Deque, Dict, Iterator, List, Tuple
 from config import (
     POSTGRES_HOST,
     POSTGRES_PORT,
     POSTGRES_DB,
     POSTGRES_USER,
     POSTGRES_PASSWORD,
-    POSTGRES_SSL_MODE
+    POSTGRES_SSL_MODE,
+    POSTGRES_POOL_MAX,
+    POSTGRES_POOL_TIMEOUT,
+    POSTGRES_POOL_IDLE_CHECK,
+    POSTGRES_POOL_MAX_LIFETIME
 )
 
 logger = logging.getLogger(__name__)
 
+
+class PooledConnection:
+    """
+    A borrowed connection. Behaves like the psycopg2 connection it wraps,
+    except that ``close()`` returns it to the pool. If it is garbage collected
+    without being closed, the pool closes the connection and frees its slot.
+    """
+
+    def __init__(self, pool: "PostgresConnectionPool", conn, created_at: float):
+        self._pool = pool
+        self._conn = conn
+        self._created_at = created_at
+        self._released = False
+        self._finalizer = weakref.finalize(self, pool._reclaim, conn, os.getpid())
+        self._finalizer.atexit = False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, *exc_info):
+        return self._conn.__exit__(*exc_info)
+
+    def close(self) -> None:
+        """Return the connection to the pool (idempotent)."""
+        if not self._released:
+            self._released = True
+            self._finalizer.detach()
+            self._pool.release(self._conn, self._created_at)
+
+    def discard(self) -> None:
+        """Close the underlying connection instead of returning it to the pool."""
+        if not self._released:
+            self._released = True
+            self._finalizer.detach()
+            self._pool.release(self._conn, self._created_at, discard=True)
+
+
+class PostgresConnectionPool:
+    """
+    Thread-safe, blocking pool of psycopg2 connections.
+
+    - Borrowers wait up to ``timeout`` seconds for a free connection when
+      ``maxconn`` are in use, then get a ``psycopg2.pool.PoolError``
+    - A connection idle for more than ``idle_check`` seconds is verified with
+      ``SELECT 1`` before it is handed out; broken or expired (older than
+      ``max_lifetime``) connections are replaced transparently
+    - Connections come back rolled back, so none is left idle in transaction
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        maxconn: int = POSTGRES_POOL_MAX,
+        timeout: float = POSTGRES_POOL_TIMEOUT,
+        idle_check: float = POSTGRES_POOL_IDLE_CHECK,
+        max_lifetime: float = POSTGRES_POOL_MAX_LIFETIME,
+    ):
+        """
+        Args:
+            connect: Function opening a new psycopg2 connection
+            maxconn: Maximum open connections
+            timeout: Seconds to wait for a free connection
+            idle_check: Idle seconds after which a connection is checked before reuse
+            max_lifetime: Seconds after which a connection is closed instead of reused
+        """
+        self._connect = connect
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.idle_check = idle_check
+        self.max_lifetime = max_lifetime
+        self._cond = threading.Condition()
+        # (connection, created_at, returned_at), most recently used last
+        self._idle: Deque[Tuple[Any, float, float]] = deque()
+        self._size = 0
+        self._pid = os.getpid()
+        # Connections inherited across fork(); referenced so they are never
+        # finalized (and terminated) from the child
+        self._inherited: List[Any] = []
+        # (connection, pid) of borrowed connections garbage collected without
+        # close(); queued by the finalizer, which may run at any point (even
+        # inside this pool's lock), and closed on the next acquire or stats call
+        self._leaked: Deque[Tuple[Any, int]] = deque()
+        self._metrics = {
+            "created": 0,
+            "closed": 0,
+            "borrowed": 0,
+            "reused": 0,
+            "waits": 0,
+            "wait_seconds": 0.0,
+            "timeouts": 0,
+            "health_check_failures": 0,
+            "connect_errors": 0,
+            "leaked": 0,
+            "peak_in_use": 0,
+        }
+
+    def _check_pid(self) -> None:
+        if self._pid != os.getpid():
+            self._inherited.extend(conn for conn, _, _ in self._idle)
+            self._idle.clear()
+            self._size = 0
+            self._pid = os.getpid()
+
+    def _reclaim(self, conn, pid: int) -> None:
+        """Finalizer of a ``PooledConnection`` that was never closed."""
+        self._leaked.append((conn, pid))
+
+    def _close_leaked(self) -> None:
+        """Close connections dropped without ``close()`` and free their slots (caller holds the lock)."""
+        while self._leaked:
+            conn, pid = self._leaked.popleft()
+            if pid != self._pid:
+                # Borrowed before fork(): the parent still owns the session
+                self._inherited.append(conn)
+                continue
+            logger.warning("A PostgreSQL connection was garbage collected without close(); discarding it")
+            self._size -= 1
+            self._metrics["leaked"] += 1
+            self._metrics["closed"] += 1
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def acquire(self) -> PooledConnection:
+        """
+        Borrow a healthy connection.
+
+        Returns:
+            PooledConnection; call ``close()`` (or use ``DatabaseManager.connection()``) to return it
+
+        Raises:
+            psycopg2.pool.PoolError: If no connection frees up within the timeout
+            psycopg2.Error: If a new connection cannot be opened
+        """
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        with self._cond:
+            self._check_pid()
+            start = time.monotonic()
+            while True:
+                self._close_leaked()
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._size < self.maxconn:
+                    entry = None
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._metrics["timeouts"] += 1
+                    raise PoolError(f"No PostgreSQL connection available within {self.timeout}s")
+                waited = True
+                self._cond.wait(remaining)
+            if waited:
+                self._metrics["waits"] += 1
+                self._metrics["wait_seconds"] += time.monotonic() - start
+            self._metrics["borrowed"] += 1
+            self._metrics["peak_in_use"] = max(self._metrics["peak_in_use"], self._size - len(self._idle))
+
+        if entry is not None:
+            conn, created_at, returned_at = entry
+            if self._is_healthy(conn, created_at, returned_at):
+                with self._cond:
+                    self._metrics["reused"] += 1
+                return PooledConnection(self, conn, created_at)
+            self._close(conn)
+
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._metrics["connect_errors"] += 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._metrics["created"] += 1
+        return PooledConnection(self, conn, time.monotonic())
+
+    def _is_healthy(self, conn, created_at: float, returned_at: float) -> bool:
+        now = time.monotonic()
+        if conn.closed or now - created_at > self.max_lifetime:
+            return False
+        if now - returned_at <= self.idle_check:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception as e:
+            logger.warning(f"Discarding broken PostgreSQL connection: {e}")
+            with self._cond:
+                self._metrics["health_check_failures"] += 1
+            return False
+
+    def _close(self, conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._metrics["closed"] += 1
+
+    def release(self, conn, created_at: float, discard: bool = False) -> None:
+        """
+        Return a borrowed connection, rolling back any open transaction.
+
+        Args:
+            conn: The raw psycopg2 connection
+            created_at: When it was opened (monotonic clock)
+            discard: Close it instead of keeping it
+        """
+        if self._pid != os.getpid():
+            return
+        if not discard and not conn.closed:
+            try:
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                discard = True
+        if discard or conn.closed:
+            self._close(conn)
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            return
+        with self._cond:
+            self._idle.append((conn, created_at, time.monotonic()))
+            self._cond.notify()
+
+    def closeall(self) -> None:
+        """Close all idle connections."""
+        with self._cond:
+            while self._idle:
+                conn, _, _ = self._idle.popleft()
+                self._size -= 1
+                self._metrics["closed"] += 1
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get pool metrics.
+
+        Returns:
+            Dictionary with pool size, open/idle/in-use connections and borrow, wait,
+            health-check and leaked-connection counters
+        """
+        with self._cond:
+            self._close_leaked()
+            stats = dict(self._metrics)
+            stats.update({
+                "max_connections": self.maxconn,
+                "open": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+            })
+        stats["mean_wait_ms"] = 1000.0 * stats["wait_seconds"] / stats["waits"] if stats["waits"] else 0.0
+        return stats
+
+
+def _connect():
+    logger.debug(f"Connecting to PostgreSQL: {POSTGRES_USER}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}")
+    return psycopg2.connect(
+        host=POSTGRES_HOST,
+        port=POSTGRES_PORT,
+        dbname=POSTGRES_DB,
+        user=POSTGRES_USER,
+        password=POSTGRES_PASSWORD,
+        sslmode=POSTGRES_SSL_MODE
+    )
+
+
+# Create a singleton instance
+connection_pool = PostgresConnectionPool(_connect)
+
+
 class DatabaseManager:
     """Handles database connections and operations for the feedback system."""
+
+    # Set once log_rag_query has seen (or created) the rag_queries table
+    _rag_queries_table_ready = False
     
     @staticmethod
     def get_connection():
-        """Create and return a database connection."""
+        """
+        Borrow a database connection from the shared pool.
+
+        Prefer ``DatabaseManager.connection()``; a connection obtained here
+        must be returned with ``close()``.
+        """
         try:
-            logger.debug(f"Connecting to PostgreSQL: {POSTGRES_USER}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}")
-            conn = psycopg2.connect(
-                host=POSTGRES_HOST,
-                port=POSTGRES_PORT,
-                dbname=POSTGRES_DB,
-                user=POSTGRES_USER,
-                password=POSTGRES_PASSWORD,
-                sslmode=POSTGRES_SSL_MODE
-            )
-            return conn
+            return connection_pool.acquire()
         except Exception as e:
             logger.error(f"Database connection error: {e}")
             raise
+
+    @staticmethod
+    @contextmanager
+    def connection() -> Iterator[PooledConnection]:
+        """
+        Borrow a pooled connection for the duration of a ``with`` block.
+
+        The transaction is rolled back if the block raises (or leaves it
+        uncommitted), and the connection goes back to the pool either way.
+        """
+        conn = DatabaseManager.get_connection()
+        try:
+            yield conn
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                conn.discard()
+            raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def get_pool_stats() -> Dict[str, Any]:
+        """Get metrics of the shared connection pool."""
+        return connection_pool.get_stats()
     
     @staticmethod
     def save_feedback(feedback_data):
         """Save feedback to the PostgreSQL database."""
-        conn = None
         try:
             # Log the incoming feedback data for debugging
             logger.debug(f"Saving feedback data: {feedback_data}")
@@ -61,8 +383,7 @@ class DatabaseManager:
             
             citations = feedback_data.get("citations", [])
             
-            conn = DatabaseManager.get_connection()
-            with conn.cursor() as cursor:
+            with DatabaseManager.connection() as conn, conn.cursor() as cursor:
                 cursor.execute(
                     """
                     INSERT INTO votes 
@@ -86,19 +407,14 @@ class DatabaseManager:
         except Exception as e:
             logger.error(f"Error saving feedback to database: {e}")
             raise
-        finally:
-            if conn is not None:
-                conn.close()
     
     @staticmethod
     def get_feedback_summary(start_date=None, end_date=None):
         """Get summary statistics of collected feedback, optionally filtered by date range."""
         import logging
-        conn = None
         try:
             logging.info(f"get_feedback_summary called with start_date={start_date}, end_date={end_date}")
-            conn = DatabaseManager.get_connection()
-            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            with DatabaseManager.connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cursor:
                 # Build date filter clause and parameters
                 date_filter = ""
                 params = []
@@ -150,19 +466,14 @@ class DatabaseManager:
                 'negative_feedback': 0,
                 'recent_feedback': []
             }
-        finally:
-            if conn is not None:
-                conn.close()
     
     @staticmethod
     def get_query_analytics(start_date=None, end_date=None):
         """Analyze query patterns and generate statistics, optionally filtered by date range."""
         import logging
-        conn = None
         try:
             logging.info(f"get_query_analytics called with start_date={start_date}, end_date={end_date}")
-            conn = DatabaseManager.get_connection()
-            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            with DatabaseManager.connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cursor:
                 date_filter = ""
                 params = []
                 if start_date and end_date:
@@ -222,9 +533,6 @@ class DatabaseManager:
                 'successful_queries': 0,
                 'recent_queries': []
             }
-        finally:
-            if conn is not None:
-                conn.close()
     
     @staticmethod
     def log_helpee_activity(user_query: str, response_text: str, prompt_tokens: int = None, completion_tokens: int = None, total_tokens: int = None, model: str = None):
@@ -232,9 +540,8 @@ class DatabaseManager:
         Log LLM helpee activity into helpee_logs table, including model.
         Returns the inserted helpee_log ID.
         """
-        conn = DatabaseManager.get_connection()
         try:
-            with conn.cursor() as cursor:
+            with DatabaseManager.connection() as conn, conn.cursor() as cursor:
                 cursor.execute(
                     """
                     INSERT INTO helpee_logs
@@ -251,12 +558,9 @@ class DatabaseManager:
         except Exception as e:
             logger.error(f"Error logging helpee activity: {e}")
             raise
-        finally:
-            conn.close()
     @staticmethod
     def save_helpee_log(log_data):
         """Save helpee log entry to the PostgreSQL database."""
-        conn = None
         try:
             logger.debug(f"Saving helpee log data: {log_data}")
 
@@ -266,8 +570,7 @@ class DatabaseManager:
             completion_tokens = log_data.get("completion_tokens")
             total_tokens = log_data.get("total_tokens")
 
-            conn = DatabaseManager.get_connection()
-            with conn.cursor() as cursor:
+            with DatabaseManager.connection() as conn, conn.cursor() as cursor:
                 cursor.execute(
                     """
                     INSERT INTO helpee_logs 
@@ -284,14 +587,11 @@ class DatabaseManager:
         except Exception as e:
             logger.error(f"Error logging helpee activity: {e}")
             raise
-        finally:
-            conn.close()
     @staticmethod
     def log_helpee_cost(helpee_log_id: int, model: str, prompt_tokens: int, completion_tokens: int, total_tokens: int, prompt_cost: float, completion_cost: float, total_cost: float):
         """Log cost breakdown for a helpee_logs entry into helpee_costs table."""
-        conn = DatabaseManager.get_connection()
         try:
-            with conn.cursor() as cursor:
+            with DatabaseManager.connection() as conn, conn.cursor() as cursor:
                 cursor.execute(
                     """
                     INSERT INTO helpee_costs
@@ -305,16 +605,12 @@ class DatabaseManager:
         except Exception as e:
             logger.error(f"Error logging helpee cost: {e}")
             raise
-        finally:
-            conn.close()
 
     @staticmethod
     def get_helpee_costs(start_date=None, end_date=None):
         """Retrieve helpee cost entries optionally filtered by timestamp."""
-        conn = None
         try:
-            conn = DatabaseManager.get_connection()
-            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            with DatabaseManager.connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cursor:
                 date_filter = ""
                 params = []
                 if start_date and end_date:
@@ -337,19 +633,14 @@ class DatabaseManager:
         except Exception as e:
             logger.error(f"Error fetching helpee costs: {e}")
             return []
-        finally:
-            if conn:
-                conn.close()
         
         @staticmethod
         def get_tag_distribution(start_date=None, end_date=None):
             """Get distribution of feedback tags, optionally filtered by date range."""
             import logging
-            conn = None
             try:
                 logging.info(f"get_tag_distribution called with start_date={start_date}, end_date={end_date}")
-                conn = DatabaseManager.get_connection()
-                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                with DatabaseManager.connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cursor:
                     date_filter = ""
                     params = []
                     if start_date and end_date:
@@ -375,9 +666,6 @@ class DatabaseManager:
             except Exception as e:
                 logging.error(f"Error getting tag distribution: {e}")
                 return []
-            finally:
-                if conn is not None:
-                    conn.close()
     
     @staticmethod
     def get_time_metrics(start_date=None, end_date=None):
@@ -406,7 +694,6 @@ class DatabaseManager:
         Returns:
             int: The ID of the logged entry
         """
-        conn = None
         try:
             # Prepare the data
             timestamp = datetime.now(timezone.utc)
@@ -421,32 +708,33 @@ class DatabaseManager:
                     source_metadata.append({"content": str(source)})
             
             # Connect to the database
-            conn = DatabaseManager.get_connection()
-            with conn.cursor() as cursor:
-                # Check if rag_queries table exists, create it if not
-                cursor.execute("""
-                    SELECT EXISTS (
-                        SELECT FROM information_schema.tables 
-                        WHERE table_name = 'rag_queries'
-                    );
-                """)
-                table_exists = cursor.fetchone()[0]
-                
-                if not table_exists:
-                    # Create the table if it doesn't exist
+            with DatabaseManager.connection() as conn, conn.cursor() as cursor:
+                # Check if rag_queries table exists, create it if not (once per process)
+                if not DatabaseManager._rag_queries_table_ready:
                     cursor.execute("""
-                        CREATE TABLE rag_queries (
-                            id SERIAL PRIMARY KEY,
-                            timestamp TIMESTAMP WITH TIME ZONE NOT NULL,
-                            user_query TEXT NOT NULL,
-                            response TEXT NOT NULL,
-                            sources JSONB NOT NULL,
-                            context TEXT NOT NULL,
-                            sql_query TEXT
+                        SELECT EXISTS (
+                            SELECT FROM information_schema.tables 
+                            WHERE table_name = 'rag_queries'
                         );
                     """)
-                    conn.commit()
-                    logger.info("Created rag_queries table")
+                    table_exists = cursor.fetchone()[0]
+                
+                    if not table_exists:
+                        # Create the table if it doesn't exist
+                        cursor.execute("""
+                            CREATE TABLE rag_queries (
+                                id SERIAL PRIMARY KEY,
+                                timestamp TIMESTAMP WITH TIME ZONE NOT NULL,
+                                user_query TEXT NOT NULL,
+                                response TEXT NOT NULL,
+                                sources JSONB NOT NULL,
+                                context TEXT NOT NULL,
+                                sql_query TEXT
+                            );
+                        """)
+                        conn.commit()
+                        logger.info("Created rag_queries table")
+                    DatabaseManager._rag_queries_table_ready = True
                 
                 # Insert the data
                 cursor.execute(
@@ -471,9 +759,4 @@ class DatabaseManager:
                 return entry_id
         except Exception as e:
             logger.error(f"Error logging RAG query to database: {e}")
-            if conn:
-                conn.rollback()
-            raise
-        finally:
-            if conn is not None:
-                conn.close()
\ No newline at end of file
+            raise
\ No newline at end of file
@@ -0,0 +1,25 @@
+"""
+Gunicorn configuration for RAGKA (loaded automatically from the working directory).
+
+Request handling is stateless: conversation turns, citations and session
+settings live in Redis/PostgreSQL and the session id is in the signed Flask
+cookie, so requests of one session can go to any worker or node. Scale out by
+raising ``WEB_CONCURRENCY`` or adding instances behind the load balancer; all
+instances must share Redis, PostgreSQL and ``FLASK_SECRET_KEY``.
+"""
+
+import os
+import multiprocessing
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+# Turns spend most of their time waiting on Azure OpenAI/Search, so each worker
+# serves several requests (and streams) concurrently
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+# Streamed answers keep a request open while the LLM generates
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+# Workers build their clients and pools after fork (see services.shared_clients)
+preload_app = False
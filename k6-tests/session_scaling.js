@@ -0,0 +1,72 @@
+/**
+ * k6 multi-worker test: every virtual user is one session (cookie jar) that asks
+ * several questions in a row. Requests of a session land on whichever gunicorn
+ * worker accepts them, so the checks fail if any state is still per-worker:
+ * citation IDs must keep growing across turns and the session's citations must
+ * be readable after every turn.
+ *
+ * Usage:
+ *   k6 run --env TARGET_HOST=localhost --env TARGET_PORT=8000 k6-tests/session_scaling.js
+ *   python benchmarks/worker_scaling_benchmark.py   # runs this for 1, 2, 4 and 8 workers
+ */
+import http from 'k6/http';
+import { check } from 'k6';
+import { Counter } from 'k6/metrics';
+
+const turns = new Counter('session_turns');
+
+export let options = {
+  vus: parseInt(__ENV.VUS || '32'),
+  duration: __ENV.DURATION || '1m',
+};
+
+const QUESTIONS = [
+  'Troubleshoot Agilent GC.',
+  'What should I check first?',
+  'How do I replace the septum?',
+];
+
+export default function () {
+  const host = __ENV.TARGET_HOST || 'localhost';
+  const port = __ENV.TARGET_PORT || '8000';
+  const base = `http://${host}:${port}`;
+  const params = { headers: { 'Content-Type': 'application/json' } };
+
+  // A new cookie jar per iteration: one session of QUESTIONS.length turns
+  http.cookieJar().clear(base);
+  const seen = new Set();
+  let lastCitationId = 0;
+  for (let i = 0; i < QUESTIONS.length; i++) {
+    const payload = { query: QUESTIONS[i] };
+    if (i === 0) {
+      payload.settings = { max_completion_tokens: 600 };
+    }
+    const res = http.post(`${base}/api/query`, JSON.stringify(payload), params);
+    const ok = check(res, {
+      'query status is 200': (r) => r.status === 200,
+    });
+    if (!ok) {
+      return;
+    }
+    turns.add(1);
+
+    // A source cited before keeps its ID; a new source gets a higher one
+    const ids = (res.json('sources') || []).map((s) => String(s.citation_id || ''));
+    check(ids, {
+      'citation ids consistent across turns': (list) =>
+        list.every((id) => seen.has(id) || parseInt(id) > lastCitationId),
+    });
+    const all = http.get(`${base}/api/session-citations/all`);
+    check(all, {
+      'session citations status is 200': (r) => r.status === 200,
+      'session citations include this turn': (r) => {
+        const sources = r.json('data.sources') || {};
+        return ids.every((id) => id in sources);
+      },
+    });
+    ids.forEach((id) => {
+      seen.add(id);
+      lastCitationId = Math.max(lastCitationId, parseInt(id) || 0);
+    });
+  }
+}
@@ -32,14 +32,18 @@ def get_sas_token():
 # Import the enhanced simple Redis-only RAG implementation
 from rag_assistant_simple_redis import EnhancedSimpleRedisRAGAssistant
 from db_manager import DatabaseManager
-from openai import AzureOpenAI
 from config import get_cost_rates
 from openai_service import OpenAIService
 from rag_improvement_logging import setup_improvement_logging
 from services.redis_service import redis_service
 from services.session_citation_registry import SessionCitationRegistry
-from services.session_memory import PostgresSessionMemory
+from services.tiered_session_memory import tiered_session_memory
 from services.session_citation_registry import session_citation_registry
+from services.pipeline import pipeline_metrics
+from services.assistant_registry import AssistantRegistry
+from services.shared_clients import get_openai_client, get_shared_clients
+from services.http_transport import get_http_pool_stats
+from services.session_state import session_state
 
 # Set up dedicated logging for the improved implementation
 logger = setup_improvement_logging()
@@ -68,24 +72,49 @@ app = Flask(__name__)
 app.secret_key = os.getenv("FLASK_SECRET_KEY", "default-secret-key-for-sessions")
 
 
-# Dictionary to store RAG assistant instances by session ID
-rag_assistants = {}
+# RAG assistant of each session: a bounded LRU with idle eviction. Assistants
+# are cheap handles over process-wide clients and Redis/PostgreSQL state.
+def _create_rag_assistant(session_id):
+    """Create the SimpleRedisRAGAssistant of a session (no intelligent routing, just basic memory + search)."""
+    logger.info(f"Creating new SimpleRedisRAGAssistant for session {session_id}")
+    assistant = EnhancedSimpleRedisRAGAssistant(
+        session_id=session_id,
+        memory=tiered_session_memory
+    )
+    # Log Redis connection status
+    if redis_service.is_connected():
+        logger.info(f"Redis connected for session {session_id}")
+    else:
+        logger.warning(f"Redis not available for session {session_id}")
+    return assistant
+
+
+rag_assistants = AssistantRegistry(_create_rag_assistant)
 
 # Function to get or create the SIMPLE REDIS RAG assistant for a session
 def get_rag_assistant(session_id):
-    """Get or create a SimpleRedisRAGAssistant for the given session ID (no intelligent routing, just basic memory + search)."""
-    if session_id not in rag_assistants:
-        logger.info(f"Creating new SimpleRedisRAGAssistant for session {session_id}")
-        rag_assistants[session_id] = EnhancedSimpleRedisRAGAssistant(
-            session_id=session_id,
-            memory=PostgresSessionMemory()
-        )
-        # Log Redis connection status
-        if redis_service.is_connected():
-            logger.info(f"Redis connected for session {session_id}")
-        else:
-            logger.warning(f"Redis not available for session {session_id}")
-    return rag_assistants[session_id]
+    """Get or create the SimpleRedisRAGAssistant for the given session ID."""
+    return rag_assistants.get(session_id)
+
+
+def get_session_rag_assistant(session_id, settings=None):
+    """
+    Get the RAG assistant of a session configured with the session's settings.
+
+    Settings live in Redis (``services.session_state``), not on the worker's
+    assistant, so any worker can serve the session's next request.
+
+    Args:
+        session_id: The session ID
+        settings: ``settings`` payload of the request, merged into the stored settings
+    """
+    if settings:
+        session_settings = session_state.save_settings(session_id, settings)
+    else:
+        session_settings = session_state.load_settings(session_id)
+    rag_assistant = get_rag_assistant(session_id)
+    rag_assistant.apply_settings(session_settings)
+    return rag_assistant
 # LLM helpee helpers
 PROMPT_ENHANCER_SYSTEM_MESSAGE = QUERY_ENHANCER_SYSTEM_PROMPT = """
 You enhance raw end‑user questions before they go to a Retrieval‑Augmented Generation
@@ -157,11 +186,8 @@ def llm_helpee(input_text: str) -> str:
     """
     # Prepare Azure OpenAI client
     logger.debug(f"AzureOpenAI config: endpoint={os.getenv('AZURE_OPENAI_ENDPOINT')}, api_key=***masked***, api_version={os.getenv('AZURE_OPENAI_API_VERSION')}, model={os.getenv('AZURE_OPENAI_MODEL')}")
-    client = AzureOpenAI(
-        azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-        api_key=os.getenv("AZURE_OPENAI_KEY"),
-        api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-01")
-    )
+    # Shared, pooled client of the helpee deployment
+    client = get_openai_client(os.getenv("AZURE_OPENAI_MODEL"))
     # Debug: log full helpee payload before sending to Azure OpenAI
     logger.debug("Helpee payload: %s", {
         "model": os.getenv("AZURE_OPENAI_MODEL"),
@@ -229,11 +255,8 @@ def llm_helpee_2xl(input_text: str) -> str:
     """
     # Prepare Azure OpenAI client
     logger.debug(f"AzureOpenAI config: endpoint={os.getenv('AZURE_OPENAI_ENDPOINT')}, api_key=***masked***, api_version={os.getenv('AZURE_OPENAI_API_VERSION')}, model={os.getenv('AZURE_OPENAI_MODEL')}")
-    client = AzureOpenAI(
-        azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-        api_key=os.getenv("AZURE_OPENAI_KEY"),
-        api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-01")
-    )
+    # Shared, pooled client of the helpee deployment
+    client = get_openai_client(os.getenv("AZURE_OPENAI_MODEL"))
     response = client.chat.completions.create(
         model=os.getenv("AZURE_OPENAI_MODEL"),
         messages= [
@@ -346,41 +369,17 @@ def api_query():
     logger.info(f"DEBUG - Request settings: {json.dumps(settings)}")
     
     try:
-        # Get or create the RAG assistant for this session
-        rag_assistant = get_rag_assistant(session_id)
-        
-        # Update settings if provided
-        if settings:
-            for key, value in settings.items():
-                if hasattr(rag_assistant, key):
-                    setattr(rag_assistant, key, value)
-            
-            # If model is updated, update the deployment name
-            if "model" in settings:
-                rag_assistant.deployment_name = settings["model"]
+        # Get or create the RAG assistant for this session, with the session's settings
+        rag_assistant = get_session_rag_assistant(session_id, settings)
         
         logger.info(f"DEBUG - Using model: {rag_assistant.deployment_name}")
-        logger.info(f"DEBUG - Temperature: {rag_assistant.temperature}")
         logger.info(f"DEBUG - Max tokens: {rag_assistant.max_completion_tokens}")
-        logger.info(f"DEBUG - Top P: {rag_assistant.top_p}")
         
+        # The turn is stored and logged (DatabaseManager.log_rag_query) in the background
         html_answer, citations = rag_assistant.generate_response(user_query)
         logger.info(f"API query response generated for: {user_query}")
         logger.info(f"DEBUG - Response length: {len(html_answer)}")
 
-        # Log with sources for traceability
-        try:
-            vote_id = DatabaseManager.log_rag_query(
-                query=user_query,
-                response=html_answer,
-                sources=citations,
-                context="",
-                sql_query=None
-            )
-            logger.info(f"RAG query logged with ID: {vote_id}")
-        except Exception as log_exc:
-            logger.error(f"Failed to log RAG query: {log_exc}", exc_info=True)
-
         return jsonify({
             "answer": html_answer,
             "sources": citations,
@@ -410,14 +409,7 @@ def api_query_stream():
         session_id = os.urandom(16).hex()
         session['session_id'] = session_id
     
-    rag_assistant = get_rag_assistant(session_id)
-    
-    # Apply settings if provided
-    settings = data.get("settings", {})
-    if settings:
-        for key, value in settings.items():
-            if hasattr(rag_assistant, key):
-                setattr(rag_assistant, key, value)
+    rag_assistant = get_session_rag_assistant(session_id, data.get("settings", {}))
     
     def generate():
         try:
@@ -451,9 +443,10 @@ def api_clear_history():
     """Clear the conversation history for the current session"""
     try:
         session_id = session.get('session_id')
-        if session_id and session_id in rag_assistants:
+        if session_id:
             logger.info(f"Clearing conversation history for session {session_id}")
-            rag_assistants[session_id].clear_conversation_history()
+            # History lives in Redis/PostgreSQL, so clear it even if the assistant was evicted
+            get_rag_assistant(session_id).clear_conversation_history()
             # Also clear citation map from Redis for this session
             redis_service.delete(f"citationmap:{session_id}")
             return jsonify({"success": True})
@@ -470,9 +463,10 @@ def api_cache_stats():
     """Get cache statistics"""
     try:
         session_id = session.get('session_id')
-        if session_id and session_id in rag_assistants:
+        rag_assistant = rag_assistants.peek(session_id) if session_id else None
+        if rag_assistant is not None:
             logger.info(f"Getting cache stats for session {session_id}")
-            stats = rag_assistants[session_id].get_cache_stats()
+            stats = rag_assistant.get_cache_stats()
             return jsonify({"success": True, "stats": stats})
         else:
             # Return Redis connection status if no active session
@@ -483,6 +477,7 @@ def api_cache_stats():
                 "stats": {
                     "connected": connected,
                     "health": health,
+                    "client": redis_service.get_client_stats(),
                     "message": "No active session found"
                 }
             })
@@ -491,19 +486,59 @@ def api_cache_stats():
         logger.error(f"Traceback: {traceback.format_exc()}")
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route("/api/pipeline/stats", methods=["GET"])
+def api_pipeline_stats():
+    """Get per-stage latency statistics (p50/p95) of the RAG turn pipeline"""
+    try:
+        return jsonify({"success": True, "stages": pipeline_metrics.get_stats()})
+    except Exception as e:
+        logger.error(f"Error getting pipeline stats: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route("/api/assistants/stats", methods=["GET"])
+def api_assistants_stats():
+    """Get the assistant registry and shared client statistics of this worker"""
+    try:
+        return jsonify({
+            "success": True,
+            "registry": rag_assistants.get_stats(),
+            "shared_clients": get_shared_clients(),
+        })
+    except Exception as e:
+        logger.error(f"Error getting assistant registry stats: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route("/api/openai/stats", methods=["GET"])
+def api_openai_stats():
+    """Get Azure OpenAI HTTP connection pool metrics for this worker"""
+    try:
+        return jsonify({"success": True, "pool": get_http_pool_stats()})
+    except Exception as e:
+        logger.error(f"Error getting Azure OpenAI pool stats: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route("/api/db/stats", methods=["GET"])
+def api_db_stats():
+    """Get PostgreSQL connection pool metrics for this worker"""
+    try:
+        return jsonify({"success": True, "pool": DatabaseManager.get_pool_stats()})
+    except Exception as e:
+        logger.error(f"Error getting database pool stats: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @app.route("/api/cache/clear", methods=["POST"])
 def api_clear_cache():
     """Clear the cache for the current session"""
     try:
         session_id = session.get('session_id')
-        if session_id and session_id in rag_assistants:
+        if session_id:
             logger.info(f"Clearing cache for session {session_id}")
             # Get cache type from request if provided
             data = request.get_json() or {}
             cache_type = data.get("type")
             
             # Clear cache with optional type
-            success = rag_assistants[session_id].clear_cache(cache_type)
+            success = get_rag_assistant(session_id).clear_cache(cache_type)
             return jsonify({"success": success})
         else:
             logger.warning(f"No active session found to clear cache")
@@ -5,6 +5,7 @@ import logging
 from openai import AzureOpenAI
 from openai_logger import log_openai_call
 from openai_logger import log_openai_usage
+from services.http_transport import get_http_client
 
 
 
@@ -21,7 +22,7 @@ class OpenAIService:
     - Error handling and logging
     """
     
-    def __init__(self, azure_endpoint=None, api_key=None, api_version="2024-02-01", deployment_name=None):
+    def __init__(self, azure_endpoint=None, api_key=None, api_version="2024-02-01", deployment_name=None, client=None):
         """
         Initialize the OpenAI service.
         
@@ -30,6 +31,8 @@ class OpenAIService:
             api_key: The API key for authentication
             api_version: The API version to use
             deployment_name: The deployment name to use for chat completions
+            client: An existing AzureOpenAI client to share (one is created over the
+                pooled HTTP client if omitted)
         """
         self.azure_endpoint = azure_endpoint
         self.api_key = api_key
@@ -37,10 +40,11 @@ class OpenAIService:
         self.deployment_name = deployment_name
         
         # Initialize the OpenAI client
-        self.client = AzureOpenAI(
+        self.client = client or AzureOpenAI(
             azure_endpoint=azure_endpoint,
             api_key=api_key,
-            api_version=api_version
+            api_version=api_version,
+            http_client=get_http_client()
         )
         
         logger.debug(f"OpenAIService initialized with endpoint: {azure_endpoint}, api_version: {api_version}, deployment: {deployment_name}")
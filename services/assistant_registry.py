@@ -0,0 +1,285 @@
+"""
+Assistant Registry for RAGKA
+
+Holds the per-session RAG assistants of a worker process in a bounded LRU:
+
+- at most ``ASSISTANT_REGISTRY_MAX_SIZE`` assistants are kept; the least
+  recently used one is evicted to make room for a new session
+- assistants not used for ``ASSISTANT_REGISTRY_IDLE_TTL`` seconds are evicted
+  by a sweep that runs on access at most every ``ASSISTANT_REGISTRY_SWEEP_INTERVAL``
+  seconds
+
+Evicting an assistant loses nothing: conversation turns and citations live in
+Redis/PostgreSQL and the clients are process-wide (``services.shared_clients``),
+so a returning session gets a new, cheap handle over the same state.
+
+Resident size of each assistant (excluding shared clients) is estimated when it
+is created and reported, with the process RSS and the hit, miss, eviction and
+creation-time counters, by ``get_stats()``.
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, Optional, Set
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+ASSISTANT_REGISTRY_MAX_SIZE = int(os.getenv("ASSISTANT_REGISTRY_MAX_SIZE", "500"))
+ASSISTANT_REGISTRY_IDLE_TTL = int(os.getenv("ASSISTANT_REGISTRY_IDLE_TTL", "1800"))
+ASSISTANT_REGISTRY_SWEEP_INTERVAL = int(os.getenv("ASSISTANT_REGISTRY_SWEEP_INTERVAL", "60"))
+
+_CONTAINERS = (dict, list, tuple, set, frozenset)
+
+
+def estimate_size(obj: Any, max_depth: int = 4) -> int:
+    """
+    Estimate the memory owned by an object, in bytes.
+
+    Counts the object, its attribute dict and the builtin containers reachable
+    from it. Other objects it references (clients, caches, memory backends) are
+    counted shallowly, since they are shared or owned elsewhere.
+
+    Args:
+        obj: Object to measure
+        max_depth: How deep to follow nested containers
+
+    Returns:
+        Approximate size in bytes
+    """
+    seen: Set[int] = set()
+
+    def size(o: Any, depth: int) -> int:
+        if id(o) in seen:
+            return 0
+        seen.add(id(o))
+        total = sys.getsizeof(o, 0)
+        if depth >= max_depth:
+            return total
+        if isinstance(o, dict):
+            total += sum(size(k, depth + 1) + size(v, depth + 1) for k, v in o.items())
+        elif isinstance(o, _CONTAINERS):
+            total += sum(size(item, depth + 1) for item in o)
+        return total
+
+    attributes = getattr(obj, "__dict__", None)
+    return sys.getsizeof(obj, 0) + (size(attributes, 0) if attributes is not None else 0)
+
+
+def _process_resident_bytes() -> Optional[int]:
+    """Resident set size of this process (Linux only)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _Entry:
+    __slots__ = ("assistant", "last_used", "size")
+
+    def __init__(self, assistant: Any, size: int):
+        self.assistant = assistant
+        self.last_used = time.monotonic()
+        self.size = size
+
+
+class AssistantRegistry:
+    """
+    Thread-safe LRU of per-session assistants with idle-TTL eviction.
+
+    Usage:
+        registry = AssistantRegistry(lambda session_id: Assistant(session_id))
+        assistant = registry.get(session_id)      # created on first use
+        assistant = registry.peek(session_id)     # None if not resident
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[str], Any],
+        max_size: int = ASSISTANT_REGISTRY_MAX_SIZE,
+        idle_ttl: float = ASSISTANT_REGISTRY_IDLE_TTL,
+        sweep_interval: float = ASSISTANT_REGISTRY_SWEEP_INTERVAL,
+    ):
+        """
+        Args:
+            factory: Creates the assistant for a session id
+            max_size: Maximum resident assistants (LRU eviction beyond)
+            idle_ttl: Seconds of inactivity after which an assistant is evicted (0 disables)
+            sweep_interval: Minimum seconds between idle sweeps
+        """
+        self.factory = factory
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self.sweep_interval = sweep_interval
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._next_sweep = time.monotonic() + sweep_interval
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "created": 0,
+            "discarded": 0,
+            "evicted_lru": 0,
+            "evicted_idle": 0,
+            "removed": 0,
+            "create_seconds": 0.0,
+        }
+
+    def get(self, session_id: str) -> Any:
+        """
+        Get the assistant of a session, creating it if it is not resident.
+
+        Args:
+            session_id: The session ID
+
+        Returns:
+            The session's assistant
+        """
+        self._maybe_sweep()
+        assistant = self._lookup(session_id)
+        if assistant is not None:
+            return assistant
+
+        # Build outside the lock: creating an assistant can take a while and must
+        # not stall requests of other sessions
+        start = time.perf_counter()
+        assistant = self.factory(session_id)
+        elapsed = time.perf_counter() - start
+        entry = _Entry(assistant, estimate_size(assistant))
+
+        with self._lock:
+            self._stats["misses"] += 1
+            existing = self._entries.get(session_id)
+            if existing is not None:
+                # Another thread created it meanwhile; keep theirs so the session
+                # has one assistant
+                self._entries.move_to_end(session_id)
+                existing.last_used = time.monotonic()
+                self._stats["discarded"] += 1
+                return existing.assistant
+            self._entries[session_id] = entry
+            self._stats["created"] += 1
+            self._stats["create_seconds"] += elapsed
+            while len(self._entries) > self.max_size:
+                evicted_id, _ = self._entries.popitem(last=False)
+                self._stats["evicted_lru"] += 1
+                logger.debug(f"Evicted least recently used assistant of session {evicted_id}")
+            return assistant
+
+    def _lookup(self, session_id: str) -> Optional[Any]:
+        """Resident assistant of a session, counted as a hit, or None."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            self._entries.move_to_end(session_id)
+            entry.last_used = time.monotonic()
+            self._stats["hits"] += 1
+            return entry.assistant
+
+    def peek(self, session_id: str) -> Optional[Any]:
+        """
+        Get the assistant of a session only if it is resident (counts as a use).
+
+        Args:
+            session_id: The session ID
+
+        Returns:
+            The assistant, or None
+        """
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            self._entries.move_to_end(session_id)
+            entry.last_used = time.monotonic()
+            return entry.assistant
+
+    def remove(self, session_id: str) -> bool:
+        """
+        Drop the assistant of a session.
+
+        Args:
+            session_id: The session ID
+
+        Returns:
+            True if an assistant was resident
+        """
+        with self._lock:
+            if self._entries.pop(session_id, None) is None:
+                return False
+            self._stats["removed"] += 1
+            return True
+
+    def __contains__(self, session_id: str) -> bool:
+        with self._lock:
+            return session_id in self._entries
+
+    def __getitem__(self, session_id: str) -> Any:
+        assistant = self.peek(session_id)
+        if assistant is None:
+            raise KeyError(session_id)
+        return assistant
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._entries))
+
+    def _maybe_sweep(self) -> None:
+        if self.idle_ttl > 0 and time.monotonic() >= self._next_sweep:
+            self.evict_idle()
+
+    def evict_idle(self) -> int:
+        """
+        Evict assistants idle for longer than ``idle_ttl``.
+
+        Returns:
+            Number of evicted assistants
+        """
+        now = time.monotonic()
+        evicted = 0
+        with self._lock:
+            self._next_sweep = now + self.sweep_interval
+            # Entries are in LRU order, so the idle ones are at the front
+            while self._entries:
+                session_id, entry = next(iter(self._entries.items()))
+                if now - entry.last_used <= self.idle_ttl:
+                    break
+                del self._entries[session_id]
+                evicted += 1
+            self._stats["evicted_idle"] += evicted
+        if evicted:
+            logger.info(f"Evicted {evicted} idle assistants")
+        return evicted
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get registry statistics.
+
+        Returns:
+            Dictionary with size, limits, hit/miss/eviction counters, assistants
+            discarded because a concurrent request created them first, mean
+            creation time and estimated resident bytes of the assistants
+        """
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            sizes = [entry.size for entry in self._entries.values()]
+            stats.update({
+                "size": len(sizes),
+                "max_size": self.max_size,
+                "idle_ttl": self.idle_ttl,
+                "estimated_bytes": sum(sizes),
+                "mean_assistant_bytes": sum(sizes) / len(sizes) if sizes else 0,
+            })
+        stats["process_rss_bytes"] = _process_resident_bytes()
+        create_seconds = stats.pop("create_seconds")
+        stats["mean_create_ms"] = 1000.0 * create_seconds / stats["created"] if stats["created"] else 0.0
+        return stats
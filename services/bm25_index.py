@@ -0,0 +1,223 @@
+"""
+BM25 Lexical Index for RAGKA
+
+An in-process inverted index with Okapi BM25 scoring over the ``chunk``
+field, mirroring the lexical half of Azure AI Search hybrid retrieval
+(``BM25Similarity`` with Lucene's default k1=1.2, b=0.75). Queries are
+expanded with the same Solr-format rules as the ``synonyms-community``
+synonym map referenced by the index definition.
+"""
+
+import os
+import re
+import math
+import logging
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokenization (close to the Lucene standard analyzer)."""
+    return _TOKEN_RE.findall((text or "").casefold())
+
+
+class SynonymMap:
+    """
+    Query-side synonym expansion using Solr-format rules, as accepted by Azure
+    AI Search synonym maps:
+
+    - ``gc, gas chromatograph, gas chromatography`` → equivalent terms; any of
+      them expands to all of them
+    - ``ols, open lab => openlab software`` → explicit mapping; the left-hand
+      terms are replaced by the right-hand ones
+    """
+
+    def __init__(self, rules: str = ""):
+        # Each entry: (phrase tokens, replacement phrases, keep original?)
+        self._rules: List[Tuple[Tuple[str, ...], List[Tuple[str, ...]], bool]] = []
+        for line in rules.splitlines():
+            self._add_rule(line)
+
+    @classmethod
+    def load(cls, path: str) -> "SynonymMap":
+        """Load rules from a text file (one rule per line)."""
+        with open(path, "r", encoding="utf-8") as f:
+            synonym_map = cls(f.read())
+        logger.info(f"Loaded {len(synonym_map)} synonym rules from {path}")
+        return synonym_map
+
+    @classmethod
+    def from_azure(cls, index_client, name: str = "synonyms-community") -> "SynonymMap":
+        """
+        Fetch a synonym map from Azure AI Search.
+
+        Args:
+            index_client: ``azure.search.documents.indexes.SearchIndexClient``
+            name: Synonym map name
+        """
+        synonym_map = index_client.get_synonym_map(name)
+        return cls("\n".join(synonym_map.synonyms))
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def _add_rule(self, line: str) -> None:
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            return
+        if "=>" in line:
+            left, right = line.split("=>", 1)
+            sources = [tuple(tokenize(t)) for t in left.split(",")]
+            targets = [tuple(tokenize(t)) for t in right.split(",")]
+            targets = [t for t in targets if t]
+            for source in sources:
+                if source and targets:
+                    self._rules.append((source, targets, False))
+        else:
+            terms = [tuple(tokenize(t)) for t in line.split(",")]
+            terms = [t for t in terms if t]
+            for term in terms:
+                self._rules.append((term, [t for t in terms if t != term], True))
+
+    def expand(self, tokens: Sequence[str]) -> List[str]:
+        """
+        Expand query tokens with synonyms.
+
+        Multi-word synonyms are matched as contiguous token sequences and their
+        replacements are added as bags of tokens.
+
+        Args:
+            tokens: Tokenized query
+
+        Returns:
+            Expanded token list (original tokens first, explicit mappings applied)
+        """
+        tokens = list(tokens)
+        replaced = [False] * len(tokens)
+        extra: List[str] = []
+        for phrase, replacements, keep in self._rules:
+            n = len(phrase)
+            for start in range(len(tokens) - n + 1):
+                if tuple(tokens[start : start + n]) != phrase:
+                    continue
+                if not keep:
+                    for i in range(start, start + n):
+                        replaced[i] = True
+                for replacement in replacements:
+                    extra.extend(replacement)
+        expanded = [t for t, gone in zip(tokens, replaced) if not gone]
+        seen = set(expanded)
+        for token in extra:
+            if token not in seen:
+                expanded.append(token)
+                seen.add(token)
+        return expanded
+
+
+class BM25Index:
+    """
+    Inverted index with BM25 scoring.
+
+    Postings are stored per term as parallel NumPy arrays (document ids and
+    term frequencies), so scoring a query is a handful of vectorized
+    scatter-adds into a dense score array followed by ``argpartition``.
+    """
+
+    def __init__(
+        self,
+        documents: Sequence[str],
+        synonyms: Optional[SynonymMap] = None,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        """
+        Args:
+            documents: Document texts; the position of each text is its id
+            synonyms: Optional synonym map used to expand queries
+            k1: BM25 term-frequency saturation
+            b: BM25 length normalization
+        """
+        self.k1 = k1
+        self.b = b
+        self.synonyms = synonyms
+
+        postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        lengths = np.zeros(len(documents), dtype=np.float32)
+        for doc_id, text in enumerate(documents):
+            tokens = tokenize(text)
+            lengths[doc_id] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                postings[term].append((doc_id, tf))
+
+        self.num_docs = len(documents)
+        avgdl = float(lengths.mean()) if self.num_docs else 0.0
+        # Per-document part of the BM25 denominator: k1 * (1 - b + b * dl / avgdl)
+        self._length_norm = k1 * (1 - b + b * lengths / avgdl) if avgdl else np.full(self.num_docs, k1, dtype=np.float32)
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._idf: Dict[str, float] = {}
+        for term, entries in postings.items():
+            ids = np.fromiter((d for d, _ in entries), dtype=np.int32, count=len(entries))
+            tfs = np.fromiter((tf for _, tf in entries), dtype=np.float32, count=len(entries))
+            self._postings[term] = (ids, tfs)
+            df = len(entries)
+            self._idf[term] = math.log(1 + (self.num_docs - df + 0.5) / (df + 0.5))
+
+        logger.info(f"Built BM25 index over {self.num_docs} documents ({len(self._postings)} terms)")
+
+    @property
+    def num_terms(self) -> int:
+        return len(self._postings)
+
+    def query_terms(self, query: str) -> List[str]:
+        """Tokenize and synonym-expand a query."""
+        tokens = tokenize(query)
+        if self.synonyms is not None:
+            tokens = self.synonyms.expand(tokens)
+        return tokens
+
+    def search(self, query: str, top: int = 50) -> List[Tuple[int, float]]:
+        """
+        Score documents against a query.
+
+        Args:
+            query: Query text
+            top: Maximum number of results
+
+        Returns:
+            List of (document id, BM25 score), best first; documents sharing no
+            term with the query are omitted
+        """
+        if not self.num_docs:
+            return []
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        matched = False
+        for term in set(self.query_terms(query)):
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            ids, tfs = posting
+            scores[ids] += self._idf[term] * tfs * (self.k1 + 1) / (tfs + self._length_norm[ids])
+            matched = True
+        if not matched:
+            return []
+
+        hits = np.flatnonzero(scores)
+        if len(hits) > top:
+            hits = hits[np.argpartition(-scores[hits], top - 1)[:top]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(int(i), float(scores[i])) for i in hits]
+
+
+def load_synonym_map(path: str) -> Optional[SynonymMap]:
+    """Load a synonym map if ``path`` exists, otherwise return None."""
+    if path and os.path.exists(path):
+        return SynonymMap.load(path)
+    logger.info(f"No synonym map at {path}; lexical search runs without expansion")
+    return None
@@ -0,0 +1,146 @@
+"""
+Citation Link Rendering for RAGKA
+
+Turns the ``[n]`` citation markers produced by the LLM into the clickable
+``session-citation-link`` anchors expected by ``session-citation-system.js``.
+
+``render_citation_links`` converts a complete answer in a single scan with
+one precompiled pattern: hallucinated ``ref=``/``href=`` suffixes are dropped
+and existing anchors are copied through untouched, so rendering is
+idempotent. Anchor strings are built once per citation id and cached.
+
+``StreamingCitationLinker`` does this incrementally for streamed answers:
+each delta is linked as it arrives and only a possibly-incomplete marker at
+the end (``[``, ``[12``, ``[12]hr``, ``[12]ref=abc`` …) is held back, so the
+work per delta is proportional to the delta rather than to the answer so far,
+and an anchor is never split across two emitted chunks.
+"""
+
+import re
+from functools import lru_cache
+from typing import Callable, List
+
+# A complete marker, optionally followed by an LLM-hallucinated "ref=…"/"href=…"
+# suffix which is dropped (same clean-up as the non-streaming conversion)
+_CITATION_RE = re.compile(r"\[(\d+)\](?:h?ref=[^\[\]\s]+)?")
+# Single-scan tokenizer for complete answers: an existing anchor (copied as is) or a marker
+_RENDER_RE = re.compile(
+    r"<a\b[^>]*>.*?</a>|\[(\d+)\](?:h?ref=[^\[\]\s]+)?", re.IGNORECASE | re.DOTALL
+)
+# Tail that may still grow into a marker or into a marker's ref suffix
+_PARTIAL_TAIL_RE = re.compile(r"\[\d*$|\[\d+\](?:h|hr|hre|href|r|re|ref)?$|\[\d+\]h?ref=[^\[\]\s]*$")
+
+
+@lru_cache(maxsize=1024)
+def citation_anchor(idx: str) -> str:
+    """HTML anchor for citation ``idx`` (cached per id)."""
+    return (
+        f'<a href="javascript:void(0);" '
+        f'class="session-citation-link text-blue-600 hover:text-blue-800" '
+        f'data-citation-id="{idx}" '
+        f'onclick="handleSessionCitationClick({idx})">[{idx}]</a>'
+    )
+
+
+def render_citation_links(text: str, anchor: Callable[[str], str] = citation_anchor) -> str:
+    """
+    Replace every ``[n]`` marker in a complete answer with its citation anchor.
+
+    Args:
+        text: Answer text (markdown, possibly already containing anchors)
+        anchor: Function rendering the anchor HTML for a citation id
+
+    Returns:
+        The linked text; markers inside existing anchors are left alone
+    """
+    if not text or "[" not in text:
+        return text
+    parts: List[str] = []
+    pos = 0
+    for match in _RENDER_RE.finditer(text):
+        idx = match.group(1)
+        if idx is None:
+            continue
+        parts.append(text[pos : match.start()])
+        parts.append(anchor(idx))
+        pos = match.end()
+    if not parts:
+        return text
+    parts.append(text[pos:])
+    return "".join(parts)
+
+
+def _link(text: str, anchor: Callable[[str], str]) -> str:
+    if "[" not in text:
+        return text
+    return _CITATION_RE.sub(lambda m: anchor(m.group(1)), text)
+
+
+class StreamingCitationLinker:
+    """
+    Stateful ``[n]`` → anchor transformer for streamed LLM output.
+
+    Usage:
+        linker = StreamingCitationLinker()
+        for delta in stream:
+            html = linker.feed(delta)
+            if html:
+                yield html
+        tail = linker.flush()
+    """
+
+    def __init__(self, anchor: Callable[[str], str] = citation_anchor):
+        """
+        Args:
+            anchor: Function rendering the anchor HTML for a citation id
+        """
+        self._anchor = anchor
+        self._pending = ""
+        self._emitted: List[str] = []
+
+    def feed(self, delta: str) -> str:
+        """
+        Consume a streamed delta.
+
+        Args:
+            delta: New text from the LLM
+
+        Returns:
+            Linked HTML that is safe to emit now (may be empty while a marker is incomplete)
+        """
+        if not delta:
+            return ""
+        text = self._pending + delta
+        if "[" not in text:
+            self._pending = ""
+            self._emitted.append(text)
+            return text
+
+        # ``text`` is the delta plus a short held-back tail, so this is O(delta)
+        tail = _PARTIAL_TAIL_RE.search(text)
+        if tail is not None:
+            ready, self._pending = text[: tail.start()], text[tail.start() :]
+        else:
+            ready, self._pending = text, ""
+        html = _link(ready, self._anchor)
+        if html:
+            self._emitted.append(html)
+        return html
+
+    def flush(self) -> str:
+        """
+        End of stream: emit whatever is still held back.
+
+        Returns:
+            The remaining linked HTML
+        """
+        text, self._pending = self._pending, ""
+        html = _link(text, self._anchor)
+        if html:
+            self._emitted.append(html)
+        return html
+
+    @property
+    def html(self) -> str:
+        """Everything emitted so far, concatenated."""
+        return "".join(self._emitted)
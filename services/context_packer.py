@@ -0,0 +1,232 @@
+"""
+Token-budgeted Context Packer for RAGKA
+
+Builds the "Previous Conversation" and "New Search Results" sections of the
+prompt within a fixed token budget, counted with the deployment's tokenizer
+(tiktoken). Space is handed out by priority:
+
+1. Current KB chunks, in retrieval order (the last one that fits partially
+   is truncated)
+2. The most recent turns, verbatim
+3. Older turns, replaced by their stored summary
+
+Stored assistant turns contain the HTML anchors produced by
+``_convert_citations_to_links``; they are reduced back to ``[n]`` markers
+before counting, which alone removes ~60 tokens per citation.
+"""
+
+import os
+import re
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "6000"))
+CONTEXT_RECENT_TURNS = int(os.getenv("CONTEXT_RECENT_TURNS", "2"))
+# gpt-4o / o4-mini family tokenizer
+CONTEXT_TOKENIZER_ENCODING = os.getenv("CONTEXT_TOKENIZER_ENCODING", "o200k_base")
+
+_ANCHOR_RE = re.compile(r"<a\b[^>]*>(.*?)</a>", re.IGNORECASE | re.DOTALL)
+_TAG_RE = re.compile(r"</?(?:span|sup|div|p|br)\b[^>]*>", re.IGNORECASE)
+
+_encoder = None
+_encoder_lock = threading.Lock()
+_encoder_failed = False
+
+
+def _get_encoder():
+    """Load the tiktoken encoding once; None if tiktoken or its BPE file is unavailable."""
+    global _encoder, _encoder_failed
+    if _encoder is not None or _encoder_failed:
+        return _encoder
+    with _encoder_lock:
+        if _encoder is None and not _encoder_failed:
+            try:
+                import tiktoken
+
+                _encoder = tiktoken.get_encoding(CONTEXT_TOKENIZER_ENCODING)
+            except Exception as e:
+                _encoder_failed = True
+                logger.warning(f"tiktoken encoding {CONTEXT_TOKENIZER_ENCODING} unavailable, estimating tokens: {str(e)}")
+    return _encoder
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count tokens with the configured tiktoken encoding.
+
+    Falls back to a ~4 characters per token estimate when tiktoken cannot be
+    loaded (e.g. no network access to fetch the encoding file).
+    """
+    if not text:
+        return 0
+    encoder = _get_encoder()
+    if encoder is None:
+        return (len(text) + 3) // 4
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, counter: Callable[[str], int] = count_tokens) -> str:
+    """
+    Cut ``text`` to at most ``max_tokens`` tokens, on a word boundary when possible.
+
+    Args:
+        text: Text to truncate
+        max_tokens: Token limit
+        counter: Token counting function
+
+    Returns:
+        The (possibly) shortened text, with "…" appended if it was cut
+    """
+    if max_tokens <= 0:
+        return ""
+    if counter(text) <= max_tokens:
+        return text
+    encoder = _get_encoder() if counter is count_tokens else None
+    if encoder is not None:
+        cut = encoder.decode(encoder.encode(text, disallowed_special=())[: max_tokens - 1])
+    else:
+        # Binary search on the character length for arbitrary counters
+        lo, hi = 0, len(text)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if counter(text[:mid] + " …") <= max_tokens:
+                lo = mid
+            else:
+                hi = mid - 1
+        cut = text[:lo]
+    space = cut.rfind(" ")
+    if space > len(cut) // 2:
+        cut = cut[:space]
+    return cut.rstrip() + " …"
+
+
+def strip_citation_markup(text: str) -> str:
+    """Reduce citation anchors and inline markup in a stored answer to plain text with ``[n]`` markers."""
+    if not text or "<" not in text:
+        return text or ""
+    return _TAG_RE.sub("", _ANCHOR_RE.sub(r"\1", text))
+
+
+@dataclass
+class PackedContext:
+    """Result of packing: the prompt sections plus accounting."""
+
+    history_section: str
+    kb_section: str
+    tokens: int
+    stats: Dict[str, Any] = field(default_factory=dict)
+
+
+class ContextPacker:
+    """
+    Fills a token budget with KB chunks and conversation history by priority.
+    """
+
+    SEPARATOR = "\n\n"
+
+    def __init__(
+        self,
+        budget: int = CONTEXT_TOKEN_BUDGET,
+        recent_turns: int = CONTEXT_RECENT_TURNS,
+        counter: Callable[[str], int] = count_tokens,
+        min_chunk_tokens: int = 64,
+    ):
+        """
+        Args:
+            budget: Token budget for the history and KB sections together
+            recent_turns: Number of latest turns kept verbatim before falling back to summaries
+            counter: Token counting function
+            min_chunk_tokens: Smallest useful remainder for a truncated KB chunk or turn
+        """
+        self.budget = budget
+        self.recent_turns = recent_turns
+        self.counter = counter
+        self.min_chunk_tokens = min_chunk_tokens
+
+    @staticmethod
+    def format_turn(user: str, assistant: str) -> str:
+        parts = []
+        if user:
+            parts.append(f"**User:** {user}")
+        if assistant:
+            parts.append(f"**Assistant:** {assistant}")
+        return "\n\n".join(parts)
+
+    def _fit(self, text: str, remaining: int) -> Optional[str]:
+        """Return ``text`` (truncated if needed) if a useful part fits in ``remaining`` tokens."""
+        cost = self.counter(text) + 1  # +1 for the separator
+        if cost <= remaining:
+            return text
+        if remaining - 1 >= self.min_chunk_tokens:
+            return truncate_to_tokens(text, remaining - 1, self.counter)
+        return None
+
+    def pack(self, kb_entries: List[str], turns: List[Dict[str, Any]]) -> PackedContext:
+        """
+        Pack formatted KB chunks and conversation turns into the budget.
+
+        Args:
+            kb_entries: Formatted KB chunk texts, best first (their order maps to [n] markers)
+            turns: Turns oldest to newest, dicts with ``user``, ``assistant`` and optional ``summary``
+
+        Returns:
+            PackedContext with both sections and token accounting
+        """
+        remaining = self.budget
+        stats = {"kb_chunks": 0, "kb_truncated": 0, "turns_verbatim": 0, "turns_summarized": 0, "turns_dropped": 0}
+
+        kb_parts: List[str] = []
+        for entry in kb_entries:
+            fitted = self._fit(entry, remaining)
+            if fitted is None:
+                break
+            kb_parts.append(fitted)
+            remaining -= self.counter(fitted) + 1
+            stats["kb_chunks"] += 1
+            if fitted is not entry:
+                stats["kb_truncated"] += 1
+                break
+
+        history_parts: List[str] = []
+        for age, turn in enumerate(reversed(turns)):
+            user = turn.get("user") or ""
+            assistant = strip_citation_markup(turn.get("assistant") or "")
+            summary = turn.get("summary")
+            verbatim = self.format_turn(user, assistant)
+
+            candidates = []
+            if age < self.recent_turns:
+                candidates.append(verbatim)
+            if summary:
+                candidates.append(f"**Earlier turn (summary):** {summary}")
+            candidates.append(verbatim)
+
+            fitted = None
+            for candidate in candidates:
+                if self.counter(candidate) + 1 <= remaining:
+                    fitted = candidate
+                    break
+            if fitted is None:
+                # Nothing fits whole: truncate the preferred form if enough room is left
+                fitted = self._fit(candidates[0], remaining)
+            if fitted is None:
+                stats["turns_dropped"] = len(turns) - age
+                break
+            history_parts.append(fitted)
+            remaining -= self.counter(fitted) + 1
+            if fitted.startswith("**Earlier turn (summary):**"):
+                stats["turns_summarized"] += 1
+            else:
+                stats["turns_verbatim"] += 1
+
+        history_parts.reverse()
+        history_section = self.SEPARATOR.join(history_parts)
+        kb_section = self.SEPARATOR.join(kb_parts)
+        tokens = self.counter(history_section) + self.counter(kb_section)
+        stats["budget"] = self.budget
+        return PackedContext(history_section, kb_section, tokens, stats)
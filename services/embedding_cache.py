@@ -0,0 +1,192 @@
+"""
+Embedding Cache for RAGKA
+
+This module provides a two-tier cache for query embeddings: a small in-process
+LRU in front of a Redis tier shared by every worker. Entries are keyed on the
+normalized query text plus the embedding deployment name, so repeated and
+near-duplicate questions skip the Azure OpenAI embeddings round-trip.
+"""
+
+import os
+import re
+import hashlib
+import logging
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from services.redis_service import redis_service
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "2048"))
+EMBEDDING_CACHE_TTL = int(os.getenv("EMBEDDING_CACHE_TTL", "604800"))  # 7 days
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_TRAILING_PUNCT_RE = re.compile(r"[\s?!.]+$")
+
+
+def normalize_query(text: str) -> str:
+    """
+    Normalize a query so trivially different phrasings share one cache entry.
+
+    Applies NFKC normalization, case folding, whitespace collapsing and strips
+    trailing sentence punctuation ("Troubleshoot Agilent GC." and
+    "troubleshoot  agilent gc" normalize to the same key).
+
+    Args:
+        text: Raw query text
+
+    Returns:
+        Normalized query text
+    """
+    normalized = unicodedata.normalize("NFKC", text or "").casefold()
+    normalized = _WHITESPACE_RE.sub(" ", normalized).strip()
+    return _TRAILING_PUNCT_RE.sub("", normalized)
+
+
+class EmbeddingCache:
+    """
+    Two-tier (in-process LRU + Redis) cache for embedding vectors.
+
+    Key pattern: embedding:{deployment}:{sha256(normalized query)}
+
+    Vectors are stored in Redis as packed float32 bytes (4 bytes per dimension)
+    rather than JSON, which keeps a 1536-dim entry around 6KB.
+    """
+
+    def __init__(
+        self,
+        redis=None,
+        max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES,
+        ttl: int = EMBEDDING_CACHE_TTL,
+    ):
+        """
+        Initialize the embedding cache.
+
+        Args:
+            redis: Redis service used for the shared tier (defaults to the singleton)
+            max_entries: Maximum number of vectors kept in the in-process LRU
+            ttl: Time in seconds before a Redis entry expires
+        """
+        self._redis = redis if redis is not None else redis_service
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.key_prefix = "embedding:"
+
+        self._local: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._local_hits = 0
+        self._redis_hits = 0
+        self._misses = 0
+
+        logger.info(f"Embedding cache initialized (max_entries={max_entries}, ttl={ttl}s)")
+
+    def _make_key(self, text: str, deployment: str) -> str:
+        """Get the cache key for a query/deployment pair."""
+        digest = hashlib.sha256(normalize_query(text).encode("utf-8")).hexdigest()
+        return f"{self.key_prefix}{deployment}:{digest}"
+
+    @staticmethod
+    def _pack(embedding: List[float]) -> bytes:
+        return array("f", embedding).tobytes()
+
+    @staticmethod
+    def _unpack(payload: bytes) -> Optional[List[float]]:
+        if not isinstance(payload, (bytes, bytearray)) or len(payload) % 4:
+            return None
+        vector = array("f")
+        vector.frombytes(payload)
+        return vector.tolist()
+
+    def _remember(self, key: str, embedding: List[float]) -> None:
+        """Insert into the in-process LRU, evicting the least recently used entry."""
+        with self._lock:
+            self._local[key] = embedding
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def get(self, text: str, deployment: str) -> Optional[List[float]]:
+        """
+        Look up an embedding, checking the in-process LRU before Redis.
+
+        Args:
+            text: Query text
+            deployment: Embedding deployment name
+
+        Returns:
+            The cached embedding or None on a miss
+        """
+        key = self._make_key(text, deployment)
+
+        with self._lock:
+            embedding = self._local.get(key)
+            if embedding is not None:
+                self._local.move_to_end(key)
+                self._local_hits += 1
+                return embedding
+
+        try:
+            embedding = self._unpack(self._redis.get(key))
+        except Exception as e:
+            logger.error(f"Error reading embedding from Redis: {str(e)}")
+            embedding = None
+
+        if embedding is None:
+            with self._lock:
+                self._misses += 1
+            return None
+
+        with self._lock:
+            self._redis_hits += 1
+        self._remember(key, embedding)
+        return embedding
+
+    def put(self, text: str, deployment: str, embedding: List[float]) -> None:
+        """
+        Store an embedding in both tiers.
+
+        Args:
+            text: Query text
+            deployment: Embedding deployment name
+            embedding: The embedding vector
+        """
+        key = self._make_key(text, deployment)
+        self._remember(key, embedding)
+        try:
+            self._redis.set(key, self._pack(embedding), self.ttl)
+        except Exception as e:
+            logger.error(f"Error writing embedding to Redis: {str(e)}")
+
+    def clear_local(self) -> None:
+        """Drop the in-process tier (the Redis tier expires on its own)."""
+        with self._lock:
+            self._local.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get hit/miss counters for both tiers.
+
+        Returns:
+            Dictionary with cache statistics
+        """
+        with self._lock:
+            hits = self._local_hits + self._redis_hits
+            lookups = hits + self._misses
+            return {
+                "local_entries": len(self._local),
+                "max_entries": self.max_entries,
+                "local_hits": self._local_hits,
+                "redis_hits": self._redis_hits,
+                "misses": self._misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+            }
+
+
+# Create a singleton instance
+embedding_cache = EmbeddingCache()
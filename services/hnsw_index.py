@@ -0,0 +1,341 @@
+"""
+HNSW Vector Index for RAGKA
+
+A pure NumPy implementation of Hierarchical Navigable Small World graphs
+(Malkov & Yashunin) used as an in-process approximate nearest-neighbour index
+over chunk embeddings. It supports incremental inserts, a tunable
+``ef_search`` to trade recall against latency, and persistence to ``.npy``
+files that are memory-mapped on load so large indexes are paged in lazily.
+
+Similarity is cosine (vectors are L2-normalized on insert), matching the
+metric of the Azure AI Search vector profile.
+"""
+
+import os
+import json
+import heapq
+import logging
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class HNSWIndex:
+    """
+    Hierarchical Navigable Small World graph over L2-normalized vectors.
+
+    Node ids are the insertion order (0..n-1). Layer 0 adjacency is kept in a
+    dense int32 matrix of width ``2*M`` so it can be saved and memory-mapped;
+    the sparse upper layers are small and kept as dictionaries.
+
+    On-disk layout (a directory):
+    - vectors.npy    → float32 (n, dim) normalized vectors
+    - neighbors0.npy → int32 (n, 2*M) layer-0 adjacency, padded with -1
+    - degrees0.npy   → int32 (n,) number of valid layer-0 neighbours
+    - levels.npy     → int8 (n,) top layer of each node
+    - meta.json      → parameters, entry point and upper-layer adjacency
+    """
+
+    def __init__(
+        self,
+        dim: int,
+        M: int = 16,
+        ef_construction: int = 200,
+        ef_search: int = 64,
+        seed: int = 42,
+    ):
+        """
+        Args:
+            dim: Vector dimensionality
+            M: Maximum links per node on upper layers (layer 0 allows 2*M)
+            ef_construction: Candidate list size used while inserting
+            ef_search: Default candidate list size used while searching
+            seed: Seed for the level generator
+        """
+        self.dim = dim
+        self.M = M
+        self.M0 = 2 * M
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self._level_mult = 1.0 / np.log(M)
+        self._rng = np.random.default_rng(seed)
+
+        self._count = 0
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._neighbors0 = np.full((0, self.M0), -1, dtype=np.int32)
+        self._degrees0 = np.zeros(0, dtype=np.int32)
+        self._levels = np.zeros(0, dtype=np.int8)
+        self._upper: List[Dict[int, List[int]]] = []
+        self._entry_point = -1
+        self._max_level = -1
+
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    # ------------------------------------------------------------------ #
+    # Insertion
+    # ------------------------------------------------------------------ #
+
+    def add(self, vectors: Sequence[Sequence[float]]) -> List[int]:
+        """
+        Insert vectors into the graph.
+
+        Args:
+            vectors: (n, dim) vectors to insert
+
+        Returns:
+            Node ids assigned to the inserted vectors
+        """
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-dim vectors, got {vectors.shape[1]}")
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors = vectors / norms
+
+        with self._lock:
+            self._reserve(self._count + len(vectors))
+            ids = []
+            for vector in vectors:
+                node = self._count
+                self._vectors[node] = vector
+                self._count += 1
+                self._insert(node)
+                ids.append(node)
+            return ids
+
+    def _reserve(self, needed: int) -> None:
+        """Grow the dense arrays (always into memory, so memory-mapped indexes become writable)."""
+        capacity = len(self._vectors)
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, 2 * capacity, 1024)
+        extra = new_capacity - capacity
+        self._vectors = np.concatenate([self._vectors, np.zeros((extra, self.dim), dtype=np.float32)])
+        self._neighbors0 = np.concatenate(
+            [self._neighbors0, np.full((extra, self.M0), -1, dtype=np.int32)]
+        )
+        self._degrees0 = np.concatenate([self._degrees0, np.zeros(extra, dtype=np.int32)])
+        self._levels = np.concatenate([self._levels, np.zeros(extra, dtype=np.int8)])
+
+    def _random_level(self) -> int:
+        return int(-np.log(1.0 - self._rng.random()) * self._level_mult)
+
+    def _insert(self, node: int) -> None:
+        query = self._vectors[node]
+        level = self._random_level()
+        self._levels[node] = level
+        while len(self._upper) < level:
+            self._upper.append({})
+        for layer in range(1, level + 1):
+            self._upper[layer - 1][node] = []
+
+        if self._entry_point < 0:
+            self._entry_point = node
+            self._max_level = level
+            return
+
+        entry = self._entry_point
+        for layer in range(self._max_level, level, -1):
+            entry = self._search_layer(query, [entry], 1, layer)[0][1]
+
+        entry_points = [entry]
+        for layer in range(min(level, self._max_level), -1, -1):
+            candidates = self._search_layer(query, entry_points, self.ef_construction, layer)
+            neighbors = self._select_neighbors(candidates, self.M)
+            self._set_neighbors(node, layer, neighbors)
+            max_links = self.M0 if layer == 0 else self.M
+            for neighbor in neighbors:
+                self._link(neighbor, node, layer, max_links)
+            entry_points = [n for _, n in candidates]
+
+        if level > self._max_level:
+            self._entry_point = node
+            self._max_level = level
+
+    def _select_neighbors(self, candidates: List[Tuple[float, int]], m: int) -> List[int]:
+        """
+        Neighbour-selection heuristic: keep a candidate only if it is closer to
+        the base point than to every neighbour selected so far, then top up with
+        the closest pruned candidates so sparse regions stay connected.
+        """
+        if len(candidates) <= m:
+            return [n for _, n in candidates]
+        selected: List[int] = []
+        pruned: List[int] = []
+        for dist, node in candidates:
+            if len(selected) >= m:
+                break
+            if selected:
+                to_selected = 1.0 - self._vectors[selected] @ self._vectors[node]
+                if (to_selected < dist).any():
+                    pruned.append(node)
+                    continue
+            selected.append(node)
+        for node in pruned:
+            if len(selected) >= m:
+                break
+            selected.append(node)
+        return selected
+
+    def _neighbors(self, node: int, layer: int) -> List[int]:
+        if layer == 0:
+            return self._neighbors0[node, : self._degrees0[node]].tolist()
+        return self._upper[layer - 1].get(node, [])
+
+    def _set_neighbors(self, node: int, layer: int, neighbors: List[int]) -> None:
+        if layer == 0:
+            self._neighbors0[node, :] = -1
+            self._neighbors0[node, : len(neighbors)] = neighbors
+            self._degrees0[node] = len(neighbors)
+        else:
+            self._upper[layer - 1][node] = list(neighbors)
+
+    def _link(self, node: int, new: int, layer: int, max_links: int) -> None:
+        """Add a back-link from ``node`` to ``new``, pruning ``node``'s list if it is full."""
+        neighbors = self._neighbors(node, layer)
+        if len(neighbors) < max_links:
+            self._set_neighbors(node, layer, neighbors + [new])
+            return
+        candidates = neighbors + [new]
+        dists = 1.0 - self._vectors[candidates] @ self._vectors[node]
+        ranked = sorted(zip(dists.tolist(), candidates))
+        self._set_neighbors(node, layer, self._select_neighbors(ranked, max_links))
+
+    # ------------------------------------------------------------------ #
+    # Search
+    # ------------------------------------------------------------------ #
+
+    def _search_layer(
+        self, query: np.ndarray, entry_points: List[int], ef: int, layer: int
+    ) -> List[Tuple[float, int]]:
+        """Best-first search on one layer; returns up to ``ef`` (distance, node) pairs, closest first."""
+        visited = set(entry_points)
+        dists = (1.0 - self._vectors[entry_points] @ query).tolist()
+        candidates = list(zip(dists, entry_points))
+        heapq.heapify(candidates)
+        results = [(-d, n) for d, n in candidates]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            dist, node = heapq.heappop(candidates)
+            if dist > -results[0][0] and len(results) >= ef:
+                break
+            neighbors = [n for n in self._neighbors(node, layer) if n not in visited]
+            if not neighbors:
+                continue
+            visited.update(neighbors)
+            neighbor_dists = (1.0 - self._vectors[neighbors] @ query).tolist()
+            for d, n in zip(neighbor_dists, neighbors):
+                if len(results) < ef or d < -results[0][0]:
+                    heapq.heappush(candidates, (d, n))
+                    heapq.heappush(results, (-d, n))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+
+        return sorted((-d, n) for d, n in results)
+
+    def search(
+        self, vector: Sequence[float], k: int = 8, ef_search: Optional[int] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Approximate k-nearest-neighbour search.
+
+        Args:
+            vector: Query vector
+            k: Number of neighbours to return
+            ef_search: Candidate list size (defaults to ``self.ef_search``); larger
+                values raise recall at the cost of latency
+
+        Returns:
+            List of (node id, cosine similarity), most similar first
+        """
+        if self._count == 0:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        ef = max(ef_search or self.ef_search, k)
+        # Inserts update the entry point, layers and arrays in several steps, so
+        # the graph is only walked while no insert is in progress
+        with self._lock:
+            entry = self._entry_point
+            for layer in range(self._max_level, 0, -1):
+                entry = self._search_layer(query, [entry], 1, layer)[0][1]
+            results = self._search_layer(query, [entry], ef, 0)[:k]
+        return [(node, 1.0 - dist) for dist, node in results]
+
+    def get_vectors(self, ids: Sequence[int]) -> np.ndarray:
+        """Return the stored (L2-normalized) vectors of the given node ids."""
+        return self._vectors[np.asarray(ids, dtype=np.int64)]
+
+    # ------------------------------------------------------------------ #
+    # Persistence
+    # ------------------------------------------------------------------ #
+
+    def save(self, path: str) -> None:
+        """Write the index to ``path`` (created if missing)."""
+        os.makedirs(path, exist_ok=True)
+        with self._lock:
+            n = self._count
+            np.save(os.path.join(path, "vectors.npy"), np.ascontiguousarray(self._vectors[:n]))
+            np.save(os.path.join(path, "neighbors0.npy"), np.ascontiguousarray(self._neighbors0[:n]))
+            np.save(os.path.join(path, "degrees0.npy"), np.ascontiguousarray(self._degrees0[:n]))
+            np.save(os.path.join(path, "levels.npy"), np.ascontiguousarray(self._levels[:n]))
+            meta = {
+                "dim": self.dim,
+                "M": self.M,
+                "ef_construction": self.ef_construction,
+                "ef_search": self.ef_search,
+                "count": n,
+                "entry_point": self._entry_point,
+                "max_level": self._max_level,
+                "upper": [{str(k): v for k, v in layer.items()} for layer in self._upper],
+            }
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        logger.info(f"Saved HNSW index with {n} vectors to {path}")
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True, ef_search: Optional[int] = None) -> "HNSWIndex":
+        """
+        Load an index written by :meth:`save`.
+
+        Args:
+            path: Index directory
+            mmap: Memory-map the dense arrays instead of reading them into memory.
+                The first insert after loading copies them into memory.
+            ef_search: Override for the saved default ``ef_search``
+
+        Returns:
+            The loaded index
+        """
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        index = cls(
+            meta["dim"],
+            M=meta["M"],
+            ef_construction=meta["ef_construction"],
+            ef_search=ef_search or meta["ef_search"],
+        )
+        mode = "r" if mmap else None
+        index._vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode=mode)
+        index._neighbors0 = np.load(os.path.join(path, "neighbors0.npy"), mmap_mode=mode)
+        index._degrees0 = np.load(os.path.join(path, "degrees0.npy"), mmap_mode=mode)
+        index._levels = np.load(os.path.join(path, "levels.npy"), mmap_mode=mode)
+        index._upper = [{int(k): v for k, v in layer.items()} for layer in meta["upper"]]
+        index._count = meta["count"]
+        index._entry_point = meta["entry_point"]
+        index._max_level = meta["max_level"]
+        logger.info(f"Loaded HNSW index with {index._count} vectors from {path}")
+        return index
@@ -0,0 +1,209 @@
+"""
+Pooled HTTP Transport for Azure OpenAI
+
+Every Azure OpenAI client in the process sends its requests through one
+``httpx`` client, so connections (and their TLS sessions) to the endpoint are
+opened once and reused by all sessions, deployments and helpers:
+
+- keep-alive pool of up to ``AZURE_OPENAI_MAX_CONNECTIONS`` connections, of
+  which ``AZURE_OPENAI_MAX_KEEPALIVE`` are kept open for
+  ``AZURE_OPENAI_KEEPALIVE_EXPIRY`` seconds when idle
+- HTTP/2 (one multiplexed connection for concurrent requests) when
+  ``AZURE_OPENAI_HTTP2`` is set and the optional ``h2`` package is installed;
+  HTTP/1.1 otherwise, or when the server does not negotiate it
+- TCP keepalive on pooled sockets, so idle connections dropped by a NAT or
+  load balancer are detected
+
+``get_http_client()`` returns the client of the current process (a pool
+inherited across ``fork()`` is never used). ``get_http_pool_stats()`` reports
+connections opened and reused, requests waiting for a connection and requests
+per deployment.
+"""
+
+import os
+import socket
+import logging
+import threading
+from collections import Counter
+from typing import Any, Dict, Optional
+
+import httpx
+from openai import DefaultHttpxClient
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+AZURE_OPENAI_MAX_CONNECTIONS = int(os.getenv("AZURE_OPENAI_MAX_CONNECTIONS", "100"))
+AZURE_OPENAI_MAX_KEEPALIVE = int(os.getenv("AZURE_OPENAI_MAX_KEEPALIVE", "20"))
+AZURE_OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("AZURE_OPENAI_KEEPALIVE_EXPIRY", "90"))
+AZURE_OPENAI_HTTP2 = os.getenv("AZURE_OPENAI_HTTP2", "true").lower() in ("1", "true", "yes")
+AZURE_OPENAI_CONNECT_TIMEOUT = float(os.getenv("AZURE_OPENAI_CONNECT_TIMEOUT", "5"))
+AZURE_OPENAI_POOL_TIMEOUT = float(os.getenv("AZURE_OPENAI_POOL_TIMEOUT", "10"))
+AZURE_OPENAI_TIMEOUT = float(os.getenv("AZURE_OPENAI_TIMEOUT", "120"))
+
+
+def http2_available() -> bool:
+    """Whether the optional ``h2`` package needed for HTTP/2 is installed."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _deployment(request: httpx.Request) -> Optional[str]:
+    """Deployment name from an Azure OpenAI URL (``/openai/deployments/{name}/...``)."""
+    parts = request.url.path.split("/")
+    try:
+        return parts[parts.index("deployments") + 1] or None
+    except (ValueError, IndexError):
+        return None
+
+
+class PooledTransport(httpx.HTTPTransport):
+    """``httpx.HTTPTransport`` that counts connection reuse of its pool."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "connections_opened": 0,
+            "connections_reused": 0,
+            "errors": 0,
+            "pool_timeouts": 0,
+        }
+        self._deployments: Counter = Counter()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        connected = []
+        outer_trace = request.extensions.get("trace")
+
+        def trace(event: str, info: Dict[str, Any]) -> None:
+            if event == "connection.connect_tcp.complete":
+                connected.append(True)
+            if outer_trace is not None:
+                outer_trace(event, info)
+
+        request.extensions["trace"] = trace
+        try:
+            response = super().handle_request(request)
+        except httpx.PoolTimeout:
+            self._count("pool_timeouts")
+            raise
+        except Exception:
+            self._count("errors")
+            raise
+        finally:
+            if outer_trace is None:
+                del request.extensions["trace"]
+            else:
+                request.extensions["trace"] = outer_trace
+        with self._stats_lock:
+            self._stats["requests"] += 1
+            self._stats["connections_opened" if connected else "connections_reused"] += 1
+            self._deployments[_deployment(request) or "-"] += 1
+        return response
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get pool statistics.
+
+        Returns:
+            Dictionary with request and connection counters, the connections
+            currently open/idle/using HTTP/2, requests waiting for a connection
+            and requests per deployment
+        """
+        with self._stats_lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats["requests_by_deployment"] = dict(self._deployments)
+        stats["reuse_ratio"] = (
+            stats["connections_reused"] / stats["requests"] if stats["requests"] else 0.0
+        )
+        pool = self._pool
+        connections = list(pool.connections)
+        stats["connections_open"] = len(connections)
+        stats["connections_idle"] = sum(1 for c in connections if c.is_idle())
+        stats["connections_http2"] = sum(1 for c in connections if "HTTP/2" in c.info())
+        stats["requests_waiting"] = sum(1 for r in list(pool._requests) if r.is_queued())
+        return stats
+
+
+def create_http_client(
+    max_connections: int = AZURE_OPENAI_MAX_CONNECTIONS,
+    max_keepalive: int = AZURE_OPENAI_MAX_KEEPALIVE,
+    keepalive_expiry: float = AZURE_OPENAI_KEEPALIVE_EXPIRY,
+    http2: bool = AZURE_OPENAI_HTTP2,
+) -> httpx.Client:
+    """
+    Create an ``httpx`` client with a pooled, instrumented transport.
+
+    Args:
+        max_connections: Maximum open connections
+        max_keepalive: Maximum idle connections kept open
+        keepalive_expiry: Seconds an idle connection is kept open
+        http2: Negotiate HTTP/2 (ignored when ``h2`` is not installed)
+
+    Returns:
+        An ``httpx.Client`` with OpenAI's defaults, suitable as ``http_client``
+        of ``AzureOpenAI``
+    """
+    if http2 and not http2_available():
+        logger.info("h2 is not installed, using HTTP/1.1 for Azure OpenAI")
+        http2 = False
+    transport = PooledTransport(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        ),
+        socket_options=[(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)],
+    )
+    return DefaultHttpxClient(
+        transport=transport,
+        timeout=httpx.Timeout(
+            AZURE_OPENAI_TIMEOUT,
+            connect=AZURE_OPENAI_CONNECT_TIMEOUT,
+            pool=AZURE_OPENAI_POOL_TIMEOUT,
+        ),
+    )
+
+
+_lock = threading.Lock()
+_pid: Optional[int] = None
+_client: Optional[httpx.Client] = None
+
+
+def get_http_client() -> httpx.Client:
+    """
+    Get the process-wide HTTP client for Azure OpenAI.
+
+    Returns:
+        The ``httpx.Client`` shared by every Azure OpenAI client of this process
+    """
+    global _pid, _client
+    client = _client if _pid == os.getpid() else None
+    if client is None:
+        with _lock:
+            if _pid != os.getpid() or _client is None:
+                _client = create_http_client()
+                _pid = os.getpid()
+                logger.info("Created pooled HTTP client for Azure OpenAI")
+            client = _client
+    return client
+
+
+def get_http_pool_stats() -> Dict[str, Any]:
+    """Statistics of this process's Azure OpenAI connection pool (empty before first use)."""
+    with _lock:
+        client = _client if _pid == os.getpid() else None
+    if client is None:
+        return {}
+    stats = client._transport.get_stats()
+    stats["http2_enabled"] = bool(client._transport._pool._http2)
+    return stats
@@ -0,0 +1,119 @@
+"""
+Knowledge-Base Index Version for RAGKA
+
+Caches derived from the search index (answers, search results) stamp their
+entries with the index version published here. Bumping the version after a
+re-index invalidates every such entry at once, across all workers.
+
+Usage after re-indexing:
+    python -m services.index_version bump
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+from services.redis_service import redis_service
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+KB_INDEX_VERSION = os.getenv("KB_INDEX_VERSION", "1")
+# Seconds a version read from Redis is reused in-process. 0 (default) reads Redis on
+# every lookup, so a bump is seen by all workers at once; a positive value saves
+# that GET per lookup but lets a worker serve entries of the old index for up to
+# this long after a bump.
+INDEX_VERSION_REFRESH_SECONDS = float(os.getenv("INDEX_VERSION_REFRESH_SECONDS", "0"))
+
+
+class IndexVersionService:
+    """
+    Publishes and reads the current version of a search index.
+
+    Key pattern: kb:index_version:{index_name} → opaque version string
+
+    Every lookup reads the version from Redis (one GET) unless
+    ``refresh_interval`` is set, in which case it is reused in-process for that
+    many seconds. When Redis holds no version the ``KB_INDEX_VERSION`` setting
+    is used.
+    """
+
+    def __init__(self, redis=None, refresh_interval: float = INDEX_VERSION_REFRESH_SECONDS):
+        """
+        Args:
+            redis: Redis service (defaults to the singleton)
+            refresh_interval: Seconds a fetched version is trusted before re-reading it
+                (0 reads it on every lookup)
+        """
+        self._redis = redis if redis is not None else redis_service
+        self.refresh_interval = refresh_interval
+        self.key_prefix = "kb:index_version:"
+        self._cache: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, index_name: str) -> str:
+        return f"{self.key_prefix}{index_name}"
+
+    def get_version(self, index_name: str) -> str:
+        """
+        Get the current version of an index.
+
+        Args:
+            index_name: Search index name
+
+        Returns:
+            Version string
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(index_name)
+            if cached and now - cached[1] < self.refresh_interval:
+                return cached[0]
+
+        version: Optional[str] = None
+        try:
+            value = self._redis.get(self._key(index_name))
+            if value is not None:
+                version = value.decode("utf-8") if isinstance(value, bytes) else str(value)
+        except Exception as e:
+            logger.error(f"Error reading index version: {str(e)}")
+        if version is None:
+            version = KB_INDEX_VERSION
+
+        with self._lock:
+            self._cache[index_name] = (version, now)
+        return version
+
+    def bump_version(self, index_name: str) -> str:
+        """
+        Publish a new version for an index, invalidating dependent caches.
+
+        Args:
+            index_name: Search index name
+
+        Returns:
+            The new version string
+        """
+        version = str(int(time.time() * 1000))
+        self._redis.set(self._key(index_name), version, 0)
+        with self._lock:
+            self._cache[index_name] = (version, time.monotonic())
+        logger.info(f"Index {index_name} is now at version {version}")
+        return version
+
+
+# Create a singleton instance
+index_version_service = IndexVersionService()
+
+
+if __name__ == "__main__":
+    from config import AZURE_SEARCH_INDEX
+
+    index = sys.argv[2] if len(sys.argv) > 2 else AZURE_SEARCH_INDEX
+    if len(sys.argv) > 1 and sys.argv[1] == "bump":
+        print(index_version_service.bump_version(index))
+    else:
+        print(index_version_service.get_version(index))
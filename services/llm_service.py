@@ -7,9 +7,9 @@ and prompt processing for the RAG application.
 
 import os
 import logging
-from openai import AzureOpenAI
 from db_manager import DatabaseManager
 from config import get_cost_rates
+from services.shared_clients import get_openai_client
 
 logger = logging.getLogger(__name__)
 
@@ -44,6 +44,18 @@ User: Printer firmware bug?
 ###
 """
 
+SUB_QUERY_SYSTEM_PROMPT = """
+You split end‑user questions into focused search queries for a Retrieval‑Augmented
+Generation search over an enterprise tech‑support knowledge base.
+
+Write up to {max_queries} short, self‑contained search queries that together cover the
+distinct aspects of the user's question (components, symptoms, procedures, error codes).
+If the question has a single aspect, return a single query.
+
+Output format
+Return one query per line as plain text—no numbering, bullets, quotes or commentary.
+"""
+
 PROMPT_ENHANCER_SYSTEM_MESSAGE_2XL = """
 IDENTITY and PURPOSE
 
@@ -89,12 +101,8 @@ def llm_helpee(input_text: str) -> str:
     Returns:
         str: The enhanced query
     """
-    # Prepare Azure OpenAI client
-    client = AzureOpenAI(
-        azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-        api_key=os.getenv("AZURE_OPENAI_KEY"),
-        api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-01")
-    )
+    # Shared, pooled client of the helpee deployment
+    client = get_openai_client(os.getenv("AZURE_OPENAI_MODEL"))
     
     # Debug: log full helpee payload before sending to Azure OpenAI
     logger.debug("Helpee payload: %s", {
@@ -171,12 +179,8 @@ def llm_helpee_2xl(input_text: str) -> str:
     Returns:
         str: The enhanced, detailed prompt
     """
-    # Prepare Azure OpenAI client
-    client = AzureOpenAI(
-        azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-        api_key=os.getenv("AZURE_OPENAI_KEY"),
-        api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-01")
-    )
+    # Shared, pooled client of the helpee deployment
+    client = get_openai_client(os.getenv("AZURE_OPENAI_MODEL"))
     
     response = client.chat.completions.create(
         model=os.getenv("AZURE_OPENAI_MODEL"),
@@ -0,0 +1,154 @@
+"""
+Turn Pipeline Helpers for RAGKA
+
+Shared thread pools and per-stage latency metrics for the staged request
+pipeline in ``EnhancedSimpleRedisRAGAssistant``:
+
+- ``stage_executor`` runs independent stages of a turn concurrently (the
+  history fetch alongside embedding + search)
+- ``retrieval_executor`` runs the fan-out of multi-query retrieval (kept
+  separate from ``stage_executor`` because a stage waits on these tasks)
+- ``background_executor`` runs post-answer work (summary, ``store_turn``,
+  query logging) off the response path
+- ``pipeline_metrics`` keeps a rolling window of durations per stage and
+  reports p50/p95 so the effect of the restructuring is observable
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+PIPELINE_STAGE_WORKERS = int(os.getenv("PIPELINE_STAGE_WORKERS", "16"))
+PIPELINE_RETRIEVAL_WORKERS = int(os.getenv("PIPELINE_RETRIEVAL_WORKERS", "32"))
+PIPELINE_BACKGROUND_WORKERS = int(os.getenv("PIPELINE_BACKGROUND_WORKERS", "4"))
+PIPELINE_METRICS_WINDOW = int(os.getenv("PIPELINE_METRICS_WINDOW", "1000"))
+# Seconds a turn waits for the previous turn of the same session to be stored
+PENDING_WRITE_TIMEOUT = float(os.getenv("PENDING_WRITE_TIMEOUT", "30"))
+
+# Executors create their threads lazily, so importing this module before
+# gunicorn forks does not leak threads into the workers.
+stage_executor = ThreadPoolExecutor(
+    max_workers=PIPELINE_STAGE_WORKERS, thread_name_prefix="rag-stage"
+)
+retrieval_executor = ThreadPoolExecutor(
+    max_workers=PIPELINE_RETRIEVAL_WORKERS, thread_name_prefix="rag-retrieval"
+)
+background_executor = ThreadPoolExecutor(
+    max_workers=PIPELINE_BACKGROUND_WORKERS, thread_name_prefix="rag-background"
+)
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100.0 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class PipelineMetrics:
+    """
+    Rolling per-stage latency statistics.
+
+    Each stage keeps its last ``window`` durations; ``get_stats`` reports the
+    count, mean, p50 and p95 in milliseconds.
+    """
+
+    def __init__(self, window: int = PIPELINE_METRICS_WINDOW):
+        self.window = window
+        self._durations: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float) -> None:
+        """Record one duration for ``stage``."""
+        with self._lock:
+            durations = self._durations.get(stage)
+            if durations is None:
+                durations = self._durations[stage] = deque(maxlen=self.window)
+            durations.append(seconds)
+            self._counts[stage] = self._counts.get(stage, 0) + 1
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Get latency statistics per stage.
+
+        Returns:
+            Mapping of stage name to ``count``, ``mean_ms``, ``p50_ms`` and ``p95_ms``
+        """
+        with self._lock:
+            snapshot = {stage: sorted(d) for stage, d in self._durations.items()}
+            counts = dict(self._counts)
+        stats = {}
+        for stage, values in snapshot.items():
+            stats[stage] = {
+                "count": counts[stage],
+                "mean_ms": 1000.0 * sum(values) / len(values) if values else 0.0,
+                "p50_ms": 1000.0 * _percentile(values, 50),
+                "p95_ms": 1000.0 * _percentile(values, 95),
+            }
+        return stats
+
+    def reset(self) -> None:
+        """Drop all recorded durations."""
+        with self._lock:
+            self._durations.clear()
+            self._counts.clear()
+
+
+class TurnTimings:
+    """
+    Stage timings for a single turn.
+
+    Stages may be timed from different threads; every duration is kept on the
+    turn (for logging) and forwarded to the shared ``PipelineMetrics``.
+    """
+
+    def __init__(self, metrics: "PipelineMetrics"):
+        self._metrics = metrics
+        self.durations: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as stage ``name``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.durations[name] = elapsed
+            self._metrics.record(name, elapsed)
+
+    def summary(self) -> str:
+        """Human-readable one-line summary of the turn's stages."""
+        return ", ".join(f"{name}={1000.0 * secs:.0f}ms" for name, secs in self.durations.items())
+
+
+def submit_background(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+    """
+    Run ``fn`` on the background executor, logging (not raising) failures.
+
+    Returns:
+        Future resolving to ``fn``'s result, or None if it raised
+    """
+
+    def run():
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            logger.error(f"Background task {getattr(fn, '__name__', fn)} failed: {str(e)}", exc_info=True)
+            return None
+
+    return background_executor.submit(run)
+
+
+# Create a singleton instance
+pipeline_metrics = PipelineMetrics()
@@ -0,0 +1,102 @@
+"""
+Query Expansion for RAGKA
+
+Produces alternative search queries for multi-query retrieval: the
+``llm_helpee``-style enhanced rewrite (same system prompt as the magic
+button) and, optionally, focused sub-queries for multi-part questions.
+Rewrites are cached in Redis so repeated questions cost one LLM call across
+all workers.
+"""
+
+import os
+import hashlib
+import logging
+from typing import List, Optional
+
+from services.redis_service import redis_service
+from services.embedding_cache import normalize_query
+from services.llm_service import QUERY_ENHANCER_SYSTEM_PROMPT, SUB_QUERY_SYSTEM_PROMPT
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+QUERY_REWRITE_CACHE_TTL = int(os.getenv("QUERY_REWRITE_CACHE_TTL", "86400"))  # 1 day
+
+
+def _clean_line(line: str) -> str:
+    """Strip list markers, arrows and surrounding quotes from a model output line."""
+    line = line.strip().lstrip("-•*→").strip()
+    if len(line) > 2 and line[0] == line[-1] and line[0] in "\"'":
+        line = line[1:-1].strip()
+    return line
+
+
+class QueryExpander:
+    """
+    Generates rewrites of a user query with the chat deployment.
+
+    Key pattern: query_rewrite:{kind}:{sha256(normalized query)} → list of queries
+    """
+
+    def __init__(self, openai_svc, redis=None, ttl: int = QUERY_REWRITE_CACHE_TTL):
+        """
+        Args:
+            openai_svc: ``OpenAIService`` used for the rewrite calls
+            redis: Redis service used to cache rewrites (defaults to the singleton)
+            ttl: Time in seconds before a cached rewrite expires
+        """
+        self.openai_svc = openai_svc
+        self._redis = redis if redis is not None else redis_service
+        self.ttl = ttl
+        self.key_prefix = "query_rewrite:"
+
+    def _key(self, kind: str, query: str) -> str:
+        digest = hashlib.sha256(normalize_query(query).encode("utf-8")).hexdigest()
+        return f"{self.key_prefix}{kind}:{digest}"
+
+    def _complete(self, kind: str, system_prompt: str, query: str) -> List[str]:
+        key = self._key(kind, query)
+        cached = self._redis.get(key)
+        if isinstance(cached, list):
+            return cached
+
+        answer = self.openai_svc.get_chat_response(
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": query},
+            ],
+            max_completion_tokens=200,
+        )
+        lines = [_clean_line(line) for line in (answer or "").splitlines()]
+        queries = [line for line in lines if line]
+        self._redis.set(key, queries, self.ttl)
+        return queries
+
+    def enhance(self, query: str) -> Optional[str]:
+        """
+        Rewrite a query into one recall-oriented search query.
+
+        Args:
+            query: Raw user query
+
+        Returns:
+            The enhanced query, or None if the model returned nothing
+        """
+        queries = self._complete("enhanced", QUERY_ENHANCER_SYSTEM_PROMPT, query)
+        return queries[0] if queries else None
+
+    def sub_queries(self, query: str, max_queries: int) -> List[str]:
+        """
+        Split a query into focused sub-queries.
+
+        Args:
+            query: Raw user query
+            max_queries: Maximum number of sub-queries
+
+        Returns:
+            Up to ``max_queries`` sub-queries (possibly empty)
+        """
+        if max_queries <= 0:
+            return []
+        prompt = SUB_QUERY_SYSTEM_PROMPT.format(max_queries=max_queries)
+        return self._complete(f"sub{max_queries}", prompt, query)[:max_queries]
@@ -0,0 +1,61 @@
+"""
+Rank fusion helpers for RAGKA
+
+Reciprocal-rank fusion (RRF) merges several ranked result lists without
+needing their scores to be comparable, which is how Azure AI Search combines
+the lexical and vector legs of a hybrid query.
+"""
+
+import hashlib
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence
+
+# Azure AI Search and the original RRF paper both use k=60
+RRF_K = 60
+
+
+def result_key(result: Dict[str, Any]) -> Hashable:
+    """Identity of a search result: its parent document plus a hash of the chunk text."""
+    chunk = result.get("chunk", "") or ""
+    return (result.get("parent_id", ""), hashlib.md5(chunk.encode("utf-8")).hexdigest())
+
+
+def reciprocal_rank_fusion(
+    ranked_lists: Sequence[Sequence[Dict[str, Any]]],
+    k: int = RRF_K,
+    top: Optional[int] = None,
+    key: Callable[[Dict[str, Any]], Hashable] = result_key,
+) -> List[Dict[str, Any]]:
+    """
+    Fuse ranked result lists with reciprocal-rank fusion.
+
+    Each result scores ``sum(1 / (k + rank))`` over the lists it appears in
+    (rank starting at 1). Results are deduplicated by ``key``; the first
+    occurrence supplies the returned dict.
+
+    Args:
+        ranked_lists: Result lists, each ordered best first
+        k: RRF damping constant
+        top: Maximum number of fused results (all when None)
+        key: Function returning the identity of a result
+
+    Returns:
+        Copies of the fused results, best first, with ``relevance`` set to the
+        RRF score
+    """
+    scores: Dict[Hashable, float] = {}
+    firsts: Dict[Hashable, Dict[str, Any]] = {}
+    for results in ranked_lists:
+        for rank, result in enumerate(results, 1):
+            identity = key(result)
+            scores[identity] = scores.get(identity, 0.0) + 1.0 / (k + rank)
+            firsts.setdefault(identity, result)
+
+    ordered = sorted(scores, key=scores.get, reverse=True)
+    if top is not None:
+        ordered = ordered[:top]
+    fused = []
+    for identity in ordered:
+        result = dict(firsts[identity])
+        result["relevance"] = scores[identity]
+        fused.append(result)
+    return fused
@@ -0,0 +1,197 @@
+"""
+Redis Value Codec for RAGKA
+
+Encodes values stored through ``RedisService`` with a one-byte
+self-describing header::
+
+    header = (compression << 4) | format
+
+    format:      1 = JSON, 2 = msgpack, 3 = raw bytes, 4 = UTF-8 str
+    compression: 0 = none, 1 = zlib, 2 = zstd
+
+Header bytes are control characters, which never start a JSON or text value
+written by the previous codec, so ``decode`` reads those old values side by
+side with new ones. Raw binary values written by the previous codec (such as
+the packed float32 vectors of the embedding cache) can start with any byte:
+one that starts with a header byte is misread, which fails to decode (a
+cache miss) or, for the raw-bytes header, loses its first byte. Such entries
+are only re-populated once they expire or are overwritten.
+
+Workers running the previous code cannot read headered values. Set
+``REDIS_CODEC=legacy`` on every worker before a rolling deploy, and switch to
+``json`` or ``msgpack`` only once all workers run this code.
+
+JSON uses orjson when it is installed; msgpack and zstd are used only when
+their packages are installed (falling back to JSON and zlib otherwise).
+Payloads are compressed only above ``REDIS_COMPRESS_THRESHOLD`` bytes and
+only if that saves at least ``REDIS_COMPRESS_MIN_SAVING`` of the size.
+"""
+
+import os
+import json
+import zlib
+import logging
+from typing import Any, Callable, Dict, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+REDIS_CODEC = os.getenv("REDIS_CODEC", "json").lower()  # json | msgpack | legacy
+REDIS_COMPRESSION = os.getenv("REDIS_COMPRESSION", "zstd").lower()  # zstd | zlib | none
+REDIS_COMPRESS_THRESHOLD = int(os.getenv("REDIS_COMPRESS_THRESHOLD", "1024"))
+REDIS_COMPRESS_MIN_SAVING = float(os.getenv("REDIS_COMPRESS_MIN_SAVING", "0.1"))
+
+FORMAT_JSON = 1
+FORMAT_MSGPACK = 2
+FORMAT_BYTES = 3
+FORMAT_STR = 4
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_ZSTD = 2
+
+_FORMATS = (FORMAT_JSON, FORMAT_MSGPACK, FORMAT_BYTES, FORMAT_STR)
+_COMPRESSIONS = (COMPRESSION_NONE, COMPRESSION_ZLIB, COMPRESSION_ZSTD)
+HEADER_BYTES = frozenset((c << 4) | f for c in _COMPRESSIONS for f in _FORMATS)
+
+
+def _json_dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def _json_loads(payload: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+def _compressors() -> Dict[int, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]]:
+    codecs = {COMPRESSION_ZLIB: (lambda data: zlib.compress(data, 6), zlib.decompress)}
+    if zstandard is not None:
+        compressor = zstandard.ZstdCompressor(level=3)
+        # ZstdDecompressor objects are not thread-safe; create one per call
+        codecs[COMPRESSION_ZSTD] = (
+            compressor.compress,
+            lambda data: zstandard.ZstdDecompressor().decompress(data),
+        )
+    return codecs
+
+
+class RedisCodec:
+    """
+    Serializes values for Redis with a self-describing header byte.
+    """
+
+    def __init__(
+        self,
+        serializer: str = REDIS_CODEC,
+        compression: str = REDIS_COMPRESSION,
+        threshold: int = REDIS_COMPRESS_THRESHOLD,
+        min_saving: float = REDIS_COMPRESS_MIN_SAVING,
+    ):
+        """
+        Args:
+            serializer: ``json``, ``msgpack`` or ``legacy`` (headerless JSON, the previous format)
+            compression: ``zstd``, ``zlib`` or ``none``
+            threshold: Minimum encoded size in bytes before compression is tried
+            min_saving: Minimum fraction of the size compression must save to be kept
+        """
+        if serializer == "msgpack" and msgpack is None:
+            logger.warning("msgpack is not installed, Redis values will be encoded as JSON")
+            serializer = "json"
+        self.serializer = serializer
+        self.threshold = threshold
+        self.min_saving = min_saving
+        self._codecs = _compressors()
+        self.compression = {
+            "zstd": COMPRESSION_ZSTD if COMPRESSION_ZSTD in self._codecs else COMPRESSION_ZLIB,
+            "zlib": COMPRESSION_ZLIB,
+        }.get(compression, COMPRESSION_NONE)
+
+    def encode(self, value: Any) -> bytes:
+        """
+        Encode a value for storage.
+
+        Args:
+            value: str, bytes or any JSON/msgpack-serializable value
+
+        Returns:
+            Header byte followed by the (possibly compressed) payload
+        """
+        if self.serializer == "legacy":
+            if isinstance(value, (str, bytes)):
+                return value
+            return json.dumps(value)
+
+        if isinstance(value, bytes):
+            fmt, payload = FORMAT_BYTES, value
+        elif isinstance(value, str):
+            fmt, payload = FORMAT_STR, value.encode("utf-8")
+        elif self.serializer == "msgpack":
+            fmt, payload = FORMAT_MSGPACK, msgpack.packb(value, use_bin_type=True)
+        else:
+            fmt, payload = FORMAT_JSON, _json_dumps(value)
+
+        compression = COMPRESSION_NONE
+        if self.compression and len(payload) >= self.threshold:
+            compressed = self._codecs[self.compression][0](payload)
+            if len(compressed) <= len(payload) * (1.0 - self.min_saving):
+                compression, payload = self.compression, compressed
+        return bytes(((compression << 4) | fmt,)) + payload
+
+    def decode(self, data: Any) -> Any:
+        """
+        Decode a stored value written by this codec or by the previous format.
+
+        Args:
+            data: Raw value read from Redis
+
+        Returns:
+            The decoded value (None for None)
+        """
+        if data is None:
+            return None
+        if isinstance(data, (bytes, bytearray)) and data and data[0] in HEADER_BYTES:
+            header = data[0]
+            compression, fmt = header >> 4, header & 0x0F
+            payload = bytes(data[1:])
+            if compression:
+                payload = self._decompress(compression, payload)
+            if fmt == FORMAT_JSON:
+                return _json_loads(payload)
+            if fmt == FORMAT_MSGPACK:
+                if msgpack is None:
+                    raise ValueError("msgpack value found but msgpack is not installed")
+                return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+            if fmt == FORMAT_STR:
+                return payload.decode("utf-8")
+            return payload
+
+        # Previous format: JSON if possible, otherwise the raw value
+        try:
+            return json.loads(data)
+        except Exception:
+            return data
+
+    def _decompress(self, compression: int, payload: bytes) -> bytes:
+        codec = self._codecs.get(compression)
+        if codec is None:
+            raise ValueError("zstd value found but zstandard is not installed")
+        return codec[1](payload)
@@ -0,0 +1,164 @@
+"""
+Shared Redis Connection Pool for RAGKA
+
+All Redis consumers in a process share one blocking connection pool:
+
+- ``get_redis_client()`` returns a client whose replies are bytes (the
+  ``RedisService`` facade, which handles decoding itself)
+- ``get_redis_client(decode_responses=True)`` returns a client whose replies
+  are decoded to str (e.g. ``SimpleRedisMemory``); decoding happens after the
+  reply is parsed, so both facades can borrow the same raw connections
+
+The transport is TCP by default. When ``REDIS_SOCKET_PATH`` points to an
+existing Unix socket (``startup.sh`` starts the co-located Redis with one), it
+is used instead, which avoids the TCP loopback overhead.
+
+redis-py resets a pool after ``fork()``, so the pool can be created before
+gunicorn forks its workers.
+"""
+
+import os
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+import redis
+from redis.client import Pipeline, Redis
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+REDIS_DB = int(os.getenv("REDIS_DB", "0"))
+REDIS_PASSWORD = os.getenv("REDIS_PASSWORD", None)
+REDIS_SOCKET_PATH = os.getenv("REDIS_SOCKET_PATH", "")
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "64"))
+# Seconds a thread waits for a free connection before failing
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "5"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "5"))
+REDIS_SOCKET_KEEPALIVE = os.getenv("REDIS_SOCKET_KEEPALIVE", "true").lower() == "true"
+# Idle connections are checked with a PING before reuse after this many seconds
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30"))
+
+_lock = threading.Lock()
+_pool: Optional[redis.ConnectionPool] = None
+_clients: Dict[bool, Redis] = {}
+
+
+def _decode(value: Any) -> Any:
+    """Recursively decode bytes in a parsed reply to str."""
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    if isinstance(value, tuple):
+        return tuple(_decode(v) for v in value)
+    if isinstance(value, dict):
+        return {_decode(k): _decode(v) for k, v in value.items()}
+    if isinstance(value, set):
+        return {_decode(v) for v in value}
+    return value
+
+
+class _DecodingMixin:
+    def parse_response(self, connection, command_name, **options):
+        return _decode(super().parse_response(connection, command_name, **options))
+
+
+class _DecodingPipeline(_DecodingMixin, Pipeline):
+    """Pipeline whose replies are decoded to str."""
+
+
+class DecodingRedis(_DecodingMixin, Redis):
+    """Redis client that decodes replies to str over a bytes connection pool."""
+
+    def pipeline(self, transaction=True, shard_hint=None) -> Pipeline:
+        return _DecodingPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+def _create_pool() -> redis.ConnectionPool:
+    common = {
+        "db": REDIS_DB,
+        "password": REDIS_PASSWORD,
+        "socket_timeout": REDIS_SOCKET_TIMEOUT,
+        "health_check_interval": REDIS_HEALTH_CHECK_INTERVAL,
+        "max_connections": REDIS_MAX_CONNECTIONS,
+        "timeout": REDIS_POOL_TIMEOUT,
+    }
+    if REDIS_SOCKET_PATH and os.path.exists(REDIS_SOCKET_PATH):
+        logger.info(f"Redis pool using Unix socket {REDIS_SOCKET_PATH}")
+        return redis.BlockingConnectionPool(
+            connection_class=redis.UnixDomainSocketConnection, path=REDIS_SOCKET_PATH, **common
+        )
+    if REDIS_SOCKET_PATH:
+        logger.warning(f"Redis socket {REDIS_SOCKET_PATH} not found, using TCP {REDIS_HOST}:{REDIS_PORT}")
+    return redis.BlockingConnectionPool(
+        host=REDIS_HOST,
+        port=REDIS_PORT,
+        socket_keepalive=REDIS_SOCKET_KEEPALIVE,
+        socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+        **common,
+    )
+
+
+def get_connection_pool() -> redis.ConnectionPool:
+    """
+    Get the process-wide Redis connection pool, creating it on first use.
+
+    Returns:
+        The shared blocking connection pool
+    """
+    global _pool
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                _pool = _create_pool()
+    return _pool
+
+
+def get_redis_client(decode_responses: bool = False) -> Redis:
+    """
+    Get a Redis client backed by the shared pool.
+
+    Args:
+        decode_responses: Return replies as str instead of bytes
+
+    Returns:
+        A shared client facade; clients are thread-safe and reused per reply type
+    """
+    client = _clients.get(decode_responses)
+    if client is None:
+        pool = get_connection_pool()
+        with _lock:
+            client = _clients.get(decode_responses)
+            if client is None:
+                client_class = DecodingRedis if decode_responses else Redis
+                client = _clients[decode_responses] = client_class(connection_pool=pool)
+    return client
+
+
+def describe_transport() -> str:
+    """Human-readable description of the pool's transport, for logging."""
+    kwargs = get_connection_pool().connection_kwargs
+    if "path" in kwargs:
+        return f"unix:{kwargs['path']}"
+    return f"{kwargs.get('host')}:{kwargs.get('port')}"
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """
+    Get usage of the shared pool in this process.
+
+    Returns:
+        Dictionary with the transport, configured maximum, and created/idle/in-use connection counts
+    """
+    pool = get_connection_pool()
+    stats: Dict[str, Any] = {"transport": describe_transport(), "max_connections": pool.max_connections}
+    try:
+        created = len(pool._connections)
+        idle = sum(1 for connection in list(pool.pool.queue) if connection is not None)
+        stats.update({"created": created, "idle": idle, "in_use": created - idle})
+    except Exception as e:
+        logger.debug(f"Could not inspect Redis pool: {str(e)}")
+    return stats
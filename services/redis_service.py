@@ -2,17 +2,96 @@
 Redis Service for RAGKA
 
 This module provides a simple interface to Redis operations for caching in the RAGKA system.
+
+Connection health is tracked from the outcome of real commands plus a
+periodic background heartbeat, instead of a PING before every command.
+While Redis is down, reconnects are attempted with exponential backoff so a
+dead server does not add a connect timeout to every request.
 """
 
 import os
 import json
+import time
 import logging
+import threading
 import redis
-from typing import Any, Dict, Optional, List, Union
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, List, Union
+from services.redis_codec import RedisCodec
+from services.redis_pool import describe_transport, get_pool_stats, get_redis_client
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Seconds between background PINGs (0 disables the heartbeat)
+REDIS_HEARTBEAT_INTERVAL = float(os.getenv("REDIS_HEARTBEAT_INTERVAL", "10"))
+REDIS_RECONNECT_BACKOFF_BASE = float(os.getenv("REDIS_RECONNECT_BACKOFF_BASE", "0.5"))
+REDIS_RECONNECT_BACKOFF_MAX = float(os.getenv("REDIS_RECONNECT_BACKOFF_MAX", "30"))
+REDIS_LATENCY_WINDOW = int(os.getenv("REDIS_LATENCY_WINDOW", "1000"))
+# COUNT hint per SCAN step in keys()/delete_pattern()
+REDIS_SCAN_COUNT = int(os.getenv("REDIS_SCAN_COUNT", "1000"))
+
+
+class RedisClientStats:
+    """
+    Client-side command counters: hits, misses, errors and latency.
+    """
+
+    def __init__(self, window: int = REDIS_LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self.commands = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.reconnects = 0
+
+    def record(self, seconds: float, error: bool = False) -> None:
+        """Record one command and its latency."""
+        with self._lock:
+            self.commands += 1
+            self._latencies.append(seconds)
+            if error:
+                self.errors += 1
+
+    def record_lookup(self, hit: bool) -> None:
+        """Record the outcome of a ``get``."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def record_reconnect(self) -> None:
+        with self._lock:
+            self.reconnects += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get the counters.
+
+        Returns:
+            Dictionary with command, hit, miss, error and reconnect counts and latency in ms
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = {
+                "commands": self.commands,
+                "hits": self.hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "reconnects": self.reconnects,
+            }
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        if latencies:
+            stats["latency_mean_ms"] = 1000.0 * sum(latencies) / len(latencies)
+            stats["latency_p50_ms"] = 1000.0 * latencies[len(latencies) // 2]
+            stats["latency_p95_ms"] = 1000.0 * latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)]
+            stats["latency_max_ms"] = 1000.0 * latencies[-1]
+        return stats
+
+
 class RedisService:
     def get_current_timestamp(self) -> int:
         """
@@ -27,23 +106,33 @@ class RedisService:
     """
     
     def __init__(self):
-        """Initialize the Redis service with connection parameters from environment variables."""
-        # Get Redis connection parameters from environment variables
-        self.host = os.getenv("REDIS_HOST", "localhost")
-        self.port = int(os.getenv("REDIS_PORT", "6379"))
-        self.db = int(os.getenv("REDIS_DB", "0"))
-        self.password = os.getenv("REDIS_PASSWORD", None)
+        """Initialize the Redis service; connections come from the shared pool in ``services.redis_pool``."""
         self.default_expiration = int(os.getenv("REDIS_DEFAULT_EXPIRATION", "3600"))  # 1 hour default
         
+        self.heartbeat_interval = REDIS_HEARTBEAT_INTERVAL
+        
         # Initialize Redis client
         self._client = None
         self._connected = False
+        self._stats = RedisClientStats()
+        # Reconnect backoff state
+        self._reconnect_lock = threading.Lock()
+        self._failures = 0
+        self._next_attempt = 0.0
+        # Heartbeat thread, restarted in each forked worker
+        self._heartbeat_pid: Optional[int] = None
+        self._heartbeat_lock = threading.Lock()
+        self._heartbeat_stop = threading.Event()
+        self.codec = RedisCodec()
+        # Registered Lua scripts, keyed by source (EVALSHA with EVAL fallback)
+        self._scripts: Dict[str, Any] = {}
         
         # Try to connect to Redis
         try:
             self._connect()
         except Exception as e:
             logger.warning(f"Failed to connect to Redis: {str(e)}")
+            self._schedule_retry()
     
     def _connect(self) -> None:
         """
@@ -53,18 +142,12 @@ class RedisService:
             redis.RedisError: If connection fails
         """
         try:
-            self._client = redis.Redis(
-                host=self.host,
-                port=self.port,
-                db=self.db,
-                password=self.password,
-                socket_timeout=5,
-                decode_responses=False  # We'll handle decoding ourselves
-            )
+            # Bytes facade over the shared pool; we'll handle decoding ourselves
+            self._client = get_redis_client()
             # Test connection
             self._client.ping()
             self._connected = True
-            logger.info(f"Connected to Redis at {self.host}:{self.port}")
+            logger.info(f"Connected to Redis at {describe_transport()}")
         except redis.RedisError as e:
             self._connected = False
             logger.error(f"Redis connection error: {str(e)}")
@@ -73,35 +156,109 @@ class RedisService:
     def is_connected(self) -> bool:
         """
         Check if connected to Redis.
+
+        This reports the health tracked from the last commands and heartbeats
+        and does not contact the server.
         
         Returns:
             True if connected, False otherwise
         """
-        if not self._connected or not self._client:
-            return False
-        
-        try:
-            self._client.ping()
-            return True
-        except:
-            self._connected = False
-            return False
+        self._ensure_heartbeat()
+        return self._connected and self._client is not None
     
     def reconnect(self) -> bool:
         """
         Attempt to reconnect to Redis if not connected.
+
+        Attempts are spaced with exponential backoff
+        (``REDIS_RECONNECT_BACKOFF_BASE`` doubling up to
+        ``REDIS_RECONNECT_BACKOFF_MAX`` seconds); calls in between return
+        False immediately.
         
         Returns:
             True if reconnected successfully, False otherwise
         """
         if self.is_connected():
             return True
-        
+        if time.monotonic() < self._next_attempt:
+            return False
+        if not self._reconnect_lock.acquire(blocking=False):
+            # Another thread is already reconnecting
+            return False
         try:
-            self._connect()
+            if self._connected:
+                return True
+            try:
+                self._connect()
+            except Exception:
+                delay = self._schedule_retry()
+                logger.warning(f"Redis reconnect failed, next attempt in {delay:.1f}s")
+                return False
+            self._failures = 0
+            self._next_attempt = 0.0
+            self._stats.record_reconnect()
             return True
-        except:
-            return False
+        finally:
+            self._reconnect_lock.release()
+
+    def _schedule_retry(self) -> float:
+        """Push back the next reconnect attempt; returns the delay in seconds."""
+        self._failures += 1
+        delay = min(REDIS_RECONNECT_BACKOFF_BASE * (2 ** (self._failures - 1)), REDIS_RECONNECT_BACKOFF_MAX)
+        self._next_attempt = time.monotonic() + delay
+        return delay
+
+    def _call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Run one client command, updating health state and counters.
+
+        Connection and timeout errors mark the service disconnected; all
+        errors are re-raised for the caller's own handling.
+        """
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except (redis.ConnectionError, redis.TimeoutError):
+            self._stats.record(time.perf_counter() - start, error=True)
+            if self._connected:
+                logger.warning("Lost connection to Redis")
+            self._connected = False
+            raise
+        except Exception:
+            self._stats.record(time.perf_counter() - start, error=True)
+            raise
+        self._stats.record(time.perf_counter() - start)
+        self._connected = True
+        return result
+
+    def _ensure_heartbeat(self) -> None:
+        """Start the heartbeat thread in this process if it is not running."""
+        if self.heartbeat_interval <= 0 or self._heartbeat_pid == os.getpid():
+            return
+        with self._heartbeat_lock:
+            if self._heartbeat_pid == os.getpid():
+                return
+            self._heartbeat_pid = os.getpid()
+            self._heartbeat_stop = threading.Event()
+            thread = threading.Thread(target=self._heartbeat, name="redis-heartbeat", daemon=True)
+            thread.start()
+
+    def _heartbeat(self) -> None:
+        """PING while connected, reconnect (with backoff) while not."""
+        stop = self._heartbeat_stop
+        while not stop.wait(self.heartbeat_interval):
+            try:
+                if self._connected and self._client is not None:
+                    self._call(self._client.ping)
+                else:
+                    self.reconnect()
+            except Exception as e:
+                logger.debug(f"Redis heartbeat failed: {str(e)}")
+
+    def stop_heartbeat(self) -> None:
+        """Stop the background heartbeat of this process."""
+        self._heartbeat_stop.set()
+        self._heartbeat_pid = None
     
     def get(self, key: str) -> Optional[Any]:
         """
@@ -117,19 +274,91 @@ class RedisService:
             return None
         
         try:
-            value = self._client.get(key)
-            if value is None:
-                return None
-            
-            # Try to deserialize JSON
-            try:
-                return json.loads(value)
-            except:
-                # If not JSON, return as is
-                return value
+            value = self._call(self._client.get, key)
+            self._stats.record_lookup(value is not None)
+            return self._deserialize(value)
         except Exception as e:
             logger.error(f"Error getting from Redis: {str(e)}")
             return None
+
+    def _deserialize(self, value: Optional[bytes]) -> Optional[Any]:
+        """Decode a stored value with the codec; undecodable values read as missing."""
+        try:
+            return self.codec.decode(value)
+        except Exception as e:
+            logger.warning(f"Could not decode Redis value: {str(e)}")
+            return None
+
+    def mget(self, keys: List[str]) -> List[Optional[Any]]:
+        """
+        Get several values in one round-trip.
+        
+        Args:
+            keys: The cache keys
+            
+        Returns:
+            The cached values in key order (None where not found); all None on error
+        """
+        if not keys:
+            return []
+        if not self.is_connected() and not self.reconnect():
+            return [None] * len(keys)
+        
+        try:
+            values = self._call(self._client.mget, keys)
+            for value in values:
+                self._stats.record_lookup(value is not None)
+            return [self._deserialize(value) for value in values]
+        except Exception as e:
+            logger.error(f"Error getting multiple keys from Redis: {str(e)}")
+            return [None] * len(keys)
+
+    def hgetall(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Get all fields of a hash.
+        
+        Args:
+            key: The hash key
+            
+        Returns:
+            Mapping of field name to decoded value (empty if the key does not
+            exist), or None if Redis is unavailable or the key is not a hash
+        """
+        if not self.is_connected() and not self.reconnect():
+            return None
+        
+        try:
+            fields = self._call(self._client.hgetall, key)
+            self._stats.record_lookup(bool(fields))
+            return {
+                (field.decode('utf-8') if isinstance(field, bytes) else field): self._deserialize(value)
+                for field, value in fields.items()
+            }
+        except Exception as e:
+            logger.error(f"Error getting hash from Redis: {str(e)}")
+            return None
+    
+    def hget(self, key: str, field: str) -> Optional[Any]:
+        """
+        Get one field of a hash.
+        
+        Args:
+            key: The hash key
+            field: The field name
+            
+        Returns:
+            The decoded value or None if not found
+        """
+        if not self.is_connected() and not self.reconnect():
+            return None
+        
+        try:
+            value = self._call(self._client.hget, key, field)
+            self._stats.record_lookup(value is not None)
+            return self._deserialize(value)
+        except Exception as e:
+            logger.error(f"Error getting hash field from Redis: {str(e)}")
+            return None
     
     def set(self, key: str, value: Any, expiration: Optional[int] = None) -> bool:
         """
@@ -138,7 +367,8 @@ class RedisService:
         Args:
             key: The cache key
             value: The value to cache
-            expiration: Time in seconds until expiration (uses default if None)
+            expiration: Time in seconds until expiration (uses default if None,
+                no expiry if 0)
             
         Returns:
             True if successful, False otherwise
@@ -147,21 +377,48 @@ class RedisService:
             return False
         
         try:
-            # Serialize value if it's not a string
-            if not isinstance(value, (str, bytes)):
-                value = json.dumps(value)
+            # Serialize value with the codec (header byte + optional compression)
+            value = self.codec.encode(value)
             
-            # Use default expiration if not specified
+            # Use default expiration if not specified (0 keeps the key without expiry)
             if expiration is None:
                 expiration = self.default_expiration
             
             # Set in Redis
-            self._client.set(key, value, ex=expiration)
+            self._call(self._client.set, key, value, ex=expiration or None)
             return True
         except Exception as e:
             logger.error(f"Error setting in Redis: {str(e)}")
             return False
     
+    def set_many_nx(self, values: Dict[str, Any], expiration: int) -> bool:
+        """
+        Store values whose key does not exist yet and refresh the expiry of all
+        of them, in one pipelined round-trip.
+        
+        Args:
+            values: Mapping of key to value
+            expiration: Time in seconds until expiration
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        if not values:
+            return True
+        if not self.is_connected() and not self.reconnect():
+            return False
+        
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            for key, value in values.items():
+                pipe.set(key, self.codec.encode(value), ex=expiration, nx=True)
+                pipe.expire(key, expiration)
+            self._call(pipe.execute)
+            return True
+        except Exception as e:
+            logger.error(f"Error setting multiple keys in Redis: {str(e)}")
+            return False
+    
     def delete(self, key: str) -> bool:
         """
         Delete a value from Redis.
@@ -176,7 +433,7 @@ class RedisService:
             return False
         
         try:
-            result = self._client.delete(key)
+            result = self._call(self._client.delete, key)
             return result > 0
         except Exception as e:
             logger.error(f"Error deleting from Redis: {str(e)}")
@@ -193,7 +450,7 @@ class RedisService:
             return False
         
         try:
-            self._client.flushdb()
+            self._call(self._client.flushdb)
             return True
         except Exception as e:
             logger.error(f"Error flushing Redis: {str(e)}")
@@ -210,7 +467,7 @@ class RedisService:
             return {"connected": False}
         
         try:
-            info = self._client.info()
+            info = self._call(self._client.info)
             return {
                 "connected": True,
                 "mode": info.get("redis_mode", "standalone"),
@@ -226,6 +483,9 @@ class RedisService:
     def keys(self, pattern: str) -> List[str]:
         """
         Get keys matching a pattern.
+
+        Uses cursor-based ``SCAN`` rather than ``KEYS``, so large keyspaces
+        are walked in small steps without blocking other clients.
         
         Args:
             pattern: The pattern to match
@@ -237,9 +497,15 @@ class RedisService:
             return []
         
         try:
-            keys = self._client.keys(pattern)
-            # Convert bytes to strings
-            return [k.decode('utf-8') if isinstance(k, bytes) else k for k in keys]
+            keys = []
+            cursor = 0
+            while True:
+                cursor, batch = self._call(self._client.scan, cursor, match=pattern, count=REDIS_SCAN_COUNT)
+                keys.extend(batch)
+                if not cursor:
+                    break
+            # Convert bytes to strings (SCAN may return a key more than once)
+            return list(dict.fromkeys(k.decode('utf-8') if isinstance(k, bytes) else k for k in keys))
         except Exception as e:
             logger.error(f"Error getting Redis keys: {str(e)}")
             return []
@@ -262,33 +528,72 @@ class RedisService:
             if not keys:
                 return 0
             
-            # Delete keys in batches to avoid blocking Redis
+            # Unlink keys in batches; memory is reclaimed in the background
             deleted = 0
             batch_size = 100
             for i in range(0, len(keys), batch_size):
                 batch = keys[i:i+batch_size]
-                deleted += self._client.delete(*batch)
+                deleted += self._call(self._client.unlink, *batch)
             
             return deleted
         except Exception as e:
             logger.error(f"Error deleting Redis keys by pattern: {str(e)}")
             return 0
     
+    def run_script(self, script: str, keys: List[str], args: List[Any]) -> Optional[Any]:
+        """
+        Run a Lua script atomically in a single round-trip.
+
+        The script is sent once and then invoked by SHA.
+
+        Args:
+            script: Lua source
+            keys: KEYS passed to the script
+            args: ARGV passed to the script
+
+        Returns:
+            The script's reply, or None if Redis is unavailable or the script failed
+        """
+        if not self.is_connected() and not self.reconnect():
+            return None
+
+        try:
+            registered = self._scripts.get(script)
+            if registered is None:
+                registered = self._scripts[script] = self._client.register_script(script)
+            return self._call(registered, keys=keys, args=args, client=self._client)
+        except Exception as e:
+            logger.error(f"Error running Redis script: {str(e)}")
+            return None
+
+    def get_client_stats(self) -> Dict[str, Any]:
+        """
+        Get this process's command counters (no Redis round-trip).
+
+        Returns:
+            Dictionary with connection state, hit/miss/error counts and latency
+        """
+        stats = self._stats.snapshot()
+        stats["connected"] = self._connected
+        stats["consecutive_reconnect_failures"] = self._failures
+        stats["pool"] = get_pool_stats()
+        return stats
+
     def get_stats(self) -> Dict[str, Any]:
         """
         Get Redis statistics.
         
         Returns:
-            Dictionary with Redis statistics
+            Dictionary with Redis statistics, including the client counters under ``client``
         """
         if not self.is_connected() and not self.reconnect():
-            return {"connected": False}
+            return {"connected": False, "client": self.get_client_stats()}
         
         try:
-            info = self._client.info()
+            info = self._call(self._client.info)
             stats = {
                 "connected": True,
-                "total_keys": self._client.dbsize(),
+                "total_keys": self._call(self._client.dbsize),
                 "memory_used": info.get("used_memory_human", "unknown"),
                 "memory_peak": info.get("used_memory_peak_human", "unknown"),
                 "uptime": info.get("uptime_in_days", 0),
@@ -301,10 +606,11 @@ class RedisService:
             if hits + misses > 0:
                 stats["hit_rate"] = hits / (hits + misses)
             
+            stats["client"] = self.get_client_stats()
             return stats
         except Exception as e:
             logger.error(f"Error getting Redis stats: {str(e)}")
-            return {"connected": False, "error": str(e)}
+            return {"connected": False, "error": str(e), "client": self.get_client_stats()}
 
 
 # Create a singleton instance
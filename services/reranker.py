@@ -0,0 +1,88 @@
+"""
+Local Re-ranking for RAGKA
+
+Maximal-marginal-relevance (MMR) selection over the candidate chunks of a
+search, computed in NumPy from the chunk vectors returned by the vector
+store. Each pick balances similarity to the query against similarity to the
+chunks already picked, so near-duplicate chunks (the same paragraph indexed
+from two manuals, overlapping chunk windows) do not crowd out the prompt.
+"""
+
+import logging
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def _strip_vector(result: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in result.items() if key != "vector"}
+
+
+def mmr_select(
+    query_vector: Sequence[float],
+    results: List[Dict[str, Any]],
+    k: int,
+    lambda_mult: float = 0.7,
+) -> List[Dict[str, Any]]:
+    """
+    Pick a diverse top-k from search candidates with maximal marginal relevance.
+
+    ``score(d) = lambda * sim(q, d) - (1 - lambda) * max(sim(d, s) for s in selected)``
+
+    Args:
+        query_vector: Query embedding
+        results: Candidates, each with a ``vector`` entry (see
+            ``VectorStore.search(include_vectors=True)``)
+        k: Number of results to select
+        lambda_mult: Relevance/diversity trade-off (1.0 = pure relevance)
+
+    Returns:
+        Copies of the selected results in pick order, without ``vector``, with
+        ``relevance`` set to the cosine similarity to the query. If any
+        candidate lacks a vector, the candidates are returned by their search
+        score instead.
+    """
+    if not results or k <= 0:
+        return []
+    if any(r.get("vector") is None for r in results):
+        logger.debug("Candidates without vectors; skipping MMR and keeping search order")
+        ranked = sorted(results, key=lambda r: r.get("relevance", 0.0), reverse=True)
+        return [_strip_vector(r) for r in ranked[:k]]
+
+    vectors = np.vstack([np.asarray(r["vector"], dtype=np.float32) for r in results])
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    vectors /= norms
+    query = np.asarray(query_vector, dtype=np.float32)
+    query_norm = np.linalg.norm(query)
+    if query_norm:
+        query = query / query_norm
+
+    relevance = vectors @ query
+    similarity = vectors @ vectors.T
+    k = min(k, len(results))
+
+    selected: List[int] = []
+    available = np.ones(len(results), dtype=bool)
+    # Highest similarity of each candidate to anything selected so far
+    redundancy = np.full(len(results), -np.inf, dtype=np.float32)
+    for _ in range(k):
+        if selected:
+            scores = lambda_mult * relevance - (1.0 - lambda_mult) * redundancy
+        else:
+            scores = relevance.copy()
+        scores[~available] = -np.inf
+        pick = int(np.argmax(scores))
+        selected.append(pick)
+        available[pick] = False
+        redundancy = np.maximum(redundancy, similarity[pick])
+
+    picked = []
+    for i in selected:
+        result = _strip_vector(results[i])
+        result["relevance"] = float(relevance[i])
+        picked.append(result)
+    return picked
@@ -0,0 +1,161 @@
+"""
+Search Result Cache for RAGKA
+
+Caches the final prioritized chunk list produced by ``_search_kb`` in Redis,
+so identical (after normalization) queries from any gunicorn worker skip the
+embedding call, the hybrid search and the hierarchy/prioritization passes.
+Entries are stamped with the KB index version; bumping the version after a
+re-index makes every existing entry unreachable at once.
+"""
+
+import os
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from config import AZURE_SEARCH_INDEX
+from services.redis_service import redis_service
+from services.embedding_cache import normalize_query
+from services.index_version import IndexVersionService, index_version_service
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", "3600"))  # 1 hour
+
+
+class SearchResultCache:
+    """
+    Redis-backed cache of prioritized search results.
+
+    Key pattern: search_cache:{index_name}:{store}:{index_version}:{mode}:{top_k}:{sha256(normalized query)}
+
+    ``store`` is the ``cache_id`` of the vector store that produced the
+    results: its backend and, for local stores, the build of the index files.
+
+    The version is part of the key, so a version bump switches every worker to
+    a fresh key space in one step; stale entries simply age out via their TTL.
+    The version is also stored inside each entry and checked on read.
+    """
+
+    def __init__(
+        self,
+        redis=None,
+        ttl: int = SEARCH_CACHE_TTL,
+        enabled: bool = SEARCH_CACHE_ENABLED,
+        index_versions: Optional[IndexVersionService] = None,
+    ):
+        """
+        Args:
+            redis: Redis service (defaults to the singleton)
+            ttl: Time in seconds before an entry expires
+            enabled: Whether lookups and stores do anything
+            index_versions: Index version service (defaults to the singleton)
+        """
+        self._redis = redis if redis is not None else redis_service
+        self.ttl = ttl
+        self.enabled = enabled
+        self._index_versions = index_versions or index_version_service
+        self.key_prefix = "search_cache:"
+
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def _key(self, query: str, top_k: int, index_name: str, version: str, mode: str, store: str) -> str:
+        digest = hashlib.sha256(normalize_query(query).encode("utf-8")).hexdigest()
+        return f"{self.key_prefix}{index_name}:{store}:{version}:{mode}:{top_k}:{digest}"
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self._hits += 1
+            else:
+                self._misses += 1
+
+    def get(
+        self,
+        query: str,
+        top_k: int,
+        index_name: str = AZURE_SEARCH_INDEX,
+        mode: str = "single",
+        store: str = "azure",
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Get cached search results.
+
+        Args:
+            query: Raw user query
+            top_k: Number of results the caller returns
+            index_name: Search index name
+            mode: Retrieval settings that produced the results (e.g. "single" or "multi3-mmr")
+            store: ``cache_id`` of the vector store that produced the results
+
+        Returns:
+            The cached result list, or None on a miss
+        """
+        if not self.enabled:
+            return None
+        version = self._index_versions.get_version(index_name)
+        try:
+            entry = self._redis.get(self._key(query, top_k, index_name, version, mode, store))
+        except Exception as e:
+            logger.error(f"Error reading search cache: {str(e)}")
+            entry = None
+        if isinstance(entry, dict) and entry.get("version") == version:
+            self._count(True)
+            return entry.get("results", [])
+        self._count(False)
+        return None
+
+    def set(
+        self,
+        query: str,
+        top_k: int,
+        results: List[Dict[str, Any]],
+        index_name: str = AZURE_SEARCH_INDEX,
+        mode: str = "single",
+        store: str = "azure",
+    ) -> bool:
+        """
+        Cache search results.
+
+        Args:
+            query: Raw user query
+            top_k: Number of results the caller returns
+            results: Prioritized result list
+            index_name: Search index name
+            mode: Retrieval settings that produced the results (e.g. "single" or "multi3-mmr")
+            store: ``cache_id`` of the vector store that produced the results
+
+        Returns:
+            True if stored, False otherwise
+        """
+        if not self.enabled or not results:
+            return False
+        version = self._index_versions.get_version(index_name)
+        entry = {"version": version, "results": results}
+        return self._redis.set(self._key(query, top_k, index_name, version, mode, store), entry, self.ttl)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with cache statistics
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "ttl": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+            }
+
+
+# Create a singleton instance
+search_cache = SearchResultCache()
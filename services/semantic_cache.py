@@ -0,0 +1,225 @@
+"""
+Semantic Response Cache for RAGKA
+
+Caches answers to history-free turns keyed on the query embedding. A new
+query is answered from the cache when a previous query's embedding has a
+cosine similarity above a configurable threshold, so paraphrases such as
+"GC won't ignite" and "Agilent GC ignition failure" skip both retrieval and
+the chat deployment. Entries are dropped as soon as the KB index version
+changes, and only answer queries made with the same answer variant (chat
+deployment and answer-affecting settings, see
+``EnhancedSimpleRedisRAGAssistant.answer_variant``).
+
+Disabled unless ``SEMANTIC_CACHE_ENABLED=true``: a hit returns another user's
+answer to a merely similar question, which has to be acceptable for the
+deployment.
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import AZURE_SEARCH_INDEX
+from services.index_version import IndexVersionService, index_version_service
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", "86400"))  # 1 day
+
+
+class SemanticResponseCache:
+    """
+    In-process nearest-neighbour cache of answers.
+
+    Query embeddings are kept L2-normalized in one float32 matrix used as a
+    ring buffer, so a lookup is a single matrix-vector product; the oldest
+    entry is overwritten once ``max_entries`` is reached.
+
+    Each entry stores the raw LLM answer (with ``[n]`` markers), the
+    pre-registration citation list and the turn summary, so a hit goes
+    through the normal citation registration for the requesting session.
+    """
+
+    def __init__(
+        self,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        ttl: int = SEMANTIC_CACHE_TTL,
+        enabled: bool = SEMANTIC_CACHE_ENABLED,
+        index_name: str = AZURE_SEARCH_INDEX,
+        index_versions: Optional[IndexVersionService] = None,
+    ):
+        """
+        Args:
+            threshold: Minimum cosine similarity for a hit
+            max_entries: Maximum number of cached answers
+            ttl: Seconds an entry stays valid
+            enabled: Whether lookups and stores do anything
+            index_name: Search index whose version stamps the entries
+            index_versions: Index version service (defaults to the singleton)
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        self.index_name = index_name
+        self._index_versions = index_versions or index_version_service
+
+        self._matrix: Optional[np.ndarray] = None
+        self._entries: List[Optional[Dict[str, Any]]] = []
+        self._next_slot = 0
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    def _check_version(self) -> str:
+        """Clear the cache if the index version moved. Caller holds the lock."""
+        version = self._index_versions.get_version(self.index_name)
+        if version != self._version:
+            if self._entries:
+                self._invalidations += 1
+                logger.info(f"Index version changed to {version}; dropping {len(self._entries)} cached answers")
+            self._matrix = None
+            self._entries = []
+            self._next_slot = 0
+            self._version = version
+        return version
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def lookup(self, embedding: List[float], variant: str = "") -> Optional[Dict[str, Any]]:
+        """
+        Find a cached answer for a semantically equivalent query.
+
+        Args:
+            embedding: Query embedding
+            variant: Answer variant the answer must have been stored under
+
+        Returns:
+            Dict with ``query``, ``answer``, ``citations``, ``summary`` and
+            ``similarity``, or None on a miss
+        """
+        if not self.enabled or not embedding:
+            return None
+        query = self._normalize(embedding)
+        if query is None:
+            return None
+
+        with self._lock:
+            self._check_version()
+            if self._matrix is None or not self._entries:
+                self._misses += 1
+                return None
+            similarities = self._matrix[: len(self._entries)] @ query
+            now = time.time()
+            for slot in np.argsort(-similarities):
+                similarity = float(similarities[slot])
+                if similarity < self.threshold:
+                    break
+                entry = self._entries[slot]
+                if entry is not None and entry["variant"] == variant and now - entry["created_at"] < self.ttl:
+                    self._hits += 1
+                    hit = dict(entry)
+                    hit["citations"] = [dict(c) for c in entry["citations"]]
+                    hit["similarity"] = similarity
+                    return hit
+            self._misses += 1
+            return None
+
+    def store(
+        self,
+        query: str,
+        embedding: List[float],
+        answer: str,
+        citations: List[Dict[str, Any]],
+        summary: Optional[str] = None,
+        variant: str = "",
+    ) -> None:
+        """
+        Cache the answer to a history-free turn.
+
+        Args:
+            query: User query
+            embedding: Query embedding
+            answer: Raw LLM answer with ``[n]`` citation markers
+            citations: Citations in ``[n]`` order, before session registration
+            summary: Turn summary stored alongside the answer in session memory
+            variant: Answer variant (deployment and settings) the answer was made with
+        """
+        if not self.enabled or not embedding or not answer:
+            return
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+
+        entry = {
+            "query": query,
+            "answer": answer,
+            "citations": [dict(c) for c in citations],
+            "summary": summary,
+            "variant": variant,
+            "created_at": time.time(),
+        }
+        with self._lock:
+            self._check_version()
+            if self._matrix is None:
+                self._matrix = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+            elif self._matrix.shape[1] != len(vector):
+                logger.warning("Embedding dimensionality changed; resetting semantic cache")
+                self._matrix = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+                self._entries = []
+                self._next_slot = 0
+
+            slot = self._next_slot
+            self._matrix[slot] = vector
+            if slot < len(self._entries):
+                self._entries[slot] = entry
+            else:
+                self._entries.append(entry)
+            self._next_slot = (slot + 1) % self.max_entries
+
+    def clear(self) -> None:
+        """Drop all cached answers."""
+        with self._lock:
+            self._matrix = None
+            self._entries = []
+            self._next_slot = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with cache statistics
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "threshold": self.threshold,
+                "index_version": self._version,
+                "hits": self._hits,
+                "misses": self._misses,
+                "invalidations": self._invalidations,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+            }
+
+
+# Create a singleton instance
+semantic_cache = SemanticResponseCache()
@@ -15,15 +15,67 @@ from services.redis_service import redis_service
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Atomic batch registration. Every key is passed in KEYS and hash-tagged with the
+# session id, so the script also runs on Redis Cluster.
+# KEYS[1] = counter, KEYS[2] = registry hash, KEYS[3] = lookup hash (source hash → ID),
+# KEYS[4] = sources hash (ID → entry)
+# ARGV[1] = expiration, ARGV[2] = timestamp, then one (source hash, source JSON) pair per source.
+# The session's keys expire together and every registration refreshes them, so a
+# known source keeps its ID for as long as the session is active.
+# Returns the citation IDs in order.
+_REGISTER_SCRIPT = """
+local ttl = tonumber(ARGV[1])
+local now = tonumber(ARGV[2])
+
+local ids = {}
+for i = 3, #ARGV, 2 do
+    local source_hash = ARGV[i]
+    local source = cjson.decode(ARGV[i + 1])
+    local title = source['title']
+    if title == nil then
+        title = ''
+    end
+
+    local citation_id = tonumber(redis.call('HGET', KEYS[3], source_hash))
+    if not citation_id then
+        citation_id = redis.call('INCR', KEYS[1])
+        redis.call('HSET', KEYS[3], source_hash, citation_id)
+        local entry = {citation_id = citation_id, title = source['title'], id = source['id'], hash = source_hash}
+        if entry['title'] == nil then
+            entry['title'] = 'Source ' .. citation_id
+        end
+        if entry['id'] == nil then
+            entry['id'] = 'source_' .. citation_id
+        end
+        redis.call('HSET', KEYS[4], citation_id, cjson.encode(entry))
+    end
+
+    redis.call('HSET', KEYS[2], citation_id, cjson.encode({title = title, hash = source_hash, registered_at = now}))
+    ids[#ids + 1] = citation_id
+end
+
+for i = 1, #KEYS do
+    redis.call('EXPIRE', KEYS[i], ttl)
+end
+return ids
+"""
+
+# Unlink the session's keys atomically. Returns the number of keys removed.
+_CLEAR_SCRIPT = """
+return redis.call('UNLINK', unpack(KEYS))
+"""
+
 class SessionCitationRegistry:
     """
     Service for managing session-wide citations in Redis.
     
-    Key patterns:
-    - session:{session_id}:citations:registry → Hash of all unique sources with their citation IDs
+    Key patterns (the session id is a hash tag, so a session's keys share a
+    Redis Cluster slot):
+    - session:{session_id}:citations:registry → Hash of citation ID → JSON summary (title, hash, registered_at)
     - session:{session_id}:citations:counter → Global citation counter for the session
-    - session:{session_id}:citations:source:{citation_id} → Full source data
-    - session:{session_id}:citations:lookup:{source_hash} → Maps source hash to citation ID
+    - session:{session_id}:citations:sources → Hash of citation ID → entry (ID, title, source ID, hash)
+    - session:{session_id}:citations:lookup → Hash of source hash → citation ID
+    - citation_chunk:{source_hash} → Content and URL of a source, shared by all sessions
     
     This ensures consistent citation numbering across all messages in a session.
     """
@@ -32,6 +84,8 @@ class SessionCitationRegistry:
         """Initialize the session citation registry."""
         self.citation_expiration = 43200  # 12 hours
         self.registry_prefix = "session:"
+        # Content-addressed store shared by all sessions
+        self.chunk_prefix = "citation_chunk:"
         
         logger.info("Session citation registry initialized")
     
@@ -52,25 +106,48 @@ class SessionCitationRegistry:
         
         return hashlib.md5(hash_input.encode('utf-8')).hexdigest()[:12]
     
+    def _get_session_prefix(self, session_id: str) -> str:
+        """Get the hash-tagged key prefix of a session's citation keys."""
+        return f"{self.registry_prefix}{{{session_id}}}:citations:"
+
     def _get_registry_key(self, session_id: str) -> str:
         """Get the registry key for a session."""
-        return f"{self.registry_prefix}{session_id}:citations:registry"
+        return f"{self._get_session_prefix(session_id)}registry"
     
     def _get_counter_key(self, session_id: str) -> str:
         """Get the counter key for a session."""
-        return f"{self.registry_prefix}{session_id}:citations:counter"
-    
-    def _get_source_key(self, session_id: str, citation_id: int) -> str:
-        """Get the source storage key for a citation ID."""
-        return f"{self.registry_prefix}{session_id}:citations:source:{citation_id}"
+        return f"{self._get_session_prefix(session_id)}counter"
     
-    def _get_lookup_key(self, session_id: str, source_hash: str) -> str:
-        """Get the lookup key for a source hash."""
-        return f"{self.registry_prefix}{session_id}:citations:lookup:{source_hash}"
+    def _get_chunk_key(self, source_hash: str) -> str:
+        """Get the shared chunk store key for a source hash."""
+        return f"{self.chunk_prefix}{source_hash}"
+
+    def _get_sources_key(self, session_id: str) -> str:
+        """Get the key of the hash of citation entries by citation ID."""
+        return f"{self._get_session_prefix(session_id)}sources"
+
+    def _get_lookup_key(self, session_id: str) -> str:
+        """Get the key of the hash mapping source hashes to citation IDs."""
+        return f"{self._get_session_prefix(session_id)}lookup"
+
+    def _get_session_keys(self, session_id: str) -> List[str]:
+        """Keys of a session: counter, registry, lookup and sources."""
+        return [
+            self._get_counter_key(session_id),
+            self._get_registry_key(session_id),
+            self._get_lookup_key(session_id),
+            self._get_sources_key(session_id),
+        ]
     
     def register_sources(self, session_id: str, sources: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Register sources in the session citation registry and return sources with citation IDs.
+
+        The content of the sources is written to the shared chunk store first.
+        The session's part of the batch (lookups, new IDs, source entries and
+        registry summary) is then applied by ``_REGISTER_SCRIPT`` in one atomic
+        Redis round-trip, so concurrent requests on the same session never
+        assign two IDs to the same source or the same ID to two sources.
         
         Args:
             session_id: Session identifier
@@ -79,50 +156,42 @@ class SessionCitationRegistry:
         Returns:
             List of sources with assigned citation IDs
         """
-        if not redis_service.is_connected():
-            logger.warning("Redis not available for citation registry")
-            return self._fallback_sources(sources)
-        
+        sources = [source for source in sources if isinstance(source, dict)]
+        if not sources:
+            return []
+
         try:
-            registered_sources = []
-            
-            for source in sources:
-                if not isinstance(source, dict):
-                    continue
-                
-                # Generate hash for this source
-                source_hash = self._generate_source_hash(source)
-                lookup_key = self._get_lookup_key(session_id, source_hash)
-                
-                # Check if source already exists
-                existing_citation_id = redis_service.get(lookup_key)
-                
-                if existing_citation_id:
-                    # Source already exists, reuse citation ID
-                    citation_id = int(existing_citation_id)
-                    logger.debug(f"Reusing citation ID {citation_id} for existing source")
-                else:
-                    # New source, assign new citation ID
-                    citation_id = self._get_next_citation_id(session_id)
-                    
-                    # Store the lookup mapping
-                    redis_service.set(lookup_key, citation_id, self.citation_expiration)
-                    
-                    # Store the full source data
-                    source_key = self._get_source_key(session_id, citation_id)
-                    source_data = {
-                        'citation_id': citation_id,
-                        'title': source.get('title', f'Source {citation_id}'),
+            hashes = [self._generate_source_hash(source) for source in sources]
+            # Shared chunks: created once, their expiry refreshed by every session that cites them
+            redis_service.set_many_nx(
+                {
+                    self._get_chunk_key(source_hash): {
+                        'title': source.get('title'),
                         'content': source.get('content', ''),
                         'url': source.get('url', ''),
-                        'id': source.get('id', f'source_{citation_id}'),
-                        'hash': source_hash
                     }
-                    redis_service.set(source_key, source_data, self.citation_expiration)
-                    
-                    logger.debug(f"Assigned new citation ID {citation_id} to source")
-                
-                # Add citation info to source
+                    for source, source_hash in zip(sources, hashes)
+                },
+                self.citation_expiration,
+            )
+
+            args: List[Any] = [self.citation_expiration, redis_service.get_current_timestamp()]
+            for source, source_hash in zip(sources, hashes):
+                args.append(source_hash)
+                args.append(json.dumps(self._source_payload(source)))
+
+            citation_ids = redis_service.run_script(
+                _REGISTER_SCRIPT,
+                keys=self._get_session_keys(session_id),
+                args=args,
+            )
+            if citation_ids is None or len(citation_ids) != len(sources):
+                logger.warning("Redis not available for citation registry")
+                return self._fallback_sources(sources)
+
+            registered_sources = []
+            for source, source_hash, citation_id in zip(sources, hashes, citation_ids):
+                citation_id = int(citation_id)
                 registered_source = source.copy()
                 registered_source.update({
                     'citation_id': citation_id,
@@ -130,69 +199,26 @@ class SessionCitationRegistry:
                     'session_id': session_id,
                     'hash': source_hash
                 })
-                
                 registered_sources.append(registered_source)
-            
-            # Update registry summary
-            self._update_registry_summary(session_id, registered_sources)
-            
+
             logger.info(f"Registered {len(registered_sources)} sources for session {session_id}")
             return registered_sources
             
         except Exception as e:
             logger.error(f"Error registering sources: {str(e)}")
             return self._fallback_sources(sources)
-    
-    def _get_next_citation_id(self, session_id: str) -> int:
-        """
-        Get the next citation ID for the session.
-        
-        Args:
-            session_id: Session identifier
-            
-        Returns:
-            Next citation ID
+
+    @staticmethod
+    def _source_payload(source: Dict[str, Any]) -> Dict[str, Any]:
         """
-        counter_key = self._get_counter_key(session_id)
-        
-        try:
-            # Increment counter atomically
-            citation_id = redis_service.incr(counter_key)
-            redis_service.expire(counter_key, self.citation_expiration)
-            return citation_id
-        except Exception as e:
-            logger.error(f"Error getting next citation ID: {str(e)}")
-            return 1
-    
-    def _update_registry_summary(self, session_id: str, sources: List[Dict[str, Any]]) -> None:
+        Source fields stored for a new citation; ``title`` and ``id`` are only
+        included when present so the script can default them from the new ID.
         """
-        Update the registry summary with current sources.
-        
-        Args:
-            session_id: Session identifier
-            sources: List of registered sources
-        """
-        try:
-            registry_key = self._get_registry_key(session_id)
-            
-            # Get existing registry or create new one
-            existing_registry = redis_service.get(registry_key) or {}
-            
-            # Add new sources to registry
-            for source in sources:
-                citation_id = source.get('citation_id')
-                if citation_id:
-                    existing_registry[str(citation_id)] = {
-                        'title': source.get('title', ''),
-                        'hash': source.get('hash', ''),
-                        'registered_at': redis_service.get_current_timestamp()
-                    }
-            
-            # Store updated registry
-            redis_service.set(registry_key, existing_registry, self.citation_expiration)
-            
-        except Exception as e:
-            logger.error(f"Error updating registry summary: {str(e)}")
+        payload = {}
+        for field in ('title', 'id'):
+            if field in source:
+                payload[field] = source[field]
+        return payload
     
     def get_source_by_citation_id(self, session_id: str, citation_id: int) -> Optional[Dict[str, Any]]:
         """
@@ -210,8 +236,9 @@ class SessionCitationRegistry:
             return None
         
         try:
-            source_key = self._get_source_key(session_id, citation_id)
-            source_data = redis_service.get(source_key)
+            source_data = redis_service.hget(self._get_sources_key(session_id), str(citation_id))
+            if source_data:
+                source_data = self._resolve_chunks([source_data])[0]
             
             if source_data:
                 logger.debug(f"Found source for citation ID {citation_id}")
@@ -238,19 +265,23 @@ class SessionCitationRegistry:
             return {"connected": False}
         
         try:
-            registry_key = self._get_registry_key(session_id)
-            counter_key = self._get_counter_key(session_id)
-            
-            registry = redis_service.get(registry_key) or {}
-            counter = redis_service.get(counter_key) or 0
-            
-            # Get all source data
+            registry = self._get_registry_summary(session_id)
+
+            # Session entries with one HGETALL; counter and shared chunks
+            # (hashes are in the summary) in one MGET
+            citation_ids = sorted(registry, key=lambda cid: int(cid) if cid.isdigit() else 0)
+            hashes = [(registry[cid] or {}).get('hash') or '' for cid in citation_ids]
+            entries = redis_service.hgetall(self._get_sources_key(session_id)) or {}
+            values = redis_service.mget(
+                [self._get_counter_key(session_id)]
+                + [self._get_chunk_key(source_hash) for source_hash in hashes]
+            )
+            counter = values[0] or 0
             sources = {}
-            for citation_id_str, summary in registry.items():
-                citation_id = int(citation_id_str)
-                source_data = self.get_source_by_citation_id(session_id, citation_id)
-                if source_data:
-                    sources[citation_id_str] = source_data
+            for cid, chunk in zip(citation_ids, values[1:]):
+                entry = entries.get(cid)
+                if entry:
+                    sources[cid] = self._merge_chunk(entry, chunk)
             
             return {
                 "connected": True,
@@ -264,9 +295,48 @@ class SessionCitationRegistry:
             logger.error(f"Error getting session citations: {str(e)}")
             return {"connected": False, "error": str(e)}
     
+    @staticmethod
+    def _merge_chunk(entry: Dict[str, Any], chunk: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Combine a session entry with its shared chunk into the full source data.
+        """
+        if not isinstance(entry, dict):
+            return entry
+        source_data = {'content': '', 'url': ''}
+        if isinstance(chunk, dict):
+            source_data.update(chunk)
+        source_data.update(entry)
+        return source_data
+
+    def _resolve_chunks(self, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Resolve session entries to full source data with one MGET of their chunks.
+
+        Args:
+            entries: Session entries holding a ``hash`` reference
+
+        Returns:
+            Full source data, in the same order
+        """
+        pending = [i for i, entry in enumerate(entries) if isinstance(entry, dict)]
+        if not pending:
+            return entries
+        chunks = redis_service.mget([self._get_chunk_key(entries[i].get('hash', '')) for i in pending])
+        resolved = list(entries)
+        for i, chunk in zip(pending, chunks):
+            resolved[i] = self._merge_chunk(entries[i], chunk)
+        return resolved
+
+    def _get_registry_summary(self, session_id: str) -> Dict[str, Any]:
+        """Read the registry summary with one HGETALL."""
+        return redis_service.hgetall(self._get_registry_key(session_id)) or {}
+
     def clear_session_citations(self, session_id: str) -> bool:
         """
         Clear all citations for a session.
+
+        The session's keys are fixed, so this is a single atomic UNLINK with no
+        keyspace scan.
         
         Args:
             session_id: Session identifier
@@ -274,13 +344,13 @@ class SessionCitationRegistry:
         Returns:
             True if successful, False otherwise
         """
-        if not redis_service.is_connected():
-            logger.warning("Redis not available for citation clearing")
-            return False
-        
         try:
-            pattern = f"{self.registry_prefix}{session_id}:citations:*"
-            deleted_count = redis_service.delete_pattern(pattern)
+            deleted_count = redis_service.run_script(
+                _CLEAR_SCRIPT, keys=self._get_session_keys(session_id), args=[]
+            )
+            if deleted_count is None:
+                logger.warning("Redis not available for citation clearing")
+                return False
             logger.info(f"Cleared {deleted_count} citation entries for session {session_id}")
             return True
             
@@ -2,13 +2,34 @@
 
 from __future__ import annotations
 
+import os
+import time
+import uuid
 import logging
-from typing import List, Tuple, Optional, Any, Dict
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from typing import Iterable, List, Tuple, Optional, Any, Dict, Set
+
+from psycopg2.extras import execute_values
 
 from db_manager import DatabaseManager
 
 logger = logging.getLogger(__name__)
 
+# "legacy": one session_memory table trimmed with a ctid subquery per insert
+# "partitioned": session_memory_daily partitioned by day, trimmed by per-session turn counters
+SESSION_MEMORY_SCHEMA = os.getenv("SESSION_MEMORY_SCHEMA", "legacy").lower()
+# Partitioned schema: days after which a day's partition is dropped
+SESSION_MEMORY_TTL_DAYS = int(os.getenv("SESSION_MEMORY_TTL_DAYS", "30"))
+# Partitioned schema: seconds between partition maintenance runs per process
+SESSION_MEMORY_MAINTENANCE_INTERVAL = int(os.getenv("SESSION_MEMORY_MAINTENANCE_INTERVAL", "3600"))
+# Partitioned schema: days of partitions created ahead of time
+SESSION_MEMORY_PARTITIONS_AHEAD = int(os.getenv("SESSION_MEMORY_PARTITIONS_AHEAD", "2"))
+
+PARTITIONED_TABLE = "session_memory_daily"
+COUNTERS_TABLE = "session_memory_counters"
+# pg advisory lock key serializing partition DDL across workers
+_PARTITION_LOCK_KEY = 0x5E55_0001
+
 
 class SessionMemory:
     """Interface for session memory backends."""
@@ -19,6 +40,13 @@ class SessionMemory:
     def get_history(self, session_id: str, last_n_turns: int = 10) -> List[Tuple[str, str]]:
         raise NotImplementedError
 
+    def get_turns(self, session_id: str, last_n_turns: int = 10) -> List[Dict[str, Optional[str]]]:
+        """Last turns (oldest first) as dicts with ``user``, ``assistant`` and ``summary``."""
+        return [
+            {"user": user, "assistant": bot, "summary": None}
+            for user, bot in self.get_history(session_id, last_n_turns)
+        ]
+
     def clear(self, session_id: str) -> None:
         raise NotImplementedError
 
@@ -26,15 +54,43 @@ class SessionMemory:
         return {}
 
 
+def _partition_name(day: date) -> str:
+    return f"{PARTITIONED_TABLE}_{day:%Y%m%d}"
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, dt_time.min, tzinfo=timezone.utc)
+
+
 class PostgresSessionMemory(SessionMemory):
-    """PostgreSQL-backed implementation keeping last N turns per session."""
+    """
+    PostgreSQL-backed implementation keeping last N turns per session.
 
-    def __init__(self, max_turns: int = 10):
+    With ``schema="partitioned"`` turns go to ``session_memory_daily``, range
+    partitioned by UTC day on ``created_at``. Each session has a row in
+    ``session_memory_counters`` numbering its turns, so trimming is an index
+    range delete (``turn_no`` below the counter minus ``max_turns``) instead
+    of a subquery over the session's rows. Partitions older than
+    ``ttl_days`` are dropped whole, together with the counters of sessions
+    whose last turn is in them, so abandoned sessions no longer accumulate.
+    """
+
+    def __init__(self, max_turns: int = 10, schema: str = SESSION_MEMORY_SCHEMA, ttl_days: int = SESSION_MEMORY_TTL_DAYS):
         self.max_turns = max_turns
+        self.partitioned = schema == "partitioned"
+        self.ttl_days = ttl_days
+        self.table = PARTITIONED_TABLE if self.partitioned else "session_memory"
+        # Newest turn first: by turn number when counters exist, else by time
+        self._order = "turn_no DESC" if self.partitioned else "created_at DESC"
+        self._partitions: Set[date] = set()
+        self._next_maintenance = 0.0
         self._ensure_table()
-        logger.debug("PostgresSessionMemory initialized with max_turns=%s", max_turns)
+        logger.debug("PostgresSessionMemory initialized with max_turns=%s schema=%s", max_turns, schema)
 
     def _ensure_table(self) -> None:
+        if self.partitioned:
+            self._ensure_partitioned_tables()
+            return
         query = (
             "CREATE TABLE IF NOT EXISTS session_memory ("
             "session_id TEXT,"
@@ -48,32 +104,235 @@ class PostgresSessionMemory(SessionMemory):
             "CREATE INDEX IF NOT EXISTS idx_session_memory_session_created_at "
             "ON session_memory (session_id, created_at DESC)"
         )
+        # Turns written behind by TieredSessionMemory carry an id so replays are idempotent
+        turn_id = "ALTER TABLE session_memory ADD COLUMN IF NOT EXISTS turn_id TEXT"
+        turn_id_index = (
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_session_memory_turn_id "
+            "ON session_memory (turn_id)"
+        )
         conn = DatabaseManager.get_connection()
         try:
             with conn.cursor() as cur:
                 cur.execute(query)
                 cur.execute(index)
+                cur.execute(turn_id)
+                cur.execute(turn_id_index)
                 conn.commit()
         finally:
             conn.close()
 
-    def store_turn(self, session_id: str, user_msg: str, bot_msg: str, summary: Optional[str] = None) -> None:
-        logger.debug("Storing turn for session %s", session_id)
+    def _ensure_partitioned_tables(self) -> None:
+        statements = [
+            f"CREATE TABLE IF NOT EXISTS {PARTITIONED_TABLE} ("
+            "turn_id TEXT NOT NULL,"
+            "session_id TEXT NOT NULL,"
+            "turn_no BIGINT NOT NULL,"
+            "user_msg TEXT,"
+            "bot_msg TEXT,"
+            "summary TEXT,"
+            "created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()"
+            ") PARTITION BY RANGE (created_at)",
+            f"CREATE INDEX IF NOT EXISTS idx_{PARTITIONED_TABLE}_session_turn "
+            f"ON {PARTITIONED_TABLE} (session_id, turn_no DESC)",
+            # Unique indexes on a partitioned table must include the partition key
+            f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{PARTITIONED_TABLE}_turn_id "
+            f"ON {PARTITIONED_TABLE} (turn_id, created_at)",
+            f"CREATE TABLE IF NOT EXISTS {COUNTERS_TABLE} ("
+            "session_id TEXT PRIMARY KEY,"
+            "turns BIGINT NOT NULL,"
+            "last_turn_at TIMESTAMPTZ NOT NULL"
+            ")",
+        ]
+        conn = DatabaseManager.get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_xact_lock(%s)", (_PARTITION_LOCK_KEY,))
+                for statement in statements:
+                    cur.execute(statement)
+                conn.commit()
+        finally:
+            conn.close()
+        self.maintain()
+
+    def _ensure_partitions(self, days: Iterable[date]) -> None:
+        """Create the daily partitions for ``days`` that this process has not seen yet."""
+        missing = sorted(set(days) - self._partitions)
+        if not missing:
+            return
         conn = DatabaseManager.get_connection()
         try:
             with conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_xact_lock(%s)", (_PARTITION_LOCK_KEY,))
+                for day in missing:
+                    cur.execute(
+                        f"CREATE TABLE IF NOT EXISTS {_partition_name(day)} PARTITION OF {PARTITIONED_TABLE} "
+                        "FOR VALUES FROM (%s) TO (%s)",
+                        (_day_start(day), _day_start(day + timedelta(days=1))),
+                    )
+                conn.commit()
+        finally:
+            conn.close()
+        self._partitions.update(missing)
+
+    def maintain(self) -> Dict[str, int]:
+        """
+        Partitioned schema: create upcoming partitions and drop expired ones.
+
+        Partitions whose whole day is older than ``ttl_days`` are dropped, and
+        so are the counters of sessions whose last turn is older than the
+        oldest kept partition (all their rows were just dropped). Runs under a
+        transaction-level advisory lock, so concurrent workers skip it.
+
+        Returns:
+            Dictionary with the number of dropped partitions and counters
+        """
+        self._next_maintenance = time.monotonic() + SESSION_MEMORY_MAINTENANCE_INTERVAL
+        if not self.partitioned:
+            return {"dropped_partitions": 0, "dropped_counters": 0}
+        today = datetime.now(timezone.utc).date()
+        self._ensure_partitions(today + timedelta(days=offset) for offset in range(-1, SESSION_MEMORY_PARTITIONS_AHEAD + 1))
+
+        cutoff = today - timedelta(days=self.ttl_days)
+        dropped_partitions = dropped_counters = 0
+        conn = DatabaseManager.get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_try_advisory_xact_lock(%s)", (_PARTITION_LOCK_KEY,))
+                if not cur.fetchone()[0]:
+                    conn.rollback()
+                    return {"dropped_partitions": 0, "dropped_counters": 0}
                 cur.execute(
-                    "INSERT INTO session_memory (session_id, user_msg, bot_msg, summary) VALUES (%s, %s, %s, %s)",
-                    (session_id, user_msg, bot_msg, summary),
+                    "SELECT c.relname FROM pg_inherits i "
+                    "JOIN pg_class c ON c.oid = i.inhrelid "
+                    "WHERE i.inhparent = %s::regclass",
+                    (PARTITIONED_TABLE,),
                 )
+                for (name,) in cur.fetchall():
+                    try:
+                        day = datetime.strptime(name[len(PARTITIONED_TABLE) + 1:], "%Y%m%d").date()
+                    except ValueError:
+                        continue
+                    if day < cutoff:
+                        cur.execute(f"DROP TABLE IF EXISTS {name}")
+                        self._partitions.discard(day)
+                        dropped_partitions += 1
                 cur.execute(
-                    "DELETE FROM session_memory "
-                    "WHERE session_id = %s AND ctid NOT IN ("
-                    " SELECT ctid FROM session_memory "
-                    " WHERE session_id = %s ORDER BY created_at DESC LIMIT %s"
-                    ")",
-                    (session_id, session_id, self.max_turns),
+                    f"DELETE FROM {COUNTERS_TABLE} WHERE last_turn_at < %s",
+                    (_day_start(cutoff),),
                 )
+                dropped_counters = cur.rowcount
+                conn.commit()
+        except Exception:
+            logger.exception("Session memory partition maintenance failed")
+            conn.rollback()
+        finally:
+            conn.close()
+        if dropped_partitions or dropped_counters:
+            logger.info(
+                "Dropped %s expired session memory partitions and %s session counters",
+                dropped_partitions, dropped_counters,
+            )
+        return {"dropped_partitions": dropped_partitions, "dropped_counters": dropped_counters}
+
+    def _maybe_maintain(self) -> None:
+        if self.partitioned and time.monotonic() >= self._next_maintenance:
+            self.maintain()
+
+    def _insert_partitioned(self, cur, rows: List[Tuple]) -> None:
+        """
+        Insert turns numbered by their session counters and trim each session.
+
+        Args:
+            cur: Cursor of the open transaction
+            rows: ``(turn_id, session_id, user_msg, bot_msg, summary, created_at)`` tuples, oldest first
+        """
+        by_session: Dict[str, List[Tuple]] = {}
+        for row in rows:
+            by_session.setdefault(row[1], []).append(row)
+        # Lock and read the session counters, sorted so concurrent writers lock
+        # counter rows in the same order. Counters are only advanced below, by
+        # the turns actually inserted, so a replayed batch leaves them unchanged
+        sessions = sorted(by_session)
+        totals = dict(execute_values(
+            cur,
+            f"INSERT INTO {COUNTERS_TABLE} AS c (session_id, turns, last_turn_at) VALUES %s "
+            "ON CONFLICT (session_id) DO UPDATE SET turns = c.turns "
+            "RETURNING session_id, turns",
+            [(sid, 0, max(row[5] for row in by_session[sid])) for sid in sessions],
+            fetch=True,
+        ))
+        # Turns of a replayed batch are already stored and must not be renumbered
+        cur.execute(
+            f"SELECT turn_id FROM {PARTITIONED_TABLE} WHERE turn_id = ANY(%s)",
+            ([row[0] for row in rows],),
+        )
+        stored = {turn_id for (turn_id,) in cur.fetchall()}
+
+        numbered = []
+        for sid in sessions:
+            new_rows = [row for row in by_session[sid] if row[0] not in stored]
+            numbered.extend(row[:2] + (totals[sid] + i + 1,) + row[2:] for i, row in enumerate(new_rows))
+        if not numbered:
+            return
+        inserted = execute_values(
+            cur,
+            f"INSERT INTO {PARTITIONED_TABLE} (turn_id, session_id, turn_no, user_msg, bot_msg, summary, created_at) "
+            "VALUES %s ON CONFLICT (turn_id, created_at) DO NOTHING "
+            "RETURNING session_id, turn_no, created_at",
+            numbered,
+            fetch=True,
+        )
+        if not inserted:
+            return
+
+        latest: Dict[str, Tuple[int, datetime]] = {}
+        for sid, turn_no, created_at in inserted:
+            last_no, last_at = latest.get(sid, (turn_no, created_at))
+            latest[sid] = (max(last_no, turn_no), max(last_at, created_at))
+        execute_values(
+            cur,
+            f"UPDATE {COUNTERS_TABLE} AS c "
+            "SET turns = GREATEST(c.turns, t.turns), last_turn_at = GREATEST(c.last_turn_at, t.last_turn_at) "
+            "FROM (VALUES %s) AS t (session_id, turns, last_turn_at) WHERE c.session_id = t.session_id",
+            [(sid, turn_no, created_at) for sid, (turn_no, created_at) in sorted(latest.items())],
+        )
+        keep_from = [
+            (sid, turn_no - self.max_turns + 1)
+            for sid, (turn_no, _) in sorted(latest.items())
+            if turn_no > self.max_turns
+        ]
+        if keep_from:
+            execute_values(
+                cur,
+                f"DELETE FROM {PARTITIONED_TABLE} AS m USING (VALUES %s) AS t (session_id, keep_from) "
+                "WHERE m.session_id = t.session_id AND m.turn_no < t.keep_from",
+                keep_from,
+            )
+
+    def store_turn(self, session_id: str, user_msg: str, bot_msg: str, summary: Optional[str] = None) -> None:
+        logger.debug("Storing turn for session %s", session_id)
+        if self.partitioned:
+            self._maybe_maintain()
+            now = datetime.now(timezone.utc)
+            self._ensure_partitions([now.date()])
+        conn = DatabaseManager.get_connection()
+        try:
+            with conn.cursor() as cur:
+                if self.partitioned:
+                    self._insert_partitioned(cur, [(uuid.uuid4().hex, session_id, user_msg, bot_msg, summary, now)])
+                else:
+                    cur.execute(
+                        "INSERT INTO session_memory (session_id, user_msg, bot_msg, summary) VALUES (%s, %s, %s, %s)",
+                        (session_id, user_msg, bot_msg, summary),
+                    )
+                    cur.execute(
+                        "DELETE FROM session_memory "
+                        "WHERE session_id = %s AND ctid NOT IN ("
+                        " SELECT ctid FROM session_memory "
+                        " WHERE session_id = %s ORDER BY created_at DESC LIMIT %s"
+                        ")",
+                        (session_id, session_id, self.max_turns),
+                    )
                 conn.commit()
                 logger.debug("Stored turn and trimmed history for session %s", session_id)
         except Exception:
@@ -82,14 +341,75 @@ class PostgresSessionMemory(SessionMemory):
         finally:
             conn.close()
 
+    def store_turns(self, turns: Iterable[Dict[str, Any]]) -> int:
+        """
+        Insert a batch of turns in one transaction and trim each session once.
+
+        Args:
+            turns: Dicts with ``turn_id``, ``session_id``, ``user``, ``assistant``,
+                ``summary`` and ``ts`` (epoch seconds)
+
+        Returns:
+            Number of turns submitted; turns whose ``turn_id`` is already stored are skipped
+
+        Raises:
+            psycopg2.Error: If the batch could not be written (nothing is committed)
+        """
+        rows = [
+            (
+                t["turn_id"],
+                t["session_id"],
+                t.get("user", ""),
+                t.get("assistant", ""),
+                t.get("summary"),
+                datetime.fromtimestamp(t["ts"], tz=timezone.utc),
+            )
+            for t in turns
+        ]
+        if not rows:
+            return 0
+        sessions = sorted({row[1] for row in rows})
+        if self.partitioned:
+            self._maybe_maintain()
+            self._ensure_partitions(row[5].date() for row in rows)
+        conn = DatabaseManager.get_connection()
+        try:
+            with conn.cursor() as cur:
+                if self.partitioned:
+                    self._insert_partitioned(cur, rows)
+                else:
+                    execute_values(
+                        cur,
+                        "INSERT INTO session_memory (turn_id, session_id, user_msg, bot_msg, summary, created_at) "
+                        "VALUES %s ON CONFLICT (turn_id) DO NOTHING",
+                        rows,
+                    )
+                    for session_id in sessions:
+                        cur.execute(
+                            "DELETE FROM session_memory "
+                            "WHERE session_id = %s AND ctid NOT IN ("
+                            " SELECT ctid FROM session_memory "
+                            " WHERE session_id = %s ORDER BY created_at DESC LIMIT %s"
+                            ")",
+                            (session_id, session_id, self.max_turns),
+                        )
+                conn.commit()
+            logger.debug("Stored %s turns for %s sessions", len(rows), len(sessions))
+            return len(rows)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
     def get_history(self, session_id: str, last_n_turns: int = 10) -> List[Tuple[str, str]]:
         logger.debug("Fetching last %s turns for session %s", last_n_turns, session_id)
         conn = DatabaseManager.get_connection()
         try:
             with conn.cursor() as cur:
                 cur.execute(
-                    "SELECT user_msg, bot_msg FROM session_memory "
-                    "WHERE session_id = %s ORDER BY created_at DESC LIMIT %s",
+                    f"SELECT user_msg, bot_msg FROM {self.table} "
+                    f"WHERE session_id = %s ORDER BY {self._order} LIMIT %s",
                     (session_id, last_n_turns),
                 )
                 rows = cur.fetchall()
@@ -102,12 +422,33 @@ class PostgresSessionMemory(SessionMemory):
         finally:
             conn.close()
 
+    def get_turns(self, session_id: str, last_n_turns: int = 10) -> List[Dict[str, Optional[str]]]:
+        logger.debug("Fetching last %s turns with summaries for session %s", last_n_turns, session_id)
+        conn = DatabaseManager.get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"SELECT user_msg, bot_msg, summary FROM {self.table} "
+                    f"WHERE session_id = %s ORDER BY {self._order} LIMIT %s",
+                    (session_id, last_n_turns),
+                )
+                rows = cur.fetchall()
+            rows.reverse()
+            return [{"user": r[0], "assistant": r[1], "summary": r[2]} for r in rows]
+        except Exception:
+            logger.exception("Failed retrieving conversation turns")
+            return []
+        finally:
+            conn.close()
+
     def clear(self, session_id: str) -> None:
         logger.debug("Clearing history for session %s", session_id)
         conn = DatabaseManager.get_connection()
         try:
             with conn.cursor() as cur:
-                cur.execute("DELETE FROM session_memory WHERE session_id = %s", (session_id,))
+                cur.execute(f"DELETE FROM {self.table} WHERE session_id = %s", (session_id,))
+                if self.partitioned:
+                    cur.execute(f"DELETE FROM {COUNTERS_TABLE} WHERE session_id = %s", (session_id,))
                 conn.commit()
                 logger.debug("Cleared history for session %s", session_id)
         except Exception:
@@ -120,6 +461,16 @@ class PostgresSessionMemory(SessionMemory):
         conn = DatabaseManager.get_connection()
         try:
             with conn.cursor() as cur:
+                if self.partitioned:
+                    # Planner estimates; an exact COUNT(*) would scan every partition
+                    cur.execute(
+                        "SELECT COUNT(*), COALESCE(SUM(GREATEST(c.reltuples, 0)), 0)::BIGINT FROM pg_inherits i "
+                        "JOIN pg_class c ON c.oid = i.inhrelid "
+                        "WHERE i.inhparent = %s::regclass",
+                        (PARTITIONED_TABLE,),
+                    )
+                    partitions, estimated = cur.fetchone()
+                    return {"partitions": partitions, "estimated_rows": estimated, "ttl_days": self.ttl_days}
                 cur.execute("SELECT COUNT(*) FROM session_memory")
                 total = cur.fetchone()[0]
             return {"total_rows": total}
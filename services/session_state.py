@@ -0,0 +1,257 @@
+"""
+Shared Session State for RAGKA
+
+Everything a request needs to know about its session that used to live on the
+worker's in-process assistant is kept in Redis, so any gunicorn worker (or
+node) can serve any request of any session:
+
+- ``session:{session_id}:settings``: hash of the settings sent with the
+  ``settings`` payload (model, token budget, retrieval options), one JSON
+  value per field
+- ``session:{session_id}:citations:display``: hash of every source shown in the
+  session (source id → source), used to resolve citation links of earlier
+  messages
+- ``session:{session_id}:turn_pending``: set while a worker is still storing the
+  previous turn in the background; the next turn of the session waits for it,
+  whichever worker serves it
+
+Keys expire ``SESSION_STATE_TTL`` seconds after the session was last used.
+"""
+
+import os
+import json
+import time
+import logging
+from typing import Any, Callable, Dict, Iterable, Tuple
+
+from config import CHAT_DEPLOYMENTS
+from .redis_pool import get_redis_client
+from .tiered_session_memory import SESSION_MEMORY_MAX_TURNS
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SESSION_STATE_TTL = int(os.getenv("SESSION_STATE_TTL", "86400"))
+# Seconds between checks while waiting for another worker's pending turn
+SESSION_TURN_POLL_INTERVAL = float(os.getenv("SESSION_TURN_POLL_INTERVAL", "0.05"))
+
+
+def _to_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+# Settings accepted from the ``settings`` payload and how they are coerced;
+# anything else is ignored instead of being set on the assistant
+SESSION_SETTINGS: Dict[str, Callable[[Any], Any]] = {
+    "model": str,
+    "max_completion_tokens": int,
+    "max_history": int,
+    "multi_query": _to_bool,
+    "sub_queries": int,
+    "mmr_rerank": _to_bool,
+}
+
+# Inclusive bounds numeric settings are clamped to: every sub-query costs an LLM
+# rewrite and a search, and history and completion size drive tokens per turn
+SESSION_SETTING_LIMITS: Dict[str, Tuple[int, int]] = {
+    "max_completion_tokens": (1, int(os.getenv("SESSION_MAX_COMPLETION_TOKENS", "4096"))),
+    # Session memory keeps only SESSION_MEMORY_MAX_TURNS turns, so more history
+    # than that can never be returned
+    "max_history": (0, min(int(os.getenv("SESSION_MAX_HISTORY", "20")), SESSION_MEMORY_MAX_TURNS)),
+    "sub_queries": (0, int(os.getenv("SESSION_MAX_SUB_QUERIES", "5"))),
+}
+
+
+class SessionStateStore:
+    """Per-session settings, citation map and turn-in-progress marker in Redis."""
+
+    def __init__(self, redis_client=None, ttl: int = SESSION_STATE_TTL):
+        """
+        Args:
+            redis_client: str-decoding Redis client (defaults to the shared pool)
+            ttl: Seconds the state of an idle session is kept
+        """
+        self._client = redis_client or get_redis_client(decode_responses=True)
+        self.ttl = ttl
+
+    def _settings_key(self, session_id: str) -> str:
+        return f"session:{session_id}:settings"
+
+    def _citations_key(self, session_id: str) -> str:
+        return f"session:{session_id}:citations:display"
+
+    def _pending_key(self, session_id: str) -> str:
+        return f"session:{session_id}:turn_pending"
+
+    @staticmethod
+    def validate_settings(settings: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Keep the known settings, coerced to their types and clamped to their limits.
+
+        Args:
+            settings: Raw ``settings`` payload
+
+        Returns:
+            The valid settings; unknown or malformed entries and models other
+            than the configured ``CHAT_DEPLOYMENTS`` are dropped
+        """
+        valid = {}
+        for name, value in (settings or {}).items():
+            coerce = SESSION_SETTINGS.get(name)
+            if coerce is None or value is None:
+                continue
+            try:
+                value = coerce(value)
+            except (TypeError, ValueError, OverflowError):
+                logger.warning(f"Ignoring invalid session setting {name}={value!r}")
+                continue
+            if name == "model" and value not in CHAT_DEPLOYMENTS:
+                logger.warning(f"Ignoring session setting model={value!r}: not a configured chat deployment")
+                continue
+            if name in SESSION_SETTING_LIMITS:
+                low, high = SESSION_SETTING_LIMITS[name]
+                value = min(max(value, low), high)
+            valid[name] = value
+        return valid
+
+    def load_settings(self, session_id: str) -> Dict[str, Any]:
+        """
+        Get the settings of a session.
+
+        Args:
+            session_id: The session ID
+
+        Returns:
+            The stored settings (empty if none or Redis is unavailable)
+        """
+        try:
+            fields = self._client.hgetall(self._settings_key(session_id))
+        except Exception as e:
+            logger.warning(f"Could not load settings of session {session_id}: {str(e)}")
+            return {}
+        settings = {}
+        for name, value in fields.items():
+            try:
+                settings[name] = json.loads(value)
+            except (TypeError, ValueError):
+                continue
+        # Stored settings are checked again, in case the limits changed since
+        return self.validate_settings(settings)
+
+    def save_settings(self, session_id: str, settings: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Merge new settings into the session's settings.
+
+        Args:
+            session_id: The session ID
+            settings: Raw ``settings`` payload
+
+        Returns:
+            All settings of the session after the update
+        """
+        valid = self.validate_settings(settings)
+        key = self._settings_key(session_id)
+        try:
+            pipe = self._client.pipeline(transaction=True)
+            if valid:
+                pipe.hset(key, mapping={name: json.dumps(value) for name, value in valid.items()})
+            pipe.expire(key, self.ttl)
+            pipe.hgetall(key)
+            fields = pipe.execute()[-1]
+        except Exception as e:
+            logger.warning(f"Could not save settings of session {session_id}: {str(e)}")
+            return valid
+        return self.validate_settings({name: json.loads(value) for name, value in fields.items()})
+
+    def add_citation_sources(self, session_id: str, sources: Iterable[Dict[str, Any]]) -> None:
+        """
+        Add sources to the session's citation map, keeping the first entry per source id.
+
+        Args:
+            session_id: The session ID
+            sources: Sources with an ``id``
+        """
+        key = self._citations_key(session_id)
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            for source in sources:
+                uid = source.get("id")
+                if uid:
+                    pipe.hsetnx(key, uid, json.dumps(source))
+            pipe.expire(key, self.ttl)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Could not update citation map of session {session_id}: {str(e)}")
+
+    def get_citation_map(self, session_id: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Get every source shown in a session.
+
+        Args:
+            session_id: The session ID
+
+        Returns:
+            Mapping of source id to source
+        """
+        try:
+            fields = self._client.hgetall(self._citations_key(session_id))
+        except Exception as e:
+            logger.warning(f"Could not load citation map of session {session_id}: {str(e)}")
+            return {}
+        return {uid: json.loads(value) for uid, value in fields.items()}
+
+    def mark_turn_pending(self, session_id: str, timeout: float) -> None:
+        """
+        Record that a turn of the session is still being stored.
+
+        Args:
+            session_id: The session ID
+            timeout: Seconds after which the marker expires on its own
+        """
+        try:
+            self._client.set(self._pending_key(session_id), "1", px=max(1, int(timeout * 1000)))
+        except Exception as e:
+            logger.debug(f"Could not mark pending turn of session {session_id}: {str(e)}")
+
+    def clear_turn_pending(self, session_id: str) -> None:
+        """Clear the marker set by ``mark_turn_pending``."""
+        try:
+            self._client.delete(self._pending_key(session_id))
+        except Exception as e:
+            logger.debug(f"Could not clear pending turn of session {session_id}: {str(e)}")
+
+    def wait_for_turn(self, session_id: str, timeout: float) -> bool:
+        """
+        Wait until no turn of the session is being stored (by any worker).
+
+        Args:
+            session_id: The session ID
+            timeout: Maximum seconds to wait
+
+        Returns:
+            True if no turn is pending, False if the wait timed out
+        """
+        deadline = time.monotonic() + timeout
+        key = self._pending_key(session_id)
+        while True:
+            try:
+                if not self._client.exists(key):
+                    return True
+            except Exception:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(SESSION_TURN_POLL_INTERVAL)
+
+    def clear(self, session_id: str) -> None:
+        """Drop the citation map of a session (its settings are kept)."""
+        try:
+            self._client.delete(self._citations_key(session_id))
+        except Exception as e:
+            logger.warning(f"Could not clear state of session {session_id}: {str(e)}")
+
+
+# Create a singleton instance
+session_state = SessionStateStore()
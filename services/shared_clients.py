@@ -0,0 +1,147 @@
+"""
+Process-wide Service Clients for RAGKA
+
+Clients that are expensive to build and safe to share between threads are
+created once per process and handed to every session's assistant:
+
+- ``get_openai_client(deployment)``: an ``AzureOpenAI`` client per
+  deployment (chat completions, embeddings, helpers), all sending their
+  requests through the process's pooled HTTP client
+  (``services.http_transport``)
+- ``get_openai_service(deployment)``: an ``OpenAIService`` per chat
+  deployment, wrapping that deployment's client
+- ``get_vector_store()``: the retrieval backend (Azure AI Search client, or
+  the local vector/HNSW index loaded from disk)
+
+Clients are keyed by process id, so a pool inherited across ``fork()`` is
+never used by the child. Azure OpenAI clients are only created for the
+deployments in ``OPENAI_DEPLOYMENTS``, so the number of cached clients stays
+bounded whatever deployment names reach them.
+"""
+
+import os
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from openai import AzureOpenAI
+
+from config import (
+    AZURE_OPENAI_ENDPOINT,
+    AZURE_OPENAI_KEY,
+    AZURE_OPENAI_API_VERSION,
+    CHAT_DEPLOYMENT_GPT4o,
+    CHAT_DEPLOYMENT_O4_MINI,
+    CHAT_DEPLOYMENTS,
+    EMBEDDING_DEPLOYMENT,
+)
+from openai_service import OpenAIService
+from services.http_transport import get_http_client
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Reentrant: a factory may request another shared client
+_lock = threading.RLock()
+_pid: Optional[int] = None
+_clients: Dict[Hashable, Any] = {}
+
+# Deployments a shared Azure OpenAI client may be created for (None: the
+# deployment is taken from each request's ``model``)
+OPENAI_DEPLOYMENTS = frozenset(
+    [None, EMBEDDING_DEPLOYMENT, CHAT_DEPLOYMENT_O4_MINI, os.getenv("AZURE_OPENAI_MODEL")] + CHAT_DEPLOYMENTS
+)
+
+
+def _check_deployment(deployment_name: Optional[str]) -> None:
+    if deployment_name not in OPENAI_DEPLOYMENTS:
+        raise ValueError(f"Azure OpenAI deployment {deployment_name!r} is not configured")
+
+
+def _shared(key: Hashable, factory: Callable[[], Any]) -> Any:
+    """Return the client stored under ``key``, creating it with ``factory`` on first use."""
+    global _pid
+    client = _clients.get(key) if _pid == os.getpid() else None
+    if client is None:
+        with _lock:
+            if _pid != os.getpid():
+                _clients.clear()
+                _pid = os.getpid()
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = factory()
+                logger.info(f"Created shared client {key!r}")
+    return client
+
+
+def get_openai_client(deployment_name: Optional[str] = None) -> AzureOpenAI:
+    """
+    Get the process-wide Azure OpenAI client of a deployment.
+
+    Args:
+        deployment_name: Deployment every request of the client is sent to; without
+            one, the deployment is taken from each request's ``model``
+
+    Returns:
+        A thread-safe ``AzureOpenAI`` client over the pooled HTTP client
+
+    Raises:
+        ValueError: If the deployment is not in ``OPENAI_DEPLOYMENTS``
+    """
+    _check_deployment(deployment_name)
+    return _shared(
+        ("openai", deployment_name),
+        lambda: AzureOpenAI(
+            azure_endpoint=AZURE_OPENAI_ENDPOINT,
+            api_key=AZURE_OPENAI_KEY,
+            api_version=AZURE_OPENAI_API_VERSION or "2024-02-01",
+            azure_deployment=deployment_name,
+            http_client=get_http_client(),
+        ),
+    )
+
+
+def get_openai_service(deployment_name: str = CHAT_DEPLOYMENT_GPT4o) -> OpenAIService:
+    """
+    Get the shared ``OpenAIService`` for a chat deployment.
+
+    Args:
+        deployment_name: Chat deployment the service sends completions to
+
+    Returns:
+        An ``OpenAIService`` over the shared Azure OpenAI client
+
+    Raises:
+        ValueError: If the deployment is not in ``OPENAI_DEPLOYMENTS``
+    """
+    _check_deployment(deployment_name)
+    return _shared(
+        ("openai_service", deployment_name),
+        lambda: OpenAIService(
+            azure_endpoint=AZURE_OPENAI_ENDPOINT,
+            api_key=AZURE_OPENAI_KEY,
+            api_version=AZURE_OPENAI_API_VERSION,
+            deployment_name=deployment_name,
+            client=get_openai_client(deployment_name),
+        ),
+    )
+
+
+def get_vector_store():
+    """
+    Get the process-wide retrieval backend selected by ``VECTOR_STORE_BACKEND``.
+
+    Returns:
+        A ``VectorStore``; local indexes are loaded from disk only once per process
+    """
+    from services.vector_store import create_vector_store
+
+    return _shared("vector_store", create_vector_store)
+
+
+def get_shared_clients() -> Dict[str, str]:
+    """Names and types of the clients created in this process, for stats."""
+    with _lock:
+        if _pid != os.getpid():
+            return {}
+        return {str(key): type(client).__name__ for key, client in _clients.items()}
@@ -6,26 +6,16 @@ A minimal Redis-backed conversation memory service for simple contextual RAG.
 
 import os
 import json
-from typing import List, Tuple, Optional
-import redis
+from typing import Dict, List, Tuple, Optional
+from .redis_pool import get_redis_client
 from .session_memory import SessionMemory
 
-REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
-REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
-REDIS_DB = int(os.getenv("REDIS_DB", 0))
-REDIS_PASS = os.getenv("REDIS_PASSWORD", None)
 REDIS_EXPIRATION = int(os.getenv("REDIS_DEFAULT_EXPIRATION", "604800"))  # 7 days
 
 class SimpleRedisMemory(SessionMemory):
     def __init__(self):
-        self._client = redis.Redis(
-            host=REDIS_HOST,
-            port=REDIS_PORT,
-            db=REDIS_DB,
-            password=REDIS_PASS,
-            decode_responses=True,
-            socket_timeout=5
-        )
+        # str facade over the process-wide pool shared with RedisService
+        self._client = get_redis_client(decode_responses=True)
 
     def _key(self, session_id: str) -> str:
         return f"simple_history:{session_id}"
@@ -33,7 +23,8 @@ class SimpleRedisMemory(SessionMemory):
     def store_turn(self, session_id: str, user_query: str, assistant_response: str, summary: Optional[str] = None) -> None:
         turn = {
             "user": user_query,
-            "assistant": assistant_response
+            "assistant": assistant_response,
+            "summary": summary
         }
         self._client.rpush(self._key(session_id), json.dumps(turn))
         self._client.expire(self._key(session_id), REDIS_EXPIRATION)
@@ -50,6 +41,22 @@ class SimpleRedisMemory(SessionMemory):
                 continue
         return history
 
+    def get_turns(self, session_id: str, last_n_turns: int = 5) -> List[Dict[str, Optional[str]]]:
+        # Same as get_history, but keeps the stored summary of each turn
+        raw = self._client.lrange(self._key(session_id), -last_n_turns, -1)
+        turns: List[Dict[str, Optional[str]]] = []
+        for entry in raw:
+            try:
+                turn = json.loads(entry)
+                turns.append({
+                    "user": turn.get("user", ""),
+                    "assistant": turn.get("assistant", ""),
+                    "summary": turn.get("summary")
+                })
+            except Exception:
+                continue
+        return turns
+
     def clear(self, session_id: str) -> None:
         self._client.delete(self._key(session_id))
 
@@ -0,0 +1,461 @@
+"""
+Tiered Session Memory for RAGKA
+
+``TieredSessionMemory`` keeps PostgreSQL as the system of record for
+conversation turns but takes it off the response path:
+
+- Hot tier: the last ``max_turns`` turns of each session live in a Redis list
+  (``session_memory:{session_id}``), appended and capped with RPUSH + LTRIM
+  in one pipelined round trip. Reads are a single LRANGE; a session that is
+  not in Redis yet is loaded from PostgreSQL once and cached.
+- Write-behind: every turn is also appended to a Redis journal
+  (``session_memory:pending``) in the same transaction. A background thread
+  drains the journal in batches into PostgreSQL
+  (``PostgresSessionMemory.store_turns``) and removes a batch only after it
+  is committed.
+
+Crash safety: the journal lives in Redis, so turns not yet flushed when a
+worker dies are replayed by the next flush of any worker. Each turn carries a
+``turn_id`` and inserts use ``ON CONFLICT (turn_id) DO NOTHING``, so a batch
+replayed after a crash between commit and trim is not stored twice. One
+worker flushes at a time (``session_memory:flush_lock``).
+
+Poison entries: journal entries are validated before they are written
+(unreadable or incomplete entries go straight to the dead-letter list
+``session_memory:dead_letter``, NUL characters are stripped from the text). A
+batch that PostgreSQL keeps rejecting is retried
+``SESSION_MEMORY_FLUSH_MAX_ATTEMPTS`` times, then written turn by turn: turns
+rejected for their data are dead-lettered, so one bad turn cannot stall the
+journal. Connection errors never dead-letter anything.
+
+If Redis is unavailable, turns are written synchronously to PostgreSQL and
+read from it, as with ``PostgresSessionMemory``.
+"""
+
+import os
+import json
+import time
+import uuid
+import atexit
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import psycopg2
+
+from .redis_pool import get_redis_client
+from .session_memory import PostgresSessionMemory, SessionMemory
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SESSION_MEMORY_MAX_TURNS = int(os.getenv("SESSION_MEMORY_MAX_TURNS", "10"))
+# Hot-tier TTL of a session's turns in Redis
+SESSION_MEMORY_HOT_TTL = int(os.getenv("SESSION_MEMORY_HOT_TTL", "86400"))
+# Seconds between background flushes of the journal to PostgreSQL
+SESSION_MEMORY_FLUSH_INTERVAL = float(os.getenv("SESSION_MEMORY_FLUSH_INTERVAL", "1.0"))
+# Turns per PostgreSQL transaction; a full batch also triggers an early flush
+SESSION_MEMORY_FLUSH_BATCH = int(os.getenv("SESSION_MEMORY_FLUSH_BATCH", "200"))
+# Flush lock lease; renewed after every batch
+SESSION_MEMORY_FLUSH_LOCK_TTL = int(os.getenv("SESSION_MEMORY_FLUSH_LOCK_TTL", "30"))
+# Failed writes of a batch before it is written turn by turn and bad turns are dead-lettered
+SESSION_MEMORY_FLUSH_MAX_ATTEMPTS = int(os.getenv("SESSION_MEMORY_FLUSH_MAX_ATTEMPTS", "5"))
+# Entries kept in the dead-letter list (oldest are dropped)
+SESSION_MEMORY_DEAD_LETTER_MAX = int(os.getenv("SESSION_MEMORY_DEAD_LETTER_MAX", "10000"))
+
+HOT_KEY_PREFIX = "session_memory:"
+PENDING_KEY = "session_memory:pending"
+FLUSH_LOCK_KEY = "session_memory:flush_lock"
+DEAD_LETTER_KEY = "session_memory:dead_letter"
+
+# Errors caused by the data of a turn (not by the connection): retrying cannot help
+_DATA_ERRORS = (psycopg2.DataError, psycopg2.IntegrityError, ValueError, TypeError, KeyError)
+
+# Load a session from PostgreSQL only if no turn was written to Redis meanwhile
+_WARM_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+redis.call('RPUSH', KEYS[1], unpack(ARGV, 2))
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[1]))
+return 1
+"""
+
+# Drop a flushed batch from the head of the journal while this worker holds the
+# lock, moving its rejected entries (ARGV[5..]) to the capped dead-letter list
+_TRIM_SCRIPT = """
+if redis.call('GET', KEYS[2]) ~= ARGV[2] then
+    return 0
+end
+if #ARGV > 4 then
+    redis.call('RPUSH', KEYS[3], unpack(ARGV, 5))
+    redis.call('LTRIM', KEYS[3], -tonumber(ARGV[4]), -1)
+end
+redis.call('LTRIM', KEYS[1], tonumber(ARGV[1]), -1)
+redis.call('PEXPIRE', KEYS[2], tonumber(ARGV[3]))
+return 1
+"""
+
+_UNLOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class TieredSessionMemory(SessionMemory):
+    """Redis hot tier with write-behind to PostgreSQL."""
+
+    def __init__(
+        self,
+        max_turns: int = SESSION_MEMORY_MAX_TURNS,
+        redis_client=None,
+        cold: Optional[PostgresSessionMemory] = None,
+        hot_ttl: int = SESSION_MEMORY_HOT_TTL,
+        flush_interval: float = SESSION_MEMORY_FLUSH_INTERVAL,
+        batch_size: int = SESSION_MEMORY_FLUSH_BATCH,
+    ):
+        """
+        Args:
+            max_turns: Turns kept per session in both tiers
+            redis_client: str-decoding Redis client (defaults to the shared pool)
+            cold: PostgreSQL tier (created on first use by default)
+            hot_ttl: Seconds a session stays in Redis after its last turn
+            flush_interval: Seconds between background flushes (0 disables the flusher thread)
+            batch_size: Turns written to PostgreSQL per transaction
+        """
+        self.max_turns = max_turns
+        self.hot_ttl = hot_ttl
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._client = redis_client or get_redis_client(decode_responses=True)
+        self._cold = cold
+        self._cold_lock = threading.Lock()
+        self._scripts: Dict[str, Any] = {}
+        self._flush_lock = threading.Lock()
+        self._flusher_pid: Optional[int] = None
+        self._flusher_lock = threading.Lock()
+        self._flusher_stop = threading.Event()
+        self._flush_wakeup = threading.Event()
+        # Failed writes of the batch at the head of the journal, by its first turn_id
+        self._batch_failures: Dict[str, int] = {}
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "hot_hits": 0,
+            "hot_misses": 0,
+            "sync_writes": 0,
+            "flushed": 0,
+            "flushes": 0,
+            "flush_errors": 0,
+            "dead_lettered": 0,
+            "last_flush_ms": 0.0,
+        }
+
+    @property
+    def cold(self) -> PostgresSessionMemory:
+        """The PostgreSQL tier, created (and its table ensured) on first use."""
+        if self._cold is None:
+            with self._cold_lock:
+                if self._cold is None:
+                    self._cold = PostgresSessionMemory(max_turns=self.max_turns)
+        return self._cold
+
+    def _hot_key(self, session_id: str) -> str:
+        return f"{HOT_KEY_PREFIX}{session_id}"
+
+    def _count(self, name: str, value: float = 1) -> None:
+        with self._stats_lock:
+            self._stats[name] += value
+
+    def _script(self, source: str):
+        script = self._scripts.get(source)
+        if script is None:
+            script = self._scripts[source] = self._client.register_script(source)
+        return script
+
+    def store_turn(self, session_id: str, user_msg: str, bot_msg: str, summary: Optional[str] = None) -> None:
+        hot = json.dumps({"user": user_msg, "assistant": bot_msg, "summary": summary})
+        journal = json.dumps({
+            "turn_id": uuid.uuid4().hex,
+            "session_id": session_id,
+            "user": user_msg,
+            "assistant": bot_msg,
+            "summary": summary,
+            "ts": time.time(),
+        })
+        key = self._hot_key(session_id)
+        try:
+            pipe = self._client.pipeline(transaction=True)
+            pipe.rpush(key, hot)
+            pipe.ltrim(key, -self.max_turns, -1)
+            pipe.expire(key, self.hot_ttl)
+            pipe.rpush(PENDING_KEY, journal)
+            pending = pipe.execute()[-1]
+        except Exception as e:
+            logger.warning(f"Redis unavailable, writing turn for session {session_id} to PostgreSQL: {str(e)}")
+            self._count("sync_writes")
+            self.cold.store_turn(session_id, user_msg, bot_msg, summary)
+            return
+        self._ensure_flusher()
+        if pending >= self.batch_size:
+            self._flush_wakeup.set()
+
+    def get_turns(self, session_id: str, last_n_turns: int = 10) -> List[Dict[str, Optional[str]]]:
+        key = self._hot_key(session_id)
+        try:
+            raw = self._client.lrange(key, -last_n_turns, -1)
+        except Exception as e:
+            logger.warning(f"Redis unavailable, reading session {session_id} from PostgreSQL: {str(e)}")
+            return self.cold.get_turns(session_id, last_n_turns)
+
+        if raw:
+            self._count("hot_hits")
+            turns: List[Dict[str, Optional[str]]] = []
+            for entry in raw:
+                try:
+                    turn = json.loads(entry)
+                except Exception:
+                    continue
+                turns.append({
+                    "user": turn.get("user", ""),
+                    "assistant": turn.get("assistant", ""),
+                    "summary": turn.get("summary"),
+                })
+            return turns
+
+        # Not in Redis (new session or expired): load the cold tier once
+        self._count("hot_misses")
+        turns = self.cold.get_turns(session_id, self.max_turns)
+        if turns:
+            try:
+                self._script(_WARM_SCRIPT)(
+                    keys=[key], args=[self.hot_ttl] + [json.dumps(turn) for turn in turns]
+                )
+            except Exception as e:
+                logger.debug(f"Could not warm session {session_id} in Redis: {str(e)}")
+        return turns[-last_n_turns:] if last_n_turns > 0 else []
+
+    def get_history(self, session_id: str, last_n_turns: int = 10) -> List[Tuple[str, str]]:
+        return [(turn["user"], turn["assistant"]) for turn in self.get_turns(session_id, last_n_turns)]
+
+    def clear(self, session_id: str) -> None:
+        try:
+            self._client.delete(self._hot_key(session_id))
+        except Exception as e:
+            logger.warning(f"Could not clear session {session_id} in Redis: {str(e)}")
+        # Hold the flush lock while deleting from PostgreSQL: journalled turns are
+        # written out first, and no other worker can commit a batch of this
+        # session's turns after the delete
+        with self._flush_lock:
+            token = self._acquire_flush_lock(wait=SESSION_MEMORY_FLUSH_LOCK_TTL)
+            if token is None:
+                logger.warning(f"Clearing session {session_id} without the flush lock; journalled turns may reappear")
+            try:
+                if token is not None:
+                    self._drain(token)
+                self.cold.clear(session_id)
+            finally:
+                if token is not None:
+                    self._release_flush_lock(token)
+
+    def flush(self) -> int:
+        """
+        Drain the journal into PostgreSQL.
+
+        Returns:
+            Number of turns written (0 if another worker is flushing or Redis is unavailable)
+        """
+        with self._flush_lock:
+            token = self._acquire_flush_lock()
+            if token is None:
+                return 0
+            try:
+                return self._drain(token)
+            finally:
+                self._release_flush_lock(token)
+
+    def _acquire_flush_lock(self, wait: float = 0) -> Optional[str]:
+        """
+        Take the cross-worker flush lock.
+
+        Args:
+            wait: Seconds to wait for another worker to release it
+
+        Returns:
+            The lock token, or None if the lock is held elsewhere or Redis is unavailable
+        """
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + wait
+        while True:
+            try:
+                if self._client.set(FLUSH_LOCK_KEY, token, nx=True, px=SESSION_MEMORY_FLUSH_LOCK_TTL * 1000):
+                    return token
+            except Exception as e:
+                logger.debug(f"Session memory flush lock unavailable: {str(e)}")
+                return None
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.05)
+
+    def _release_flush_lock(self, token: str) -> None:
+        try:
+            self._script(_UNLOCK_SCRIPT)(keys=[FLUSH_LOCK_KEY], args=[token])
+        except Exception:
+            pass
+
+    @staticmethod
+    def _validate(entry: str) -> Dict[str, Any]:
+        """
+        Parse a journal entry into a turn ``store_turns`` accepts.
+
+        Raises:
+            ValueError: If the entry is unreadable or incomplete
+        """
+        turn = json.loads(entry)
+        if not isinstance(turn, dict):
+            raise ValueError("entry is not an object")
+        for field in ("turn_id", "session_id"):
+            if not isinstance(turn.get(field), str) or not turn[field]:
+                raise ValueError(f"missing {field}")
+        if not isinstance(turn.get("ts"), (int, float)) or isinstance(turn["ts"], bool):
+            raise ValueError("missing ts")
+        for field in ("user", "assistant", "summary"):
+            value = turn.get(field)
+            if value is None:
+                continue
+            if not isinstance(value, str):
+                value = str(value)
+            # PostgreSQL text cannot hold NUL characters
+            turn[field] = value.replace("\x00", "")
+        return turn
+
+    @staticmethod
+    def _dead_letter(entry: str, reason: str) -> str:
+        return json.dumps({"entry": entry, "error": reason[:500], "ts": time.time()})
+
+    def _store_one_by_one(self, batch: List[Tuple[str, Dict[str, Any]]]) -> Tuple[int, List[str]]:
+        """
+        Write a repeatedly failing batch turn by turn.
+
+        Returns:
+            (turns written, dead-letter records of the turns rejected for their data)
+
+        Raises:
+            Exception: On errors that are not caused by a turn's data (e.g. the
+                database is down); the batch is then retried on the next flush
+        """
+        written, dead = 0, []
+        for entry, turn in batch:
+            try:
+                self.cold.store_turns([turn])
+                written += 1
+            except _DATA_ERRORS as e:
+                logger.error(f"Dead-lettering session memory turn {turn.get('turn_id')}: {str(e)}")
+                dead.append(self._dead_letter(entry, str(e)))
+        return written, dead
+
+    def _drain(self, token: str) -> int:
+        """Write journalled batches to PostgreSQL while holding the flush lock."""
+        lock_ms = SESSION_MEMORY_FLUSH_LOCK_TTL * 1000
+        flushed = 0
+        start = time.perf_counter()
+        try:
+            while True:
+                raw = self._client.lrange(PENDING_KEY, 0, self.batch_size - 1)
+                if not raw:
+                    break
+                batch, dead = [], []
+                for entry in raw:
+                    try:
+                        batch.append((entry, self._validate(entry)))
+                    except Exception as e:
+                        logger.error(f"Dead-lettering invalid session memory journal entry {entry[:200]!r}: {str(e)}")
+                        dead.append(self._dead_letter(entry, f"invalid entry: {str(e)}"))
+                head = batch[0][1]["turn_id"] if batch else None
+                written = 0
+                if batch:
+                    try:
+                        self.cold.store_turns([turn for _, turn in batch])
+                        written = len(batch)
+                    except Exception as e:
+                        failures = self._batch_failures.get(head, 0) + 1
+                        self._batch_failures = {head: failures}
+                        if failures < SESSION_MEMORY_FLUSH_MAX_ATTEMPTS:
+                            raise
+                        logger.error(
+                            f"Session memory batch failed {failures} times, writing it turn by turn: {str(e)}"
+                        )
+                        written, rejected = self._store_one_by_one(batch)
+                        dead.extend(rejected)
+                if not self._script(_TRIM_SCRIPT)(
+                    keys=[PENDING_KEY, FLUSH_LOCK_KEY, DEAD_LETTER_KEY],
+                    args=[len(raw), token, lock_ms, SESSION_MEMORY_DEAD_LETTER_MAX] + dead,
+                ):
+                    # Lease expired mid-flush; the new holder replays this batch idempotently
+                    logger.warning("Session memory flush lock lost, stopping this flush")
+                    break
+                self._batch_failures.pop(head, None)
+                flushed += written
+                if dead:
+                    self._count("dead_lettered", len(dead))
+        except Exception as e:
+            self._count("flush_errors")
+            logger.error(f"Session memory flush failed, {flushed} turns written; the rest stays journalled: {str(e)}")
+
+        if flushed:
+            with self._stats_lock:
+                self._stats["flushed"] += flushed
+                self._stats["flushes"] += 1
+                self._stats["last_flush_ms"] = 1000.0 * (time.perf_counter() - start)
+        return flushed
+
+    def _ensure_flusher(self) -> None:
+        """Start the flusher thread in this process if it is not running."""
+        if self.flush_interval <= 0 or self._flusher_pid == os.getpid():
+            return
+        with self._flusher_lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+            self._flusher_stop = threading.Event()
+            thread = threading.Thread(target=self._flusher, name="session-memory-flusher", daemon=True)
+            thread.start()
+
+    def _flusher(self) -> None:
+        """Flush the journal every ``flush_interval`` seconds, or sooner when a batch is full."""
+        stop = self._flusher_stop
+        while not stop.is_set():
+            self._flush_wakeup.wait(self.flush_interval)
+            self._flush_wakeup.clear()
+            if stop.is_set():
+                break
+            self.flush()
+
+    def stop_flusher(self) -> None:
+        """Stop the background flusher of this process and write out what is journalled."""
+        self._flusher_stop.set()
+        self._flush_wakeup.set()
+        self._flusher_pid = None
+        self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        try:
+            stats["pending"] = self._client.llen(PENDING_KEY)
+            stats["dead_letter"] = self._client.llen(DEAD_LETTER_KEY)
+        except Exception:
+            stats["pending"] = None
+            stats["dead_letter"] = None
+        return {"session_memory": stats}
+
+
+# Create a singleton instance
+tiered_session_memory = TieredSessionMemory()
+
+
+@atexit.register
+def _flush_on_exit() -> None:
+    if tiered_session_memory._flusher_pid == os.getpid():
+        tiered_session_memory.stop_flusher()
@@ -0,0 +1,449 @@
+"""
+Vector Store backends for RAGKA
+
+This module decouples knowledge-base retrieval from Azure AI Search. Every
+backend returns the same result dictionaries (chunk/title/parent_id/relevance)
+that ``EnhancedSimpleRedisRAGAssistant._search_kb`` post-processes, so the
+assistant can run against the live index or an in-process engine loaded from
+disk (for load tests, benchmarks and small tenants).
+"""
+
+import os
+import json
+import uuid
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from azure.core.credentials import AzureKeyCredential
+from azure.core.exceptions import HttpResponseError
+from azure.search.documents import SearchClient
+from azure.search.documents.models import VectorizedQuery
+
+from config import (
+    AZURE_SEARCH_SERVICE as SEARCH_ENDPOINT,
+    AZURE_SEARCH_INDEX as SEARCH_INDEX,
+    AZURE_SEARCH_KEY as SEARCH_KEY,
+    VECTOR_FIELD,
+    VECTOR_STORE_BACKEND,
+    LOCAL_VECTOR_STORE_PATH,
+    HNSW_M,
+    HNSW_EF_CONSTRUCTION,
+    HNSW_EF_SEARCH,
+    HYBRID_LEXICAL_SEARCH,
+    SYNONYM_MAP_PATH,
+)
+from services.hnsw_index import HNSWIndex
+from services.bm25_index import BM25Index, load_synonym_map
+from services.rank_fusion import reciprocal_rank_fusion
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+CHUNK_FIELDS = ["chunk", "title", "parent_id"]
+
+
+class VectorStore:
+    """
+    Interface for knowledge-base retrieval backends.
+
+    ``cache_id`` names the backend and the content it searches; caches of
+    search results key on it, so stores of different backends or of different
+    builds of a local index never share entries.
+    """
+
+    cache_id = "default"
+
+    def search(
+        self, query: str, vector: List[float], top: int = 8, include_vectors: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Return the ``top`` best chunks for a query.
+
+        Args:
+            query: Raw query text (used by backends with a lexical leg)
+            vector: Query embedding
+            top: Number of results to return
+            include_vectors: Also return each chunk's embedding under ``vector``
+                (a float32 array) for local re-ranking; backends that cannot
+                provide it omit the key
+
+        Returns:
+            List of dicts with ``chunk``, ``title``, ``parent_id`` and ``relevance``
+            (the backend's own score, higher is better)
+        """
+        raise NotImplementedError
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class AzureSearchVectorStore(VectorStore):
+    """Hybrid (text + vector) retrieval against the Azure AI Search index."""
+
+    def __init__(self, search_client=None, vector_field: str = VECTOR_FIELD):
+        if search_client is None:
+            search_client = SearchClient(
+                endpoint=f"https://{SEARCH_ENDPOINT}.search.windows.net",
+                index_name=SEARCH_INDEX,
+                credential=AzureKeyCredential(SEARCH_KEY),
+            )
+        self.search_client = search_client
+        self.vector_field = vector_field
+        # Content changes are tracked by the index version (services.index_version)
+        self.cache_id = "azure"
+        # Cleared if the index rejects selecting the vector field (not retrievable)
+        self._vectors_retrievable = bool(vector_field)
+
+    def search(
+        self, query: str, vector: List[float], top: int = 8, include_vectors: bool = False
+    ) -> List[Dict[str, Any]]:
+        select = list(CHUNK_FIELDS)
+        with_vectors = include_vectors and self._vectors_retrievable
+        if with_vectors:
+            select.append(self.vector_field)
+        try:
+            results = list(self._query(query, vector, top, select))
+        except HttpResponseError as e:
+            if not with_vectors:
+                raise
+            logger.warning(f"Cannot select vector field '{self.vector_field}', re-ranking without vectors: {str(e)}")
+            self._vectors_retrievable = False
+            with_vectors = False
+            results = list(self._query(query, vector, top, CHUNK_FIELDS))
+
+        output = []
+        for r in results:
+            result = {
+                "chunk": r.get("chunk", ""),
+                "title": r.get("title", "Untitled"),
+                "parent_id": r.get("parent_id", ""),
+                "relevance": float(r.get("@search.score") or 0.0),
+            }
+            if with_vectors and r.get(self.vector_field):
+                result["vector"] = np.asarray(r[self.vector_field], dtype=np.float32)
+            output.append(result)
+        return output
+
+    def _query(self, query: str, vector: List[float], top: int, select: List[str]):
+        return self.search_client.search(
+            search_text=query,
+            vector_queries=[
+                VectorizedQuery(
+                    vector=vector, k_nearest_neighbors=top, fields=self.vector_field
+                )
+            ],
+            select=select,
+            top=top,
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"backend": "azure", "index": getattr(self.search_client, "_index_name", SEARCH_INDEX)}
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    Brute-force in-process vector search.
+
+    Chunk vectors are held as one L2-normalized float32 matrix, so cosine
+    similarity (the metric of the Azure vector profile) is a single
+    matrix-vector product; the top-k are selected with ``argpartition``.
+
+    On-disk layout (a directory):
+    - vectors.npy → float32 matrix, one normalized row per chunk (memory-mapped on load)
+    - chunks.json → list of {chunk, title, parent_id} in row order
+    """
+
+    VECTORS_FILE = "vectors.npy"
+    CHUNKS_FILE = "chunks.json"
+
+    def __init__(self, vectors: np.ndarray, chunks: List[Dict[str, Any]], normalized: bool = False):
+        """
+        Args:
+            vectors: (n, dim) matrix of chunk embeddings
+            chunks: Chunk metadata, one entry per row of ``vectors``
+            normalized: Whether ``vectors`` rows are already unit length
+        """
+        if len(vectors) != len(chunks):
+            raise ValueError(f"Got {len(vectors)} vectors for {len(chunks)} chunks")
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not normalized:
+            vectors = _normalize_rows(vectors)
+        self.vectors = vectors
+        self.chunks = chunks
+        # Built in memory: only this instance has this content
+        self.cache_id = f"numpy-{uuid.uuid4().hex[:12]}"
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "NumpyVectorStore":
+        """Load a store previously written by :meth:`save`."""
+        vectors_file = os.path.join(path, cls.VECTORS_FILE)
+        chunks_file = os.path.join(path, cls.CHUNKS_FILE)
+        vectors = np.load(vectors_file, mmap_mode="r" if mmap else None)
+        with open(chunks_file, "r", encoding="utf-8") as f:
+            chunks = json.load(f)
+        logger.info(f"Loaded {len(chunks)} chunks from local vector store at {path}")
+        store = cls(vectors, chunks, normalized=True)
+        store.cache_id = f"numpy-{_files_identity([vectors_file, chunks_file])}"
+        return store
+
+    def save(self, path: str) -> None:
+        """Write the store to ``path`` (created if missing)."""
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, self.VECTORS_FILE), np.ascontiguousarray(self.vectors))
+        with open(os.path.join(path, self.CHUNKS_FILE), "w", encoding="utf-8") as f:
+            json.dump(self.chunks, f)
+
+    def search(
+        self, query: str, vector: List[float], top: int = 8, include_vectors: bool = False
+    ) -> List[Dict[str, Any]]:
+        if not len(self.chunks):
+            return []
+        q = _normalize_rows(np.asarray(vector, dtype=np.float32)[None, :])[0]
+        scores = self.vectors @ q
+        top = min(top, len(scores))
+        candidates = np.argpartition(-scores, top - 1)[:top]
+        ordered = candidates[np.argsort(-scores[candidates])]
+        results = [_chunk_result(self.chunks[int(i)], float(scores[i])) for i in ordered]
+        if include_vectors:
+            for result, row in zip(results, ordered):
+                result["vector"] = np.asarray(self.vectors[row])
+        return results
+
+    def get_vectors(self, rows: List[int]) -> np.ndarray:
+        """Return the normalized vectors of the given chunk rows."""
+        return np.asarray(self.vectors[np.asarray(rows, dtype=np.int64)])
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "numpy",
+            "chunks": len(self.chunks),
+            "dimensions": int(self.vectors.shape[1]) if self.vectors.ndim == 2 else 0,
+        }
+
+
+class HNSWVectorStore(VectorStore):
+    """
+    Approximate in-process vector search over an :class:`HNSWIndex`.
+
+    Shares the chunks.json layout of :class:`NumpyVectorStore`; the graph is
+    persisted in an ``hnsw/`` subdirectory next to it.
+    """
+
+    INDEX_DIR = "hnsw"
+
+    def __init__(self, index: HNSWIndex, chunks: List[Dict[str, Any]]):
+        if len(index) != len(chunks):
+            raise ValueError(f"Index holds {len(index)} vectors for {len(chunks)} chunks")
+        self.index = index
+        self.chunks = chunks
+        self._add_lock = threading.Lock()
+        # Built in memory: only this instance has this content
+        self.cache_id = f"hnsw-{uuid.uuid4().hex[:12]}"
+
+    @classmethod
+    def build(
+        cls,
+        store: NumpyVectorStore,
+        M: int = HNSW_M,
+        ef_construction: int = HNSW_EF_CONSTRUCTION,
+        ef_search: int = HNSW_EF_SEARCH,
+    ) -> "HNSWVectorStore":
+        """Build an HNSW graph over the vectors of an exact store."""
+        index = HNSWIndex(store.vectors.shape[1], M=M, ef_construction=ef_construction, ef_search=ef_search)
+        index.add(store.vectors)
+        return cls(index, list(store.chunks))
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True, ef_search: Optional[int] = None) -> "HNSWVectorStore":
+        """Load the graph from ``path/hnsw`` and the chunk metadata from ``path``."""
+        index_dir = os.path.join(path, cls.INDEX_DIR)
+        chunks_file = os.path.join(path, NumpyVectorStore.CHUNKS_FILE)
+        index = HNSWIndex.load(index_dir, mmap=mmap, ef_search=ef_search)
+        with open(chunks_file, "r", encoding="utf-8") as f:
+            chunks = json.load(f)
+        store = cls(index, chunks)
+        index_files = sorted(os.path.join(index_dir, name) for name in os.listdir(index_dir))
+        store.cache_id = f"hnsw-{_files_identity(index_files + [chunks_file])}"
+        return store
+
+    def save(self, path: str) -> None:
+        """Write the graph and chunk metadata to ``path``."""
+        self.index.save(os.path.join(path, self.INDEX_DIR))
+        with open(os.path.join(path, NumpyVectorStore.CHUNKS_FILE), "w", encoding="utf-8") as f:
+            json.dump(self.chunks, f)
+
+    def add(self, vectors: List[List[float]], chunks: List[Dict[str, Any]]) -> None:
+        """Incrementally insert new chunks."""
+        if len(vectors) != len(chunks):
+            raise ValueError(f"Got {len(vectors)} vectors for {len(chunks)} chunks")
+        with self._add_lock:
+            # Chunks are appended before their nodes are inserted, so a
+            # concurrent search never gets a node id without its chunk
+            start = len(self.chunks)
+            self.chunks.extend(chunks)
+            try:
+                self.index.add(vectors)
+            except Exception:
+                del self.chunks[start:]
+                raise
+        # The content no longer matches the files it was loaded from
+        self.cache_id = f"hnsw-{uuid.uuid4().hex[:12]}"
+
+    def search(
+        self,
+        query: str,
+        vector: List[float],
+        top: int = 8,
+        include_vectors: bool = False,
+        ef_search: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        hits = self.index.search(vector, k=top, ef_search=ef_search)
+        results = [_chunk_result(self.chunks[node], score) for node, score in hits]
+        if include_vectors and hits:
+            vectors = self.index.get_vectors([node for node, _ in hits])
+            for result, row_vector in zip(results, vectors):
+                result["vector"] = row_vector
+        return results
+
+    def get_vectors(self, rows: List[int]) -> np.ndarray:
+        """Return the normalized vectors of the given chunk rows."""
+        return self.index.get_vectors(rows)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "hnsw",
+            "chunks": len(self.chunks),
+            "M": self.index.M,
+            "ef_search": self.index.ef_search,
+        }
+
+
+class HybridVectorStore(VectorStore):
+    """
+    Fully local hybrid retrieval: a BM25 leg over the ``chunk`` field and the
+    vector leg of a local store, merged with reciprocal-rank fusion (as Azure
+    AI Search does for hybrid queries).
+    """
+
+    def __init__(self, vector_store: VectorStore, lexical_index: Optional[BM25Index] = None, candidates: int = 50):
+        """
+        Args:
+            vector_store: Local store exposing ``chunks`` (NumpyVectorStore or HNSWVectorStore)
+            lexical_index: BM25 index over ``vector_store.chunks`` (built if None)
+            candidates: Results taken from each leg before fusion
+        """
+        self.vector_store = vector_store
+        self.chunks = vector_store.chunks
+        self.lexical_index = lexical_index or BM25Index(
+            [c.get("chunk", "") for c in self.chunks],
+            synonyms=load_synonym_map(SYNONYM_MAP_PATH),
+        )
+        self.candidates = candidates
+
+    @property
+    def cache_id(self) -> str:
+        return f"hybrid-{self.vector_store.cache_id}"
+
+    def search(
+        self, query: str, vector: List[float], top: int = 8, include_vectors: bool = False
+    ) -> List[Dict[str, Any]]:
+        pool = max(top, self.candidates)
+        vector_results = self.vector_store.search(query, vector, top=pool, include_vectors=include_vectors)
+        lexical_hits = self.lexical_index.search(query, top=pool)
+        lexical_results = [_chunk_result(self.chunks[doc_id], score) for doc_id, score in lexical_hits]
+        if include_vectors and lexical_hits:
+            vectors = self.vector_store.get_vectors([doc_id for doc_id, _ in lexical_hits])
+            for result, row_vector in zip(lexical_results, vectors):
+                result["vector"] = row_vector
+        return reciprocal_rank_fusion([lexical_results, vector_results], top=top)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.vector_store.get_stats())
+        stats.update({"hybrid": True, "lexical_terms": self.lexical_index.num_terms})
+        return stats
+
+
+def _files_identity(paths: List[str]) -> str:
+    """Short digest of the paths, sizes and modification times of a local index's files."""
+    digest = hashlib.sha256()
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()[:12]
+
+
+def _chunk_result(chunk: Dict[str, Any], score: float) -> Dict[str, Any]:
+    return {
+        "chunk": chunk.get("chunk", ""),
+        "title": chunk.get("title", "Untitled"),
+        "parent_id": chunk.get("parent_id", ""),
+        "relevance": score,
+    }
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32, copy=False)
+
+
+def export_search_index(search_client, path: str, vector_field: str = VECTOR_FIELD) -> int:
+    """
+    Export every chunk and its vector from an Azure AI Search index into a
+    :class:`NumpyVectorStore` directory.
+
+    Args:
+        search_client: ``azure.search.documents.SearchClient`` for the source index
+        path: Output directory
+        vector_field: Name of the (retrievable) vector field
+
+    Returns:
+        Number of exported chunks
+    """
+    chunks = []
+    vectors = []
+    for doc in search_client.search(search_text="*", select=CHUNK_FIELDS + [vector_field]):
+        vector = doc.get(vector_field)
+        if not vector:
+            continue
+        chunks.append({field: doc.get(field, "") for field in CHUNK_FIELDS})
+        vectors.append(vector)
+    NumpyVectorStore(np.asarray(vectors, dtype=np.float32), chunks).save(path)
+    logger.info(f"Exported {len(chunks)} chunks to {path}")
+    return len(chunks)
+
+
+def create_vector_store(backend: Optional[str] = None) -> VectorStore:
+    """
+    Build the retrieval backend selected by ``VECTOR_STORE_BACKEND``.
+
+    Args:
+        backend: Override for the configured backend ("azure", "numpy" or "hnsw")
+
+    Returns:
+        A VectorStore instance
+    """
+    backend = (backend or VECTOR_STORE_BACKEND).lower()
+    if backend in ("numpy", "hnsw"):
+        store = _load_local_store(backend)
+        return HybridVectorStore(store) if HYBRID_LEXICAL_SEARCH else store
+    if backend != "azure":
+        logger.warning(f"Unknown vector store backend '{backend}', using Azure AI Search")
+    return AzureSearchVectorStore()
+
+
+def _load_local_store(backend: str) -> VectorStore:
+    if backend == "numpy":
+        return NumpyVectorStore.load(LOCAL_VECTOR_STORE_PATH)
+    if backend == "hnsw":
+        index_path = os.path.join(LOCAL_VECTOR_STORE_PATH, HNSWVectorStore.INDEX_DIR)
+        if os.path.exists(os.path.join(index_path, "meta.json")):
+            return HNSWVectorStore.load(LOCAL_VECTOR_STORE_PATH)
+        logger.info(f"No HNSW index at {index_path}, building one from the exported vectors")
+        store = HNSWVectorStore.build(NumpyVectorStore.load(LOCAL_VECTOR_STORE_PATH))
+        store.save(LOCAL_VECTOR_STORE_PATH)
+        return store
+    raise ValueError(f"Not a local vector store backend: {backend}")
@@ -8,3 +8,28 @@ CREATE TABLE IF NOT EXISTS session_memory (
 
 CREATE INDEX IF NOT EXISTS idx_session_memory_session_created_at
     ON session_memory (session_id, created_at DESC);
+
+-- SESSION_MEMORY_SCHEMA=partitioned: turns partitioned by UTC day and numbered
+-- per session. PostgresSessionMemory creates the daily partitions
+-- (session_memory_daily_YYYYMMDD) and drops those older than SESSION_MEMORY_TTL_DAYS.
+CREATE TABLE IF NOT EXISTS session_memory_daily (
+    turn_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    turn_no BIGINT NOT NULL,
+    user_msg TEXT,
+    bot_msg TEXT,
+    summary TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+) PARTITION BY RANGE (created_at);
+
+CREATE INDEX IF NOT EXISTS idx_session_memory_daily_session_turn
+    ON session_memory_daily (session_id, turn_no DESC);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_session_memory_daily_turn_id
+    ON session_memory_daily (turn_id, created_at);
+
+CREATE TABLE IF NOT EXISTS session_memory_counters (
+    session_id TEXT PRIMARY KEY,
+    turns BIGINT NOT NULL,
+    last_turn_at TIMESTAMPTZ NOT NULL
+);
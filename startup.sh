@@ -14,6 +14,12 @@ sleep 2
 redis-cli ping > /dev/null 2>&1
 if [ $? -eq 0 ]; then
     echo "Redis is running and responding to pings"
+    # Prefer the Unix socket of the co-located Redis over TCP loopback
+    REDIS_SOCKET=$(redis-cli config get unixsocket 2>/dev/null | sed -n 2p)
+    if [ -z "$REDIS_SOCKET_PATH" ] && [ -n "$REDIS_SOCKET" ] && [ -S "$REDIS_SOCKET" ]; then
+        export REDIS_SOCKET_PATH="$REDIS_SOCKET"
+        echo "Using Redis Unix socket $REDIS_SOCKET_PATH"
+    fi
 else
     echo "WARNING: Redis may not be running properly"
 fi
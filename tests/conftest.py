@@ -0,0 +1,19 @@
+"""
+Shared pytest configuration.
+
+``config`` reads its settings at import time, so the placeholder Azure
+settings have to be in the environment before the first test module imports
+anything from the application.
+"""
+
+import os
+
+os.environ.setdefault("AZURE_OPENAI_ENDPOINT", "https://example.com")
+os.environ.setdefault("AZURE_OPENAI_KEY", "test_key")
+os.environ.setdefault("AZURE_OPENAI_API_VERSION", "2024-02-01")
+os.environ.setdefault("CHAT_DEPLOYMENT_GPT4o", "test-deployment")
+os.environ.setdefault("EMBEDDING_DEPLOYMENT", "test-embedding")
+os.environ.setdefault("AZURE_SEARCH_SERVICE", "example-search")
+os.environ.setdefault("AZURE_SEARCH_INDEX", "test-index")
+os.environ.setdefault("AZURE_SEARCH_KEY", "test-key")
+os.environ.setdefault("VECTOR_FIELD", "test-vector")
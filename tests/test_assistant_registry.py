@@ -0,0 +1,115 @@
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+from services.assistant_registry import AssistantRegistry, estimate_size
+
+
+class Handle:
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.citations = {"1": "x" * 1000}
+
+
+class TestAssistantRegistry(unittest.TestCase):
+    def setUp(self):
+        self.factory = MagicMock(side_effect=Handle)
+        self.registry = AssistantRegistry(self.factory, max_size=2, idle_ttl=60, sweep_interval=0)
+
+    def test_get_creates_once_per_session(self):
+        first = self.registry.get("a")
+        self.assertIs(self.registry.get("a"), first)
+        self.assertEqual(self.factory.call_count, 1)
+        stats = self.registry.get_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["created"]), (1, 1, 1))
+
+    def test_evicts_least_recently_used(self):
+        self.registry.get("a")
+        self.registry.get("b")
+        self.registry.get("a")
+        self.registry.get("c")
+        self.assertIn("a", self.registry)
+        self.assertNotIn("b", self.registry)
+        self.assertEqual(self.registry.get_stats()["evicted_lru"], 1)
+
+    def test_evicts_idle_assistants(self):
+        with patch("services.assistant_registry.time.monotonic", return_value=1000.0):
+            self.registry.get("a")
+        with patch("services.assistant_registry.time.monotonic", return_value=1030.0):
+            self.registry.get("b")
+        with patch("services.assistant_registry.time.monotonic", return_value=1070.0):
+            self.assertEqual(self.registry.evict_idle(), 1)
+        self.assertNotIn("a", self.registry)
+        self.assertIn("b", self.registry)
+
+    def test_peek_does_not_create(self):
+        self.assertIsNone(self.registry.peek("a"))
+        with self.assertRaises(KeyError):
+            self.registry["a"]
+        self.factory.assert_not_called()
+
+    def test_remove(self):
+        self.registry.get("a")
+        self.assertTrue(self.registry.remove("a"))
+        self.assertFalse(self.registry.remove("a"))
+        self.assertEqual(len(self.registry), 0)
+
+    def test_size_accounting_skips_referenced_objects(self):
+        shared = MagicMock()
+        handle = Handle("a")
+        handle.client = shared
+        self.assertGreater(estimate_size(handle), 1000)
+        self.assertLess(estimate_size(handle), 5000)
+        self.registry.get("a")
+        self.assertGreater(self.registry.get_stats()["estimated_bytes"], 1000)
+
+    def test_slow_creation_does_not_block_other_sessions(self):
+        started, release = threading.Event(), threading.Event()
+
+        def factory(session_id):
+            if session_id == "slow":
+                started.set()
+                release.wait(5)
+            return Handle(session_id)
+
+        registry = AssistantRegistry(factory, max_size=2, idle_ttl=60, sweep_interval=0)
+        registry.get("a")
+        thread = threading.Thread(target=registry.get, args=("slow",))
+        thread.start()
+        self.assertTrue(started.wait(5))
+        try:
+            self.assertIsNotNone(registry.get("a"))
+            self.assertIsNotNone(registry.get("b"))
+        finally:
+            release.set()
+            thread.join(5)
+        self.assertIn("slow", registry)
+
+    def test_concurrent_creation_keeps_first_assistant(self):
+        # Both requests miss before either assistant is inserted
+        both_building = threading.Barrier(2, timeout=5)
+        created = []
+
+        def factory(session_id):
+            both_building.wait()
+            handle = Handle(session_id)
+            created.append(handle)
+            return handle
+
+        registry = AssistantRegistry(factory, max_size=2, idle_ttl=60, sweep_interval=0)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(registry.get("a"))) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(created), 2)
+        self.assertIs(results[0], results[1])
+        self.assertIs(registry.peek("a"), results[0])
+        stats = registry.get_stats()
+        self.assertEqual((stats["created"], stats["discarded"]), (1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Tests for the local BM25 index, synonym expansion and reciprocal-rank fusion.
+"""
+
+import unittest
+
+import numpy as np
+
+from services.bm25_index import BM25Index, SynonymMap, tokenize
+from services.rank_fusion import reciprocal_rank_fusion
+from services.vector_store import HybridVectorStore, NumpyVectorStore
+
+DOCS = [
+    "The GC inlet must be cleaned before ignition.",
+    "Gas chromatograph flame ionization detector will not ignite.",
+    "OpenLab software login requires Azure AD.",
+    "Replace the LC pump seal every six months.",
+]
+
+
+class TestSynonymMap(unittest.TestCase):
+    def test_equivalent_terms_expand_both_ways(self):
+        synonyms = SynonymMap("gc, gas chromatograph")
+        self.assertEqual(synonyms.expand(tokenize("GC ignition")), ["gc", "ignition", "gas", "chromatograph"])
+        self.assertIn("gc", synonyms.expand(tokenize("gas chromatograph fault")))
+
+    def test_explicit_mapping_replaces_source(self):
+        synonyms = SynonymMap("ols => openlab software\n# comment line")
+        self.assertEqual(len(synonyms), 1)
+        self.assertEqual(synonyms.expand(["ols", "login"]), ["login", "openlab", "software"])
+
+
+class TestBM25Index(unittest.TestCase):
+    def test_ranks_matching_document_first(self):
+        index = BM25Index(DOCS)
+        results = index.search("pump seal")
+        self.assertEqual(results[0][0], 3)
+        self.assertEqual(len(results), 1)
+
+    def test_no_match_returns_empty(self):
+        self.assertEqual(BM25Index(DOCS).search("spectrometer"), [])
+
+    def test_synonym_expansion_recalls_paraphrase(self):
+        plain = BM25Index(DOCS)
+        expanded = BM25Index(DOCS, synonyms=SynonymMap("gc, gas chromatograph"))
+        self.assertNotIn(1, [doc for doc, _ in plain.search("gc")])
+        self.assertIn(1, [doc for doc, _ in expanded.search("gc")])
+
+    def test_rarer_terms_weigh_more(self):
+        index = BM25Index(["alpha common", "beta common", "gamma common"])
+        results = index.search("alpha common")
+        self.assertEqual(results[0][0], 0)
+        self.assertGreater(results[0][1], results[1][1])
+
+
+class TestReciprocalRankFusion(unittest.TestCase):
+    def test_items_in_both_lists_rank_first(self):
+        a = [{"chunk": "x", "parent_id": "1"}, {"chunk": "y", "parent_id": "2"}]
+        b = [{"chunk": "y", "parent_id": "2"}, {"chunk": "z", "parent_id": "3"}]
+        fused = reciprocal_rank_fusion([a, b])
+
+        self.assertEqual([r["chunk"] for r in fused], ["y", "x", "z"])
+        self.assertAlmostEqual(fused[0]["relevance"], 1 / 62 + 1 / 61)
+
+    def test_top_limits_results(self):
+        results = [{"chunk": str(i), "parent_id": "p"} for i in range(10)]
+        self.assertEqual(len(reciprocal_rank_fusion([results], top=3)), 3)
+
+
+class TestHybridVectorStore(unittest.TestCase):
+    def test_lexical_leg_rescues_vector_miss(self):
+        chunks = [{"chunk": text, "title": f"t{i}", "parent_id": f"p{i}"} for i, text in enumerate(DOCS)]
+        vectors = np.eye(4, dtype=np.float32)
+        store = HybridVectorStore(NumpyVectorStore(vectors, chunks), BM25Index(DOCS), candidates=2)
+
+        results = store.search("pump seal", [1.0, 0.0, 0.0, 0.0], top=3)
+
+        self.assertEqual({r["chunk"] for r in results[:2]}, {DOCS[0], DOCS[3]})
+        self.assertEqual(set(results[0]), {"chunk", "title", "parent_id", "relevance"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -14,8 +14,12 @@ os.environ.setdefault("AZURE_SEARCH_INDEX", "test-index")
 os.environ.setdefault("AZURE_SEARCH_KEY", "test-key")
 os.environ.setdefault("VECTOR_FIELD", "test-vector")
 
-# Stub out database module to avoid heavy dependencies during import
-sys.modules.setdefault("db_manager", types.SimpleNamespace(DatabaseManager=object))
+# Stub out database module to avoid heavy dependencies during import (only when
+# it cannot be imported, so the stub does not leak into other test modules)
+try:
+    import db_manager  # noqa: F401
+except ImportError:
+    sys.modules.setdefault("db_manager", types.SimpleNamespace(DatabaseManager=object))
 
 from rag_assistant_simple_redis import EnhancedSimpleRedisRAGAssistant
 
@@ -0,0 +1,93 @@
+"""
+Tests for citation link rendering (single-pass and streaming).
+"""
+
+import random
+import unittest
+
+from services.citation_links import StreamingCitationLinker, citation_anchor, render_citation_links
+
+
+def stream(text, sizes):
+    linker = StreamingCitationLinker()
+    out = []
+    i = 0
+    for size in sizes:
+        out.append(linker.feed(text[i : i + size]))
+        i += size
+    out.append(linker.feed(text[i:]))
+    out.append(linker.flush())
+    return out, linker
+
+
+class TestStreamingCitationLinker(unittest.TestCase):
+    def test_links_markers_split_across_deltas(self):
+        out, linker = stream("Open the valve [12] now.", [16, 1, 1, 6])
+        expected = f"Open the valve {citation_anchor('12')} now."
+        self.assertEqual("".join(out), expected)
+        self.assertEqual(linker.html, expected)
+
+    def test_holds_back_only_the_partial_marker(self):
+        linker = StreamingCitationLinker()
+        self.assertEqual(linker.feed("Check the inlet [1"), "Check the inlet ")
+        self.assertEqual(linker.feed("]"), "")
+        self.assertEqual(linker.feed(" and"), citation_anchor("1") + " and")
+
+    def test_never_emits_a_partial_anchor(self):
+        rng = random.Random(3)
+        text = "Step 1. Purge [1]. Step 2. Heat [2][3]\n[4]\nDone [5]"
+        for _ in range(200):
+            linker = StreamingCitationLinker()
+            i = 0
+            while i < len(text):
+                step = rng.randint(1, 5)
+                chunk = linker.feed(text[i : i + step])
+                self.assertEqual(chunk.count("<a "), chunk.count("</a>"))
+                self.assertNotRegex(chunk, r"\[\d*$")
+                i += step
+            linker.flush()
+            self.assertEqual(linker.html.count("<a "), 5)
+            self.assertNotRegex(linker.html, r"<a[^>]*><a")
+
+    def test_drops_hallucinated_ref_suffix(self):
+        out, _ = stream("See [2]ref=doc_7 and [3]href=x.pdf done", [8, 3, 10, 5])
+        self.assertEqual("".join(out), f"See {citation_anchor('2')} and {citation_anchor('3')} done")
+
+    def test_flush_emits_incomplete_tail_verbatim(self):
+        out, _ = stream("array index [", [5])
+        self.assertEqual("".join(out), "array index [")
+
+    def test_plain_text_passes_through(self):
+        linker = StreamingCitationLinker()
+        self.assertEqual(linker.feed("no citations here"), "no citations here")
+        self.assertEqual(linker.flush(), "")
+
+
+class TestRenderCitationLinks(unittest.TestCase):
+    def test_links_markers_in_every_position(self):
+        text = "[1]\nText[2], (see [3]) and/[4] end"
+        html = render_citation_links(text)
+        for idx in "1234":
+            self.assertIn(citation_anchor(idx), html)
+        self.assertEqual(html.count("<a "), 4)
+
+    def test_is_idempotent(self):
+        once = render_citation_links("Example [1] more [2].\n[3]")
+        self.assertEqual(render_citation_links(once), once)
+        self.assertNotRegex(once, r"<a[^>]*><a")
+
+    def test_drops_hallucinated_ref_suffix(self):
+        html = render_citation_links("See [2]ref=doc_7 and [3]href=x.pdf done")
+        self.assertEqual(html, f"See {citation_anchor('2')} and {citation_anchor('3')} done")
+
+    def test_matches_streaming_output(self):
+        text = "Purge [1]. Heat [2][3]\n[4]\nDone [5]ref=abc"
+        out, _ = stream(text, [3, 7, 2, 9])
+        self.assertEqual(render_citation_links(text), "".join(out))
+
+    def test_anchor_is_cached_per_id(self):
+        self.assertIs(citation_anchor("42"), citation_anchor("42"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+"""
+Tests for the token-budgeted context packer.
+"""
+
+import unittest
+
+from services.context_packer import ContextPacker, strip_citation_markup, truncate_to_tokens
+
+
+def words(text):
+    return len(text.split())
+
+
+ANCHOR = (
+    '<a href="javascript:void(0);" class="session-citation-link text-blue-600 hover:text-blue-800" '
+    'data-citation-id="2" onclick="handleSessionCitationClick(2)">[2]</a>'
+)
+
+
+class TestHelpers(unittest.TestCase):
+    def test_strip_citation_markup(self):
+        self.assertEqual(strip_citation_markup(f"Open the valve {ANCHOR}."), "Open the valve [2].")
+        self.assertEqual(strip_citation_markup("plain [1]"), "plain [1]")
+
+    def test_truncate_to_tokens(self):
+        text = " ".join(f"w{i}" for i in range(50))
+        cut = truncate_to_tokens(text, 10, words)
+        self.assertLessEqual(words(cut), 10)
+        self.assertTrue(cut.endswith("…"))
+        self.assertEqual(truncate_to_tokens("short text", 10, words), "short text")
+
+
+class TestContextPacker(unittest.TestCase):
+    def turn(self, i, length=20, summary=True):
+        return {
+            "user": f"question {i}",
+            "assistant": " ".join(["answer"] * length) + f" {ANCHOR}",
+            "summary": f"summary of turn {i}" if summary else None,
+        }
+
+    def test_everything_fits_under_a_large_budget(self):
+        packer = ContextPacker(budget=10_000, counter=words)
+        packed = packer.pack(["chunk one", "chunk two"], [self.turn(1), self.turn(2)])
+
+        self.assertIn("chunk two", packed.kb_section)
+        self.assertIn("question 1", packed.history_section)
+        self.assertNotIn("<a ", packed.history_section)
+        self.assertEqual(packed.stats["turns_verbatim"], 2)
+        self.assertLessEqual(packed.tokens, 10_000)
+
+    def test_kb_chunks_take_priority_over_history(self):
+        packer = ContextPacker(budget=30, counter=words, min_chunk_tokens=5)
+        kb = [" ".join(["kb"] * 25)]
+        packed = packer.pack(kb, [self.turn(1)])
+
+        self.assertEqual(packed.stats["kb_chunks"], 1)
+        self.assertLessEqual(packed.tokens, 30)
+        self.assertNotIn("question 1", packed.history_section)
+
+    def test_old_turns_are_replaced_by_summaries(self):
+        packer = ContextPacker(budget=60, recent_turns=1, counter=words)
+        turns = [self.turn(1), self.turn(2), self.turn(3)]
+        packed = packer.pack([], turns)
+
+        self.assertIn("question 3", packed.history_section)
+        self.assertIn("summary of turn 2", packed.history_section)
+        self.assertNotIn("question 2", packed.history_section)
+        self.assertEqual(packed.stats["turns_verbatim"], 1)
+        self.assertEqual(packed.stats["turns_summarized"], 2)
+        # Oldest first, as in the original prompt
+        self.assertLess(
+            packed.history_section.index("summary of turn 1"),
+            packed.history_section.index("question 3"),
+        )
+
+    def test_truncated_kb_chunk_ends_the_kb_section(self):
+        packer = ContextPacker(budget=40, counter=words, min_chunk_tokens=5)
+        kb = [" ".join(["a"] * 30), " ".join(["b"] * 30)]
+        packed = packer.pack(kb, [])
+
+        self.assertEqual(packed.stats["kb_chunks"], 2)
+        self.assertEqual(packed.stats["kb_truncated"], 1)
+        self.assertLessEqual(packed.tokens, 40)
+
+    def test_recent_turn_falls_back_to_summary_and_older_turns_are_dropped(self):
+        packer = ContextPacker(budget=12, recent_turns=1, counter=words, min_chunk_tokens=50)
+        packed = packer.pack([], [self.turn(1, summary=False), self.turn(2)])
+        self.assertEqual(packed.history_section, "**Earlier turn (summary):** summary of turn 2")
+        self.assertEqual(packed.stats["turns_dropped"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import gc
+import unittest
+from unittest.mock import MagicMock, patch
+
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+
+from db_manager import DatabaseManager, PostgresConnectionPool
+
+
+def make_conn():
+    conn = MagicMock()
+    conn.closed = 0
+    conn.get_transaction_status.return_value = extensions.TRANSACTION_STATUS_IDLE
+    return conn
+
+
+class TestPostgresConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.connect = MagicMock(side_effect=lambda: make_conn())
+        self.pool = PostgresConnectionPool(self.connect, maxconn=2, timeout=0.05, idle_check=30, max_lifetime=1800)
+
+    def test_reuses_released_connection(self):
+        first = self.pool.acquire()
+        raw = first._conn
+        first.close()
+        second = self.pool.acquire()
+        self.assertIs(second._conn, raw)
+        self.assertEqual(self.connect.call_count, 1)
+        stats = self.pool.get_stats()
+        self.assertEqual(stats["borrowed"], 2)
+        self.assertEqual(stats["reused"], 1)
+        self.assertEqual(stats["in_use"], 1)
+
+    def test_close_is_idempotent(self):
+        conn = self.pool.acquire()
+        conn.close()
+        conn.close()
+        self.assertEqual(self.pool.get_stats()["idle"], 1)
+
+    def test_connection_dropped_without_close_frees_its_slot(self):
+        held = self.pool.acquire()  # noqa: F841 (held until the end)
+        leaked = self.pool.acquire()
+        raw = leaked._conn
+        del leaked
+        gc.collect()
+
+        replacement = self.pool.acquire()
+        self.assertIsNot(replacement._conn, raw)
+        raw.close.assert_called_once()
+        stats = self.pool.get_stats()
+        self.assertEqual(stats["leaked"], 1)
+        self.assertEqual(stats["open"], 2)
+
+    def test_closed_connection_is_not_reclaimed(self):
+        conn = self.pool.acquire()
+        conn.close()
+        del conn
+        gc.collect()
+        stats = self.pool.get_stats()
+        self.assertEqual((stats["leaked"], stats["idle"], stats["open"]), (0, 1, 1))
+
+    def test_blocks_then_times_out_when_exhausted(self):
+        borrowed = [self.pool.acquire(), self.pool.acquire()]  # noqa: F841 (held until the end)
+        with self.assertRaises(PoolError):
+            self.pool.acquire()
+        stats = self.pool.get_stats()
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertEqual(stats["open"], 2)
+
+    def test_release_rolls_back_open_transaction(self):
+        conn = self.pool.acquire()
+        conn._conn.get_transaction_status.return_value = extensions.TRANSACTION_STATUS_INTRANS
+        conn.close()
+        conn._conn.rollback.assert_called_once()
+
+    def test_broken_idle_connection_is_replaced(self):
+        self.pool.idle_check = 0
+        conn = self.pool.acquire()
+        broken = conn._conn
+        broken.cursor.return_value.__enter__.return_value.execute.side_effect = Exception("server closed")
+        conn.close()
+        replacement = self.pool.acquire()
+        self.assertIsNot(replacement._conn, broken)
+        broken.close.assert_called_once()
+        stats = self.pool.get_stats()
+        self.assertEqual(stats["health_check_failures"], 1)
+        self.assertEqual(stats["open"], 1)
+
+    def test_connect_error_frees_slot(self):
+        self.connect.side_effect = Exception("refused")
+        with self.assertRaises(Exception):
+            self.pool.acquire()
+        self.assertEqual(self.pool.get_stats()["open"], 0)
+
+
+class TestDatabaseManagerConnection(unittest.TestCase):
+    def test_connection_rolls_back_and_returns_on_error(self):
+        conn = MagicMock()
+        with patch("db_manager.DatabaseManager.get_connection", return_value=conn):
+            with self.assertRaises(ValueError):
+                with DatabaseManager.connection():
+                    raise ValueError("boom")
+        conn.rollback.assert_called_once()
+        conn.close.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
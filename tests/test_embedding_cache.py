@@ -0,0 +1,71 @@
+"""
+Tests for the two-tier embedding cache.
+"""
+
+import unittest
+from unittest.mock import MagicMock
+
+from services.embedding_cache import EmbeddingCache, normalize_query
+
+
+class TestNormalizeQuery(unittest.TestCase):
+    def test_near_duplicates_share_a_key(self):
+        self.assertEqual(
+            normalize_query("Troubleshoot Agilent GC."),
+            normalize_query("  troubleshoot   agilent gc "),
+        )
+
+    def test_distinct_queries_differ(self):
+        self.assertNotEqual(normalize_query("GC ignition"), normalize_query("LC ignition"))
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    def setUp(self):
+        self.store = {}
+        self.mock_redis = MagicMock()
+        self.mock_redis.get.side_effect = lambda key: self.store.get(key)
+        self.mock_redis.set.side_effect = lambda key, value, exp=None: self.store.__setitem__(key, value)
+        self.cache = EmbeddingCache(redis=self.mock_redis, max_entries=2, ttl=60)
+
+    def test_miss_then_local_hit(self):
+        self.assertIsNone(self.cache.get("What is GC?", "embed"))
+        self.cache.put("What is GC?", "embed", [0.5, 0.25])
+
+        self.assertEqual(self.cache.get("what is gc", "embed"), [0.5, 0.25])
+        stats = self.cache.get_stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["local_hits"], 1)
+        self.assertEqual(stats["redis_hits"], 0)
+
+    def test_redis_tier_backfills_local(self):
+        self.cache.put("q", "embed", [1.0, 2.0])
+        self.cache.clear_local()
+
+        self.assertEqual(self.cache.get("q", "embed"), [1.0, 2.0])
+        self.assertEqual(self.cache.get_stats()["redis_hits"], 1)
+        self.assertEqual(self.cache.get("q", "embed"), [1.0, 2.0])
+        self.assertEqual(self.cache.get_stats()["local_hits"], 1)
+
+    def test_deployment_is_part_of_key(self):
+        self.cache.put("q", "embed-a", [1.0])
+        self.assertIsNone(self.cache.get("q", "embed-b"))
+
+    def test_lru_eviction(self):
+        self.cache.put("a", "embed", [1.0])
+        self.cache.put("b", "embed", [2.0])
+        self.cache.get("a", "embed")
+        self.cache.put("c", "embed", [3.0])
+
+        self.assertEqual(self.cache.get_stats()["local_entries"], 2)
+        self.mock_redis.get.side_effect = lambda key: None
+        self.assertIsNone(self.cache.get("b", "embed"))
+        self.assertEqual(self.cache.get("a", "embed"), [1.0])
+
+    def test_redis_errors_are_misses(self):
+        self.mock_redis.get.side_effect = Exception("Redis error")
+        self.assertIsNone(self.cache.get("q", "embed"))
+        self.assertEqual(self.cache.get_stats()["misses"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
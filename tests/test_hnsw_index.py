@@ -0,0 +1,131 @@
+"""
+Tests for the in-process HNSW vector index.
+"""
+
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+
+from services.hnsw_index import HNSWIndex
+from services.vector_store import HNSWVectorStore, NumpyVectorStore
+
+
+def _exact_top_k(vectors, query, k):
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return set(np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:k].tolist())
+
+
+class TestHNSWIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(3)
+        centers = rng.standard_normal((10, 32))
+        cls.vectors = (centers[rng.integers(0, 10, 400)] + 0.3 * rng.standard_normal((400, 32))).astype(np.float32)
+        cls.queries = cls.vectors[:20] + 0.05 * rng.standard_normal((20, 32)).astype(np.float32)
+        cls.index = HNSWIndex(32, M=8, ef_construction=64, ef_search=32)
+        cls.index.add(cls.vectors)
+
+    def test_recall_against_exact_search(self):
+        hits = 0
+        for query in self.queries:
+            found = {node for node, _ in self.index.search(query, k=5)}
+            hits += len(found & _exact_top_k(self.vectors, query, 5))
+        self.assertGreaterEqual(hits / (5 * len(self.queries)), 0.9)
+
+    def test_finds_itself_with_unit_similarity(self):
+        node, score = self.index.search(self.vectors[42], k=1)[0]
+        self.assertEqual(node, 42)
+        self.assertAlmostEqual(score, 1.0, places=5)
+
+    def test_larger_ef_does_not_reduce_recall(self):
+        def recall(ef):
+            return sum(
+                len({n for n, _ in self.index.search(q, k=5, ef_search=ef)} & _exact_top_k(self.vectors, q, 5))
+                for q in self.queries
+            )
+
+        self.assertGreaterEqual(recall(128), recall(5))
+
+    def test_empty_index(self):
+        self.assertEqual(HNSWIndex(4).search([1, 0, 0, 0]), [])
+
+    def test_rejects_wrong_dimensions(self):
+        with self.assertRaises(ValueError):
+            HNSWIndex(4).add([[1.0, 2.0]])
+
+    def test_save_load_and_incremental_insert(self):
+        with tempfile.TemporaryDirectory() as path:
+            self.index.save(path)
+            loaded = HNSWIndex.load(path, mmap=True)
+            self.assertEqual(len(loaded), len(self.index))
+            self.assertEqual(loaded.search(self.queries[0], k=5), self.index.search(self.queries[0], k=5))
+
+            new_vector = np.full(32, 5.0, dtype=np.float32)
+            self.assertEqual(loaded.add([new_vector]), [len(self.vectors)])
+            self.assertEqual(loaded.search(new_vector, k=1)[0][0], len(self.vectors))
+
+
+class TestHNSWVectorStore(unittest.TestCase):
+    def test_store_round_trip(self):
+        rng = np.random.default_rng(5)
+        vectors = rng.standard_normal((60, 8)).astype(np.float32)
+        chunks = [{"chunk": f"c{i}", "title": f"t{i}", "parent_id": f"p{i}"} for i in range(60)]
+        store = HNSWVectorStore.build(NumpyVectorStore(vectors, chunks), M=8, ef_construction=32, ef_search=32)
+
+        with tempfile.TemporaryDirectory() as path:
+            store.save(path)
+            loaded = HNSWVectorStore.load(path)
+            results = loaded.search("q", vectors[9].tolist(), top=3)
+
+        self.assertEqual(results[0]["chunk"], "c9")
+        self.assertEqual(set(results[0]), {"chunk", "title", "parent_id", "relevance"})
+
+        store.add([vectors[0] * -1], [{"chunk": "new", "title": "n", "parent_id": "pn"}])
+        self.assertEqual(store.search("q", (vectors[0] * -1).tolist(), top=1)[0]["chunk"], "new")
+
+
+    def test_search_during_incremental_adds(self):
+        rng = np.random.default_rng(11)
+        vectors = rng.standard_normal((600, 8)).astype(np.float32)
+        chunks = [{"chunk": f"c{i}", "title": f"t{i}", "parent_id": f"p{i}"} for i in range(600)]
+        store = HNSWVectorStore.build(NumpyVectorStore(vectors[:1], chunks[:1]), M=4, ef_construction=16, ef_search=16)
+        errors = []
+        done = threading.Event()
+
+        def search():
+            while not done.is_set():
+                try:
+                    for result in store.search("q", rng.standard_normal(8).tolist(), top=5):
+                        self.assertIn(result["chunk"], {c["chunk"] for c in chunks})
+                except Exception as e:  # noqa: BLE001
+                    errors.append(e)
+                    return
+
+        readers = [threading.Thread(target=search) for _ in range(3)]
+        for reader in readers:
+            reader.start()
+        for i in range(1, 600, 5):
+            store.add(vectors[i:i + 5], chunks[i:i + 5])
+        done.set()
+        for reader in readers:
+            reader.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(store.index), len(store.chunks))
+        self.assertEqual(store.search("q", vectors[300].tolist(), top=1)[0]["chunk"], "c300")
+
+    def test_failed_add_keeps_chunks_aligned(self):
+        rng = np.random.default_rng(12)
+        vectors = rng.standard_normal((10, 8)).astype(np.float32)
+        chunks = [{"chunk": f"c{i}", "title": f"t{i}", "parent_id": f"p{i}"} for i in range(10)]
+        store = HNSWVectorStore.build(NumpyVectorStore(vectors, chunks), M=4, ef_construction=16)
+
+        with self.assertRaises(ValueError):
+            store.add(np.zeros((1, 4)), [{"chunk": "bad", "title": "b", "parent_id": "pb"}])
+        self.assertEqual(len(store.chunks), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
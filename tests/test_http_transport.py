@@ -0,0 +1,156 @@
+"""
+Tests for the pooled Azure OpenAI HTTP transport.
+"""
+
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import httpx
+
+from services import http_transport
+from services.http_transport import PooledTransport, _deployment, create_http_client
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    wbufsize = -1
+
+    release = threading.Event()
+
+    def do_POST(self):
+        if self.path == "/slow":
+            self.release.wait(5)
+        self.rfile.read(int(self.headers.get("content-length", 0)))
+        body = json.dumps({"ok": True}).encode()
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestPooledTransport(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_connections_are_reused(self):
+        client = create_http_client(http2=False)
+        with client:
+            for _ in range(5):
+                client.post(f"{self.base_url}/openai/deployments/gpt-4o/chat/completions", json={})
+            stats = client._transport.get_stats()
+
+        self.assertEqual(stats["requests"], 5)
+        self.assertEqual(stats["connections_opened"], 1)
+        self.assertEqual(stats["connections_reused"], 4)
+        self.assertEqual(stats["connections_open"], 1)
+        self.assertEqual(stats["connections_idle"], 1)
+        self.assertEqual(stats["requests_waiting"], 0)
+        self.assertEqual(stats["requests_by_deployment"], {"gpt-4o": 5})
+
+    def test_requests_wait_for_a_free_connection(self):
+        client = create_http_client(max_connections=2, max_keepalive=2, http2=False)
+        _Handler.release.clear()
+        with client:
+            threads = [
+                threading.Thread(target=client.post, args=(f"{self.base_url}/slow",), kwargs={"json": {}})
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            deadline = time.monotonic() + 5
+            while client._transport.get_stats()["requests_waiting"] < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            waiting = client._transport.get_stats()
+            _Handler.release.set()
+            for thread in threads:
+                thread.join(5)
+            stats = client._transport.get_stats()
+
+        self.assertEqual(waiting["requests_waiting"], 2)
+        self.assertEqual(waiting["connections_open"], 2)
+        self.assertEqual(stats["requests"], 4)
+        self.assertEqual(stats["requests_waiting"], 0)
+        self.assertEqual(stats["requests_by_deployment"], {"-": 4})
+
+    def test_errors_are_counted(self):
+        client = create_http_client(http2=False)
+        with client, self.assertRaises(httpx.ConnectError):
+            client.post("http://127.0.0.1:1/openai/embeddings", json={})
+        self.assertEqual(client._transport.get_stats()["errors"], 1)
+
+    def test_outer_trace_still_called(self):
+        events = []
+        transport = PooledTransport()
+        with httpx.Client(transport=transport) as client:
+            client.post(
+                f"{self.base_url}/x", json={}, extensions={"trace": lambda event, info: events.append(event)}
+            )
+        self.assertIn("connection.connect_tcp.complete", events)
+
+    def test_http2_falls_back_without_h2(self):
+        with patch("services.http_transport.http2_available", return_value=False):
+            client = create_http_client(http2=True)
+        self.assertFalse(client._transport._pool._http2)
+        client.close()
+
+
+class TestSharedHttpClient(unittest.TestCase):
+    def test_deployment_from_url(self):
+        request = httpx.Request("POST", "https://x.openai.azure.com/openai/deployments/gpt-4o/chat/completions")
+        self.assertEqual(_deployment(request), "gpt-4o")
+        self.assertIsNone(_deployment(httpx.Request("GET", "https://x/openai/models")))
+
+    def test_client_is_per_process(self):
+        with patch.object(http_transport, "_client", None), patch.object(http_transport, "_pid", None):
+            self.assertEqual(http_transport.get_http_pool_stats(), {})
+            client = http_transport.get_http_client()
+            self.assertIs(http_transport.get_http_client(), client)
+            with patch("services.http_transport.os.getpid", return_value=-1):
+                self.assertIsNot(http_transport.get_http_client(), client)
+            client.close()
+
+    def test_deployment_clients_share_the_pool(self):
+        from services import shared_clients
+
+        with patch.object(shared_clients, "_clients", {}), patch.object(shared_clients, "_pid", None), \
+                patch.object(shared_clients, "OPENAI_DEPLOYMENTS", {"gpt-4o", "text-embedding"}):
+            chat = shared_clients.get_openai_client("gpt-4o")
+            embeddings = shared_clients.get_openai_client("text-embedding")
+            self.assertIsNot(chat, embeddings)
+            self.assertIs(shared_clients.get_openai_client("gpt-4o"), chat)
+            self.assertIs(chat._client, embeddings._client)
+            self.assertIs(shared_clients.get_openai_service("gpt-4o").client, chat)
+            self.assertIn("/deployments/gpt-4o", str(chat.base_url))
+
+    def test_unconfigured_deployments_are_rejected(self):
+        from services import shared_clients
+
+        clients = {}
+        with patch.object(shared_clients, "_clients", clients), patch.object(shared_clients, "_pid", None), \
+                patch.object(shared_clients, "OPENAI_DEPLOYMENTS", {"gpt-4o"}):
+            for name in ("gpt-4o-typo", "x" * 1000):
+                with self.assertRaises(ValueError):
+                    shared_clients.get_openai_client(name)
+                with self.assertRaises(ValueError):
+                    shared_clients.get_openai_service(name)
+            self.assertEqual(clients, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
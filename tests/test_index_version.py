@@ -0,0 +1,46 @@
+"""
+Tests for the published knowledge-base index version.
+"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+from services.index_version import IndexVersionService
+
+
+class TestIndexVersionService(unittest.TestCase):
+    def setUp(self):
+        self.redis = MagicMock()
+
+    def test_reads_redis_on_every_lookup_by_default(self):
+        service = IndexVersionService(redis=self.redis)
+        self.redis.get.return_value = b"1"
+        self.assertEqual(service.get_version("kb"), "1")
+        # Bumped by another worker
+        self.redis.get.return_value = b"2"
+        self.assertEqual(service.get_version("kb"), "2")
+        self.assertEqual(self.redis.get.call_count, 2)
+
+    def test_refresh_interval_reuses_version(self):
+        service = IndexVersionService(redis=self.redis, refresh_interval=30)
+        self.redis.get.return_value = b"1"
+        with patch("services.index_version.time.monotonic", return_value=100.0):
+            service.get_version("kb")
+            self.redis.get.return_value = b"2"
+            self.assertEqual(service.get_version("kb"), "1")
+        with patch("services.index_version.time.monotonic", return_value=131.0):
+            self.assertEqual(service.get_version("kb"), "2")
+
+    def test_missing_version_uses_setting(self):
+        self.redis.get.return_value = None
+        with patch("services.index_version.KB_INDEX_VERSION", "7"):
+            self.assertEqual(IndexVersionService(redis=self.redis).get_version("kb"), "7")
+
+    def test_bump_publishes_new_version(self):
+        service = IndexVersionService(redis=self.redis)
+        version = service.bump_version("kb")
+        self.redis.set.assert_called_once_with("kb:index_version:kb", version, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,253 @@
+"""
+Tests for the staged turn pipeline.
+"""
+
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+from services.pipeline import PipelineMetrics, TurnTimings, submit_background
+from rag_assistant_simple_redis import EnhancedSimpleRedisRAGAssistant
+
+
+class TestPipelineMetrics(unittest.TestCase):
+    def test_percentiles(self):
+        metrics = PipelineMetrics(window=100)
+        for ms in range(1, 101):
+            metrics.record("search", ms / 1000.0)
+
+        stats = metrics.get_stats()["search"]
+        self.assertEqual(stats["count"], 100)
+        self.assertAlmostEqual(stats["p50_ms"], 50.0)
+        self.assertAlmostEqual(stats["p95_ms"], 95.0)
+
+    def test_window_is_bounded(self):
+        metrics = PipelineMetrics(window=2)
+        for seconds in (10.0, 0.001, 0.001):
+            metrics.record("llm", seconds)
+        stats = metrics.get_stats()["llm"]
+        self.assertEqual(stats["count"], 3)
+        self.assertAlmostEqual(stats["p95_ms"], 1.0)
+
+    def test_turn_timings_forward_to_metrics(self):
+        metrics = PipelineMetrics()
+        timings = TurnTimings(metrics)
+        with timings.stage("history"):
+            pass
+        self.assertIn("history", timings.durations)
+        self.assertEqual(metrics.get_stats()["history"]["count"], 1)
+
+    def test_background_failures_are_swallowed(self):
+        def boom():
+            raise RuntimeError("db down")
+
+        self.assertIsNone(submit_background(boom).result(timeout=5))
+
+
+class TestGenerateResponsePipeline(unittest.TestCase):
+    def setUp(self):
+        self.memory = MagicMock()
+        self.memory.get_turns.return_value = [{"user": "earlier question", "assistant": "earlier answer", "summary": None}]
+        self.semantic_cache = MagicMock()
+        self.semantic_cache.enabled = False
+        self.search_cache = MagicMock()
+        self.search_cache.get.return_value = None
+        self.session_state = MagicMock()
+        self.assistant = EnhancedSimpleRedisRAGAssistant(
+            "session-1",
+            memory=self.memory,
+            embedding_cache=MagicMock(),
+            vector_store=MagicMock(),
+            semantic_cache=self.semantic_cache,
+            search_cache=self.search_cache,
+            session_state=self.session_state,
+        )
+        self.assistant.openai_svc = MagicMock()
+        self.assistant.openai_svc.get_chat_response.return_value = "Open the valve [1]."
+        self.assistant.openai_svc.summarize_text.return_value = "summary"
+        self.assistant.citation_registry = MagicMock()
+        self.assistant.citation_registry.register_sources.side_effect = lambda sid, sources: [
+            dict(s, citation_id=s["index"]) for s in sources
+        ]
+        self.chunks = [{"chunk": "Step 1. Open the valve", "title": "Manual", "parent_id": "p1"}]
+
+    def test_history_and_search_run_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def history(*args, **kwargs):
+            barrier.wait()
+            return [{"user": "q", "assistant": "a", "summary": None}]
+
+        def search(query):
+            barrier.wait()
+            return self.chunks
+
+        self.memory.get_turns.side_effect = history
+        with patch.object(self.assistant, "_search_kb", side_effect=search), patch(
+            "rag_assistant_simple_redis.DatabaseManager"
+        ):
+            answer, sources = self.assistant.generate_response("How do I open the valve?")
+            self.assistant._wait_for_pending_write()
+
+        self.assertIn("session-citation-link", answer)
+        self.assertEqual(sources[0]["citation_id"], 1)
+
+    def test_post_answer_work_runs_in_background(self):
+        release = threading.Event()
+        self.assistant.openai_svc.summarize_text.side_effect = lambda text: release.wait(5) and "summary"
+
+        with patch.object(self.assistant, "_search_kb", return_value=self.chunks), patch(
+            "rag_assistant_simple_redis.DatabaseManager"
+        ) as db:
+            self.assistant.generate_response("How do I open the valve?")
+            self.memory.store_turn.assert_not_called()
+
+            release.set()
+            self.assistant._wait_for_pending_write()
+
+        self.memory.store_turn.assert_called_once()
+        self.assertEqual(self.memory.store_turn.call_args[0][3], "summary")
+        db.log_rag_query.assert_called_once()
+
+    def test_next_turn_waits_for_previous_write(self):
+        order = []
+        release = threading.Event()
+
+        def summarize(text):
+            release.wait(5)
+            return "summary"
+
+        self.assistant.openai_svc.summarize_text.side_effect = summarize
+        self.memory.store_turn.side_effect = lambda *args: order.append("store")
+        self.memory.get_turns.side_effect = lambda *args, **kwargs: order.append("history") or []
+
+        with patch.object(self.assistant, "_search_kb", return_value=self.chunks), patch(
+            "rag_assistant_simple_redis.DatabaseManager"
+        ):
+            self.assistant.generate_response("first")
+            threading.Timer(0.05, release.set).start()
+            self.assistant.generate_response("second")
+            self.assistant._wait_for_pending_write()
+
+        self.assertEqual(order, ["history", "store", "history", "store"])
+
+    def test_pending_turn_is_shared_with_other_workers(self):
+        with patch.object(self.assistant, "_search_kb", return_value=self.chunks), patch(
+            "rag_assistant_simple_redis.DatabaseManager"
+        ):
+            self.assistant.generate_response("How do I open the valve?")
+            self.assistant._wait_for_pending_write()
+
+        self.session_state.mark_turn_pending.assert_called_once()
+        self.session_state.clear_turn_pending.assert_called_once_with("session-1")
+        self.session_state.add_citation_sources.assert_called_once()
+
+    def test_new_worker_waits_for_turn_stored_elsewhere(self):
+        self.session_state.wait_for_turn.return_value = True
+        with patch.object(self.assistant, "_search_kb", return_value=self.chunks), patch(
+            "rag_assistant_simple_redis.DatabaseManager"
+        ):
+            self.assistant.generate_response("How do I open the valve?")
+
+        self.session_state.wait_for_turn.assert_called_once()
+        self.assertEqual(self.session_state.wait_for_turn.call_args[0][0], "session-1")
+
+
+    def test_semantic_cache_is_keyed_by_answer_variant(self):
+        self.semantic_cache.enabled = True
+        self.semantic_cache.lookup.return_value = None
+        with patch.object(self.assistant, "_make_embedding", return_value=[1.0, 0.0]), patch.object(
+            self.assistant, "_search_kb", return_value=self.chunks
+        ):
+            self.assistant._retrieve("q", TurnTimings(PipelineMetrics()))
+            self.assistant.apply_settings({"max_completion_tokens": 600})
+            self.assistant._retrieve("q", TurnTimings(PipelineMetrics()))
+
+        first, second = [c.args[1] for c in self.semantic_cache.lookup.call_args_list]
+        self.assertNotEqual(first, second)
+        self.assertIn("600", second)
+
+
+class TestSearchKbRerank(unittest.TestCase):
+    def setUp(self):
+        self.vector_store = MagicMock()
+        self.search_cache = MagicMock()
+        self.search_cache.get.return_value = None
+        self.assistant = EnhancedSimpleRedisRAGAssistant(
+            "session-1",
+            memory=MagicMock(),
+            embedding_cache=MagicMock(),
+            vector_store=self.vector_store,
+            semantic_cache=MagicMock(),
+            search_cache=self.search_cache,
+            session_state=MagicMock(),
+            mmr_rerank=True,
+        )
+        self.candidates = [
+            {"chunk": f"chunk {i}", "parent_id": f"p{i}", "relevance": 1.0 - i / 100, "vector": [1.0, float(i)]}
+            for i in range(20)
+        ]
+        self.vector_store.search.return_value = self.candidates
+
+    def test_mmr_is_skipped_without_query_embedding(self):
+        # The search leg got an embedding; the one for MMR failed
+        with patch.object(self.assistant, "_make_embedding", side_effect=[[1.0, 0.0], None]), patch(
+            "rag_assistant_simple_redis.mmr_select"
+        ) as mmr:
+            results = self.assistant._search_kb("open the valve", top_k=5)
+
+        mmr.assert_not_called()
+        self.assertTrue(results)
+        self.assertTrue(all(r["parent_id"] in {f"p{i}" for i in range(8)} for r in results))
+        self.assertTrue(all("vector" not in r for r in results))
+
+    def test_mmr_runs_with_query_embedding(self):
+        with patch.object(self.assistant, "_make_embedding", return_value=[1.0, 0.0]), patch(
+            "rag_assistant_simple_redis.mmr_select", return_value=self.candidates[:8]
+        ) as mmr:
+            self.assistant._search_kb("open the valve", top_k=5)
+        mmr.assert_called_once()
+
+
+class TestSearchKbCacheKey(unittest.TestCase):
+    def _assistant(self, search_cache, sub_queries):
+        return EnhancedSimpleRedisRAGAssistant(
+            "session-1",
+            memory=MagicMock(),
+            embedding_cache=MagicMock(),
+            vector_store=MagicMock(cache_id="azure"),
+            semantic_cache=MagicMock(),
+            search_cache=search_cache,
+            session_state=MagicMock(),
+            multi_query=True,
+            sub_queries=sub_queries,
+            mmr_rerank=False,
+        )
+
+    def test_sub_queries_do_not_share_entries(self):
+        from services.search_cache import SearchResultCache
+
+        store = {}
+        redis = MagicMock()
+        redis.get.side_effect = store.get
+        redis.set.side_effect = lambda key, value, ttl=None: store.__setitem__(key, value) or True
+        versions = MagicMock()
+        versions.get_version.return_value = "1"
+        cache = SearchResultCache(redis=redis, ttl=60, enabled=True, index_versions=versions)
+        chunks = [{"chunk": "Step 1. Open the valve", "title": "Manual", "parent_id": "p1"}]
+
+        fused = self._assistant(cache, sub_queries=5)
+        with patch.object(fused, "_multi_query_search", return_value=chunks) as search:
+            fused._search_kb("open the valve")
+        search.assert_called_once()
+
+        plain = self._assistant(cache, sub_queries=0)
+        with patch.object(plain, "_multi_query_search", return_value=chunks) as search:
+            plain._search_kb("open the valve")
+            plain._search_kb("open the valve")
+        search.assert_called_once()
+        self.assertEqual(len(store), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+"""
+Tests for query expansion and multi-query retrieval.
+"""
+
+import unittest
+from unittest.mock import MagicMock
+
+from services.query_expansion import QueryExpander
+from rag_assistant_simple_redis import EnhancedSimpleRedisRAGAssistant
+
+
+def _dict_redis():
+    store = {}
+    redis = MagicMock()
+    redis.get.side_effect = lambda key: store.get(key)
+    redis.set.side_effect = lambda key, value, expiration=None: store.__setitem__(key, value) or True
+    return redis
+
+
+class TestQueryExpander(unittest.TestCase):
+    def setUp(self):
+        self.openai_svc = MagicMock()
+        self.expander = QueryExpander(self.openai_svc, redis=_dict_redis())
+
+    def test_enhance_strips_quotes_and_arrows(self):
+        self.openai_svc.get_chat_response.return_value = '→ "Agilent gas chromatograph ignition failure"'
+        self.assertEqual(self.expander.enhance("gc wont ignite"), "Agilent gas chromatograph ignition failure")
+
+    def test_rewrites_are_cached(self):
+        self.openai_svc.get_chat_response.return_value = "rewrite"
+        self.expander.enhance("GC won't ignite?")
+        self.expander.enhance("gc won't ignite")
+        self.assertEqual(self.openai_svc.get_chat_response.call_count, 1)
+
+    def test_sub_queries_are_capped(self):
+        self.openai_svc.get_chat_response.return_value = "- detector flame\n- igniter coil\n\n- hydrogen flow"
+        self.assertEqual(self.expander.sub_queries("q", 2), ["detector flame", "igniter coil"])
+        self.assertEqual(self.expander.sub_queries("q", 0), [])
+
+
+class TestMultiQueryRetrieval(unittest.TestCase):
+    def setUp(self):
+        search_cache = MagicMock()
+        search_cache.get.return_value = None
+        self.assistant = EnhancedSimpleRedisRAGAssistant(
+            "session-1",
+            memory=MagicMock(),
+            embedding_cache=MagicMock(),
+            vector_store=MagicMock(),
+            semantic_cache=MagicMock(),
+            search_cache=search_cache,
+            multi_query=True,
+            sub_queries=2,
+        )
+        self.assistant.query_expander = MagicMock()
+        self.assistant.query_expander.enhance.return_value = "enhanced query"
+        self.assistant.query_expander.sub_queries.return_value = ["sub one", "Raw Query"]
+
+        self.a = {"chunk": "A", "parent_id": "p1"}
+        self.b = {"chunk": "B", "parent_id": "p2"}
+        self.c = {"chunk": "C", "parent_id": "p3"}
+        legs = {
+            "raw query": [self.a, self.b],
+            "enhanced query": [self.c, dict(self.a)],
+            "sub one": [dict(self.c)],
+        }
+        self.searched = []
+
+        def fake_search(query, top=8):
+            self.searched.append(query)
+            return legs[query]
+
+        self.assistant._vector_search = fake_search
+
+    def test_fans_out_fuses_and_dedupes(self):
+        fused = self.assistant._multi_query_search("raw query")
+
+        # The sub-query equal to the raw query (after normalization) is not searched twice
+        self.assertCountEqual(self.searched, ["raw query", "enhanced query", "sub one"])
+        self.assertEqual([r["chunk"] for r in fused], ["C", "A", "B"])
+        self.assertTrue(all("relevance" in r for r in fused))
+
+    def test_failed_rewrite_falls_back_to_raw_query(self):
+        self.assistant.query_expander.enhance.side_effect = RuntimeError("rate limited")
+        self.assistant.query_expander.sub_queries.return_value = []
+
+        fused = self.assistant._multi_query_search("raw query")
+        self.assertEqual(self.searched, ["raw query"])
+        self.assertEqual([r["chunk"] for r in fused], ["A", "B"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+"""
+Tests for the Redis value codec.
+"""
+
+import json
+import random
+import unittest
+from array import array
+
+from services import redis_codec
+from services.redis_codec import HEADER_BYTES, RedisCodec
+
+
+class TestRedisCodec(unittest.TestCase):
+    def setUp(self):
+        self.codec = RedisCodec(serializer="json", compression="zlib", threshold=64)
+
+    def test_round_trips_values(self):
+        for value in [{"a": [1, 2.5, None, True]}, [1, "x"], 42, "text ünïcode", b"\x00\x01raw", "", {}]:
+            encoded = self.codec.encode(value)
+            self.assertIn(encoded[0], HEADER_BYTES)
+            self.assertEqual(self.codec.decode(encoded), value)
+
+    def test_str_is_not_reinterpreted_as_json(self):
+        self.assertEqual(self.codec.decode(self.codec.encode("123")), "123")
+
+    def test_compresses_large_values(self):
+        value = {"content": "Replace the inlet liner and septum. " * 100}
+        encoded = self.codec.encode(value)
+
+        self.assertEqual(encoded[0] >> 4, redis_codec.COMPRESSION_ZLIB)
+        self.assertLess(len(encoded), len(json.dumps(value)) // 4)
+        self.assertEqual(self.codec.decode(encoded), value)
+
+    def test_keeps_incompressible_values_uncompressed(self):
+        rng = random.Random(5)
+        payload = array("f", [rng.uniform(-1, 1) for _ in range(512)]).tobytes()
+        encoded = self.codec.encode(payload)
+        self.assertEqual(encoded[0] >> 4, redis_codec.COMPRESSION_NONE)
+        self.assertEqual(self.codec.decode(encoded), payload)
+
+    def test_small_values_are_not_compressed(self):
+        self.assertEqual(self.codec.encode({"a": 1})[0] >> 4, redis_codec.COMPRESSION_NONE)
+
+    def test_reads_previous_format(self):
+        self.assertEqual(self.codec.decode(b'{"key": "value"}'), {"key": "value"})
+        self.assertEqual(self.codec.decode(b"not json"), b"not json")
+        self.assertEqual(self.codec.decode(b"3"), 3)
+        self.assertIsNone(self.codec.decode(None))
+
+    def test_legacy_mode_writes_previous_format(self):
+        legacy = RedisCodec(serializer="legacy")
+        self.assertEqual(legacy.encode({"key": "value"}), json.dumps({"key": "value"}))
+        self.assertEqual(legacy.encode("text"), "text")
+        self.assertEqual(self.codec.decode(legacy.encode({"key": "value"}).encode()), {"key": "value"})
+
+    @unittest.skipIf(redis_codec.msgpack is None, "msgpack not installed")
+    def test_msgpack_round_trip(self):
+        codec = RedisCodec(serializer="msgpack")
+        value = {"ids": [1, 2], 3: "int key"}
+        encoded = codec.encode(value)
+        self.assertEqual(encoded[0] & 0x0F, redis_codec.FORMAT_MSGPACK)
+        self.assertEqual(codec.decode(encoded), value)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+"""
+Tests for the shared Redis connection pool and its typed facades.
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import redis
+
+from services import redis_pool
+
+
+class TestRedisPool(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.multiple(redis_pool, _pool=None, _clients={})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_facades_share_one_pool(self):
+        raw = redis_pool.get_redis_client()
+        text = redis_pool.get_redis_client(decode_responses=True)
+
+        self.assertIs(raw.connection_pool, text.connection_pool)
+        self.assertIs(raw, redis_pool.get_redis_client())
+        self.assertIsInstance(text, redis_pool.DecodingRedis)
+        self.assertIsInstance(text.pipeline(), redis_pool._DecodingPipeline)
+
+    def test_tcp_pool_settings(self):
+        with patch.object(redis_pool, "REDIS_SOCKET_PATH", ""), patch.object(
+            redis_pool, "REDIS_MAX_CONNECTIONS", 12
+        ):
+            pool = redis_pool.get_connection_pool()
+
+        self.assertIsInstance(pool, redis.BlockingConnectionPool)
+        self.assertEqual(pool.max_connections, 12)
+        self.assertTrue(pool.connection_kwargs["socket_keepalive"])
+        self.assertEqual(pool.connection_class, redis.Connection)
+
+    def test_uses_unix_socket_when_present(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "redis.sock")
+            open(path, "w").close()
+            with patch.object(redis_pool, "REDIS_SOCKET_PATH", path):
+                pool = redis_pool.get_connection_pool()
+
+        self.assertEqual(pool.connection_class, redis.UnixDomainSocketConnection)
+        self.assertEqual(redis_pool.describe_transport(), f"unix:{path}")
+
+    def test_missing_socket_falls_back_to_tcp(self):
+        with patch.object(redis_pool, "REDIS_SOCKET_PATH", "/nonexistent/redis.sock"):
+            pool = redis_pool.get_connection_pool()
+        self.assertEqual(pool.connection_class, redis.Connection)
+
+    def test_decode_replies(self):
+        reply = [b"a", (b"b", 1), {b"k": [b"v"]}, None, True]
+        self.assertEqual(redis_pool._decode(reply), ["a", ("b", 1), {"k": ["v"]}, None, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+Tests for RedisService health tracking, reconnect backoff and client counters.
+"""
+
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+import redis
+
+from services import redis_service as redis_module
+from services.redis_service import RedisService
+
+
+class TestRedisServiceHealth(unittest.TestCase):
+    def setUp(self):
+        self.mock_redis = MagicMock()
+        with patch.object(redis_module, "get_redis_client", return_value=self.mock_redis):
+            self.service = RedisService()
+        self.service.heartbeat_interval = 0
+        self.service._connected = True
+        self.service._client = self.mock_redis
+
+    def test_commands_do_not_ping(self):
+        self.mock_redis.get.return_value = b'"v"'
+        self.mock_redis.ping.reset_mock()
+
+        for _ in range(5):
+            self.service.get("k")
+        self.service.set("k", "v")
+        self.service.delete("k")
+
+        self.mock_redis.ping.assert_not_called()
+
+    def test_counts_hits_misses_and_errors(self):
+        self.mock_redis.get.side_effect = [b'"v"', None, None, redis.ResponseError("boom")]
+        for _ in range(4):
+            self.service.get("k")
+
+        stats = self.service.get_client_stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 2)
+        self.assertEqual(stats["errors"], 1)
+        self.assertEqual(stats["commands"], 4)
+        self.assertIn("latency_p95_ms", stats)
+        # A non-connection error does not mark Redis down
+        self.assertTrue(stats["connected"])
+
+    def test_mget_and_hgetall_decode_values(self):
+        self.mock_redis.mget.return_value = [b'{"a": 1}', None, b"raw"]
+        self.assertEqual(self.service.mget(["x", "y", "z"]), [{"a": 1}, None, b"raw"])
+        self.assertEqual(self.service.mget([]), [])
+
+        self.mock_redis.hgetall.return_value = {b"1": b'{"title": "A"}'}
+        self.assertEqual(self.service.hgetall("h"), {"1": {"title": "A"}})
+
+        self.mock_redis.hgetall.side_effect = redis.ResponseError("WRONGTYPE")
+        self.assertIsNone(self.service.hgetall("h"))
+
+    def test_keys_uses_scan_not_keys(self):
+        self.mock_redis.scan.side_effect = [(7, [b"a", b"b"]), (0, [b"b", b"c"])]
+
+        self.assertEqual(self.service.keys("p:*"), ["a", "b", "c"])
+
+        self.mock_redis.keys.assert_not_called()
+        self.assertEqual(self.mock_redis.scan.call_count, 2)
+        self.assertEqual(self.mock_redis.scan.call_args.kwargs["match"], "p:*")
+
+    def test_get_stats_includes_client_counters(self):
+        self.mock_redis.info.return_value = {}
+        self.mock_redis.dbsize.return_value = 3
+        stats = self.service.get_stats()
+        self.assertEqual(stats["total_keys"], 3)
+        self.assertIn("hits", stats["client"])
+
+    def test_reconnect_backs_off_exponentially(self):
+        self.service._connected = False
+        failing = MagicMock()
+        failing.ping.side_effect = redis.ConnectionError("refused")
+        clock = [100.0]
+
+        with patch.object(redis_module, "get_redis_client", return_value=failing) as factory, patch.object(
+            redis_module.time, "monotonic", side_effect=lambda: clock[0]
+        ):
+            self.service._failures = 0
+            self.service._next_attempt = 0.0
+            self.assertFalse(self.service.reconnect())
+            self.assertEqual(factory.call_count, 1)
+
+            # Within the backoff window no connection is attempted
+            self.assertFalse(self.service.reconnect())
+            self.assertEqual(factory.call_count, 1)
+
+            clock[0] += redis_module.REDIS_RECONNECT_BACKOFF_BASE
+            self.assertFalse(self.service.reconnect())
+            self.assertEqual(factory.call_count, 2)
+            self.assertEqual(
+                self.service._next_attempt - clock[0], 2 * redis_module.REDIS_RECONNECT_BACKOFF_BASE
+            )
+
+        with patch.object(redis_module, "get_redis_client", return_value=self.mock_redis):
+            self.service._next_attempt = 0.0
+            self.assertTrue(self.service.reconnect())
+        self.assertEqual(self.service._failures, 0)
+        self.assertEqual(self.service.get_client_stats()["reconnects"], 1)
+
+    def test_heartbeat_detects_lost_connection(self):
+        self.mock_redis.ping.side_effect = redis.ConnectionError("gone")
+        self.service.heartbeat_interval = 0.01
+        self.service._ensure_heartbeat()
+        try:
+            for _ in range(200):
+                if not self.service._connected:
+                    break
+                time.sleep(0.01)
+        finally:
+            self.service.stop_heartbeat()
+        self.assertFalse(self.service._connected)
+
+
+if __name__ == '__main__':
+    unittest.main()
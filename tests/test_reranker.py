@@ -0,0 +1,57 @@
+"""
+Tests for MMR re-ranking.
+"""
+
+import unittest
+
+import numpy as np
+
+from services.reranker import mmr_select
+from services.vector_store import NumpyVectorStore
+
+
+class TestMMRSelect(unittest.TestCase):
+    def setUp(self):
+        self.query = [1.0, 0.0, 0.0]
+        self.results = [
+            {"chunk": "a", "parent_id": "p1", "relevance": 0.0, "vector": np.array([0.95, 0.31, 0.0])},
+            {"chunk": "a copy", "parent_id": "p2", "relevance": 0.0, "vector": np.array([0.95, 0.31, 0.01])},
+            {"chunk": "b", "parent_id": "p3", "relevance": 0.0, "vector": np.array([0.9, 0.0, 0.43])},
+        ]
+
+    def test_near_duplicate_is_demoted(self):
+        picked = mmr_select(self.query, self.results, k=2, lambda_mult=0.5)
+        self.assertEqual([r["chunk"] for r in picked], ["a", "b"])
+
+    def test_pure_relevance_keeps_similarity_order(self):
+        picked = mmr_select(self.query, self.results, k=3, lambda_mult=1.0)
+        self.assertEqual([r["chunk"] for r in picked], ["a", "a copy", "b"])
+
+    def test_results_carry_real_scores_without_vectors(self):
+        picked = mmr_select(self.query, self.results, k=1)
+        self.assertNotIn("vector", picked[0])
+        self.assertAlmostEqual(picked[0]["relevance"], 0.95 / np.linalg.norm([0.95, 0.31, 0.0]), places=5)
+        self.assertIn("vector", self.results[0])
+
+    def test_missing_vectors_fall_back_to_search_scores(self):
+        results = [
+            {"chunk": "low", "relevance": 0.1},
+            {"chunk": "high", "relevance": 0.9},
+        ]
+        picked = mmr_select(self.query, results, k=1)
+        self.assertEqual(picked, [{"chunk": "high", "relevance": 0.9}])
+
+    def test_works_on_vector_store_output(self):
+        vectors = np.eye(4, dtype=np.float32)
+        chunks = [{"chunk": str(i), "title": "t", "parent_id": "p"} for i in range(4)]
+        store = NumpyVectorStore(vectors, chunks)
+
+        candidates = store.search("q", [1.0, 0.5, 0.0, 0.0], top=3, include_vectors=True)
+        picked = mmr_select([1.0, 0.5, 0.0, 0.0], candidates, k=2)
+
+        self.assertEqual([r["chunk"] for r in picked], ["0", "1"])
+        self.assertTrue(all("vector" not in r for r in picked))
+
+
+if __name__ == "__main__":
+    unittest.main()
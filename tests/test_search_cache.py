@@ -0,0 +1,72 @@
+"""
+Tests for the Redis-backed search result cache.
+"""
+
+import unittest
+from unittest.mock import MagicMock
+
+from services.search_cache import SearchResultCache
+
+
+class TestSearchResultCache(unittest.TestCase):
+    def setUp(self):
+        self.store = {}
+        self.expirations = {}
+        self.mock_redis = MagicMock()
+        self.mock_redis.get.side_effect = lambda key: self.store.get(key)
+
+        def fake_set(key, value, expiration=None):
+            self.store[key] = value
+            self.expirations[key] = expiration
+            return True
+
+        self.mock_redis.set.side_effect = fake_set
+        self.versions = MagicMock()
+        self.versions.get_version.return_value = "1"
+        self.cache = SearchResultCache(
+            redis=self.mock_redis, ttl=120, enabled=True, index_versions=self.versions
+        )
+        self.results = [{"chunk": "Step 1. Open the valve", "parent_id": "p1", "relevance": 0.9}]
+
+    def test_normalized_query_hits(self):
+        self.assertIsNone(self.cache.get("How to ignite the GC?", 5, "kb"))
+        self.cache.set("How to ignite the GC?", 5, self.results, "kb")
+
+        self.assertEqual(self.cache.get("how to  ignite the gc", 5, "kb"), self.results)
+        stats = self.cache.get_stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+
+    def test_key_includes_top_k_and_index(self):
+        self.cache.set("q", 5, self.results, "kb")
+        self.assertIsNone(self.cache.get("q", 3, "kb"))
+        self.assertIsNone(self.cache.get("q", 5, "other-index"))
+
+    def test_key_includes_vector_store(self):
+        self.cache.set("q", 5, self.results, "kb", store="hnsw-abc")
+        self.assertIsNone(self.cache.get("q", 5, "kb"))
+        self.assertIsNone(self.cache.get("q", 5, "kb", store="hnsw-def"))
+        self.assertEqual(self.cache.get("q", 5, "kb", store="hnsw-abc"), self.results)
+
+    def test_entries_use_ttl(self):
+        self.cache.set("q", 5, self.results, "kb")
+        self.assertEqual(list(self.expirations.values()), [120])
+
+    def test_version_bump_invalidates(self):
+        self.cache.set("q", 5, self.results, "kb")
+        self.versions.get_version.return_value = "2"
+        self.assertIsNone(self.cache.get("q", 5, "kb"))
+
+    def test_entry_with_stale_version_stamp_is_ignored(self):
+        self.cache.set("q", 5, self.results, "kb")
+        key = next(iter(self.store))
+        self.store[key] = {"version": "0", "results": self.results}
+        self.assertIsNone(self.cache.get("q", 5, "kb"))
+
+    def test_empty_results_not_cached(self):
+        self.assertFalse(self.cache.set("q", 5, [], "kb"))
+        self.assertEqual(self.store, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
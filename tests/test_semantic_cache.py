@@ -0,0 +1,82 @@
+"""
+Tests for the semantic response cache.
+"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+from services.semantic_cache import SemanticResponseCache
+
+
+class TestSemanticResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.versions = MagicMock()
+        self.versions.get_version.return_value = "1"
+        self.cache = SemanticResponseCache(
+            threshold=0.95, max_entries=2, ttl=60, enabled=True,
+            index_name="kb", index_versions=self.versions,
+        )
+        self.citations = [{"index": 1, "display_id": "1", "title": "Manual", "content": "c", "parent_id": "p"}]
+
+    def test_paraphrase_hits_above_threshold(self):
+        self.cache.store("GC won't ignite", [1.0, 0.0, 0.0], "Check the igniter [1].", self.citations, "summary")
+
+        hit = self.cache.lookup([0.99, 0.05, 0.0])
+        self.assertIsNotNone(hit)
+        self.assertEqual(hit["answer"], "Check the igniter [1].")
+        self.assertEqual(hit["summary"], "summary")
+        self.assertGreater(hit["similarity"], 0.95)
+
+    def test_dissimilar_query_misses(self):
+        self.cache.store("q", [1.0, 0.0, 0.0], "a", self.citations)
+        self.assertIsNone(self.cache.lookup([0.0, 1.0, 0.0]))
+        self.assertEqual(self.cache.get_stats()["misses"], 1)
+
+    def test_hit_returns_copies_of_citations(self):
+        self.cache.store("q", [1.0, 0.0], "a", self.citations)
+        hit = self.cache.lookup([1.0, 0.0])
+        hit["citations"][0]["citation_id"] = 7
+        self.assertNotIn("citation_id", self.cache.lookup([1.0, 0.0])["citations"][0])
+
+    def test_index_version_change_invalidates(self):
+        self.cache.store("q", [1.0, 0.0], "a", self.citations)
+        self.versions.get_version.return_value = "2"
+
+        self.assertIsNone(self.cache.lookup([1.0, 0.0]))
+        stats = self.cache.get_stats()
+        self.assertEqual(stats["entries"], 0)
+        self.assertEqual(stats["invalidations"], 1)
+        self.assertEqual(stats["index_version"], "2")
+
+    def test_expired_entries_miss(self):
+        with patch("services.semantic_cache.time.time", return_value=1000.0):
+            self.cache.store("q", [1.0, 0.0], "a", self.citations)
+        with patch("services.semantic_cache.time.time", return_value=1061.0):
+            self.assertIsNone(self.cache.lookup([1.0, 0.0]))
+
+    def test_ring_buffer_overwrites_oldest(self):
+        self.cache.store("a", [1.0, 0.0, 0.0], "A", self.citations)
+        self.cache.store("b", [0.0, 1.0, 0.0], "B", self.citations)
+        self.cache.store("c", [0.0, 0.0, 1.0], "C", self.citations)
+
+        self.assertIsNone(self.cache.lookup([1.0, 0.0, 0.0]))
+        self.assertEqual(self.cache.lookup([0.0, 1.0, 0.0])["answer"], "B")
+        self.assertEqual(self.cache.lookup([0.0, 0.0, 1.0])["answer"], "C")
+        self.assertEqual(self.cache.get_stats()["entries"], 2)
+
+    def test_other_answer_variant_misses(self):
+        self.cache.store("q", [1.0, 0.0], "a", self.citations, variant="gpt-4o|900|0|0|0")
+
+        self.assertIsNone(self.cache.lookup([1.0, 0.0], "o4-mini|900|0|0|0"))
+        self.assertIsNone(self.cache.lookup([1.0, 0.0]))
+        self.assertEqual(self.cache.lookup([1.0, 0.0], "gpt-4o|900|0|0|0")["answer"], "a")
+
+    def test_disabled_cache_is_a_no_op(self):
+        self.cache.enabled = False
+        self.cache.store("q", [1.0, 0.0], "a", self.citations)
+        self.assertIsNone(self.cache.lookup([1.0, 0.0]))
+        self.assertEqual(self.cache.get_stats()["entries"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,177 @@
+"""
+Tests for batch registration in the session citation registry.
+"""
+
+import json
+import unittest
+from unittest.mock import patch
+
+from services.session_citation_registry import SessionCitationRegistry, _CLEAR_SCRIPT, _REGISTER_SCRIPT
+
+
+class TestRegisterSources(unittest.TestCase):
+    def setUp(self):
+        self.registry = SessionCitationRegistry()
+        patcher = patch("services.session_citation_registry.redis_service")
+        self.redis = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.redis.get_current_timestamp.return_value = 1700000000
+
+    def test_registers_batch_in_one_script_call(self):
+        self.redis.run_script.return_value = [4, 5, 4]
+        sources = [
+            {"title": "A", "content": "a"},
+            {"content": "b", "url": "u"},
+            {"title": "A", "content": "a"},
+        ]
+
+        registered = self.registry.register_sources("s1", sources)
+
+        self.redis.run_script.assert_called_once()
+        self.redis.is_connected.assert_not_called()
+        script, = self.redis.run_script.call_args.args
+        kwargs = self.redis.run_script.call_args.kwargs
+        self.assertIs(script, _REGISTER_SCRIPT)
+        self.assertEqual(
+            kwargs["keys"],
+            [
+                "session:{s1}:citations:counter",
+                "session:{s1}:citations:registry",
+                "session:{s1}:citations:lookup",
+                "session:{s1}:citations:sources",
+            ],
+        )
+        args = kwargs["args"]
+        self.assertEqual(args[:2], [43200, 1700000000])
+        self.assertEqual(len(args), 2 + 2 * len(sources))
+        self.assertEqual(json.loads(args[5]), {})
+        self.assertEqual(json.loads(args[3]), {"title": "A"})
+
+        # Content goes to the shared chunk store, outside the session's script
+        chunks, ttl = self.redis.set_many_nx.call_args.args
+        self.assertEqual(ttl, 43200)
+        self.assertEqual(len(chunks), 2)
+        self.assertIn({"title": None, "content": "b", "url": "u"}, chunks.values())
+        self.assertTrue(all(key.startswith("citation_chunk:") for key in chunks))
+
+        self.assertEqual([s["citation_id"] for s in registered], [4, 5, 4])
+        self.assertEqual(registered[0]["hash"], registered[2]["hash"])
+        self.assertEqual(registered[1]["display_id"], "5")
+        self.assertEqual(registered[1]["session_id"], "s1")
+
+    def test_skips_non_dict_sources(self):
+        self.redis.run_script.return_value = [1]
+        registered = self.registry.register_sources("s1", ["junk", {"title": "A"}])
+        self.assertEqual(len(registered), 1)
+
+    def test_falls_back_when_redis_unavailable(self):
+        self.redis.run_script.return_value = None
+        registered = self.registry.register_sources("s1", [{"title": "A"}, {"title": "B"}])
+        self.assertEqual([s["citation_id"] for s in registered], [1, 2])
+        self.assertEqual(registered[0]["session_id"], "fallback")
+
+    def test_empty_batch_makes_no_redis_call(self):
+        self.assertEqual(self.registry.register_sources("s1", []), [])
+        self.redis.run_script.assert_not_called()
+
+
+class TestGetAllSessionCitations(unittest.TestCase):
+    def setUp(self):
+        self.registry = SessionCitationRegistry()
+        patcher = patch("services.session_citation_registry.redis_service")
+        self.redis = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.redis.is_connected.return_value = True
+
+    def test_reads_summary_and_sources_in_three_calls(self):
+        hashes = {
+            "session:{s1}:citations:registry": {
+                "2": {"title": "B", "hash": "hb", "registered_at": 1},
+                "1": {"title": "A", "hash": "ha", "registered_at": 1},
+            },
+            "session:{s1}:citations:sources": {"1": {"citation_id": 1, "title": "A", "hash": "ha"}},
+        }
+        self.redis.hgetall.side_effect = hashes.get
+        self.redis.mget.return_value = [
+            2,
+            {"title": "A", "content": "shared text", "url": "u"},
+            None,
+        ]
+
+        result = self.registry.get_all_session_citations("s1")
+
+        self.assertEqual(self.redis.hgetall.call_count, 2)
+        self.redis.mget.assert_called_once_with([
+            "session:{s1}:citations:counter",
+            "citation_chunk:ha",
+            "citation_chunk:hb",
+        ])
+        self.redis.get.assert_not_called()
+        self.assertEqual(result["total_citations"], 2)
+        self.assertEqual(list(result["sources"]), ["1"])
+        self.assertEqual(result["sources"]["1"]["content"], "shared text")
+        self.assertEqual(result["sources"]["1"]["citation_id"], 1)
+        self.assertEqual(len(result["registry_summary"]), 2)
+
+    def test_missing_registry_reads_empty(self):
+        self.redis.hgetall.return_value = None
+        self.redis.mget.return_value = [None]
+
+        result = self.registry.get_all_session_citations("s1")
+
+        self.assertEqual(result["sources"], {})
+        self.assertEqual(result["total_citations"], 0)
+
+    def test_source_lookup_resolves_shared_chunk(self):
+        self.redis.hget.return_value = {"citation_id": 2, "title": "Source 2", "id": "source_2", "hash": "hb"}
+        self.redis.mget.return_value = [{"content": "b", "url": ""}]
+
+        source = self.registry.get_source_by_citation_id("s1", 2)
+
+        self.redis.hget.assert_called_once_with("session:{s1}:citations:sources", "2")
+        self.redis.mget.assert_called_once_with(["citation_chunk:hb"])
+        self.assertEqual(source["content"], "b")
+        self.assertEqual(source["title"], "Source 2")
+
+    def test_source_lookup_tolerates_evicted_chunk(self):
+        self.redis.hget.return_value = {"citation_id": 2, "title": "T", "hash": "hb"}
+        self.redis.mget.return_value = [None]
+
+        source = self.registry.get_source_by_citation_id("s1", 2)
+
+        self.assertEqual(source["content"], "")
+        self.assertEqual(source["title"], "T")
+
+
+class TestClearSessionCitations(unittest.TestCase):
+    def setUp(self):
+        self.registry = SessionCitationRegistry()
+        patcher = patch("services.session_citation_registry.redis_service")
+        self.redis = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_unlinks_session_keys_without_scanning(self):
+        self.redis.run_script.return_value = 4
+
+        self.assertTrue(self.registry.clear_session_citations("s1"))
+
+        self.redis.run_script.assert_called_once_with(
+            _CLEAR_SCRIPT,
+            keys=[
+                "session:{s1}:citations:counter",
+                "session:{s1}:citations:registry",
+                "session:{s1}:citations:lookup",
+                "session:{s1}:citations:sources",
+            ],
+            args=[],
+        )
+        self.redis.delete_pattern.assert_not_called()
+        self.redis.keys.assert_not_called()
+
+    def test_reports_failure_when_redis_unavailable(self):
+        self.redis.run_script.return_value = None
+        self.assertFalse(self.registry.clear_session_citations("s1"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,5 @@
 import unittest
+from datetime import date, datetime, timedelta, timezone
 from unittest.mock import patch, MagicMock
 
 from services.session_memory import PostgresSessionMemory
@@ -28,9 +29,115 @@ class TestPostgresSessionMemory(unittest.TestCase):
         self.assertEqual(len(history), 2)
         self.mock_cursor.execute.assert_called()
 
+    def test_get_turns_includes_summary(self):
+        self.mock_cursor.fetchall.return_value = [('u2', 'b2', 's2'), ('u1', 'b1', None)]
+        turns = self.memory.get_turns('s')
+        self.assertEqual(turns[0], {'user': 'u1', 'assistant': 'b1', 'summary': None})
+        self.assertEqual(turns[1]['summary'], 's2')
+
     def test_clear(self):
         self.memory.clear('s')
         self.mock_cursor.execute.assert_called_with('DELETE FROM session_memory WHERE session_id = %s', ('s',))
 
+
+class TestPartitionedSessionMemory(unittest.TestCase):
+    def setUp(self):
+        self.mock_conn = MagicMock()
+        self.mock_cursor = MagicMock()
+        self.mock_conn.cursor.return_value.__enter__.return_value = self.mock_cursor
+        patcher = patch('services.session_memory.DatabaseManager.get_connection', return_value=self.mock_conn)
+        self.addCleanup(patcher.stop)
+        patcher.start()
+        self.execute_values = MagicMock()
+        patcher = patch('services.session_memory.execute_values', self.execute_values)
+        self.addCleanup(patcher.stop)
+        patcher.start()
+        self.mock_cursor.fetchone.return_value = (True,)
+        self.mock_cursor.fetchall.return_value = []
+        self.memory = PostgresSessionMemory(max_turns=10, schema='partitioned', ttl_days=30)
+        self.mock_cursor.reset_mock()
+        self.execute_values.reset_mock()
+
+    def test_creates_partitions_around_today(self):
+        today = datetime.now(timezone.utc).date()
+        self.assertIn(today, self.memory._partitions)
+        self.assertIn(today + timedelta(days=2), self.memory._partitions)
+
+    def _fake_execute_values(self, counter):
+        """execute_values stand-in: counters at ``counter``, every submitted row inserted."""
+        def execute_values(cur, sql, rows, fetch=False):
+            if sql.startswith('INSERT INTO session_memory_counters'):
+                return [(row[0], counter) for row in rows]
+            if sql.startswith('INSERT INTO session_memory_daily'):
+                return [(row[1], row[2], row[6]) for row in rows]
+        return execute_values
+
+    def _turns(self, n):
+        now = datetime.now(timezone.utc).timestamp()
+        return [{'turn_id': str(i), 'session_id': 's', 'user': 'u', 'assistant': 'b', 'ts': now} for i in range(n)]
+
+    def test_store_turns_numbers_turns_and_trims_by_counter(self):
+        self.execute_values.side_effect = self._fake_execute_values(9)
+        self.memory.store_turns(self._turns(3))
+        lock, insert, counters, trim = self.execute_values.call_args_list
+        self.assertEqual(lock[0][2][0][:2], ('s', 0))
+        self.assertEqual([row[2] for row in insert[0][2]], [10, 11, 12])
+        self.assertEqual(counters[0][2][0][:2], ('s', 12))
+        self.assertIn('turn_no < t.keep_from', trim[0][1])
+        self.assertEqual(trim[0][2], [('s', 3)])
+        self.mock_conn.commit.assert_called()
+
+    def test_no_trim_below_max_turns(self):
+        self.execute_values.side_effect = self._fake_execute_values(1)
+        self.memory.store_turn('s', 'u', 'b')
+        self.assertEqual(self.execute_values.call_count, 3)
+
+    def test_replayed_batch_keeps_history(self):
+        # First flush stores turns 10..12; a replay after a crash finds them stored
+        self.execute_values.side_effect = self._fake_execute_values(9)
+        self.memory.store_turns(self._turns(3))
+        self.execute_values.reset_mock()
+        self.execute_values.side_effect = self._fake_execute_values(12)
+        self.mock_cursor.fetchall.return_value = [('0',), ('1',), ('2',)]
+
+        self.memory.store_turns(self._turns(3))
+
+        # Only the counter lock ran: no renumbering, counter bump or trim
+        self.assertEqual(self.execute_values.call_count, 1)
+        statements = [c[0][1] for c in self.execute_values.call_args_list]
+        self.assertFalse(any('DELETE' in sql or 'UPDATE session_memory_counters' in sql for sql in statements))
+
+    def test_conflicting_insert_does_not_advance_counter(self):
+        def execute_values(cur, sql, rows, fetch=False):
+            if sql.startswith('INSERT INTO session_memory_counters'):
+                return [('s', 12)]
+            return []
+        self.execute_values.side_effect = execute_values
+        self.memory.store_turns(self._turns(3))
+        self.assertEqual(self.execute_values.call_count, 2)
+
+    def test_history_ordered_by_turn_number(self):
+        self.mock_cursor.fetchall.return_value = [('u2', 'b2'), ('u1', 'b1')]
+        self.assertEqual(self.memory.get_history('s'), [('u1', 'b1'), ('u2', 'b2')])
+        self.assertIn('ORDER BY turn_no DESC', self.mock_cursor.execute.call_args[0][0])
+
+    def test_maintain_drops_expired_partitions_and_counters(self):
+        old = date.today() - timedelta(days=40)
+        self.mock_cursor.fetchall.return_value = [
+            (f"session_memory_daily_{old:%Y%m%d}",),
+            (f"session_memory_daily_{date.today():%Y%m%d}",),
+        ]
+        self.mock_cursor.rowcount = 4
+        result = self.memory.maintain()
+        self.assertEqual(result, {'dropped_partitions': 1, 'dropped_counters': 4})
+        statements = [c[0][0] for c in self.mock_cursor.execute.call_args_list]
+        self.assertIn(f"DROP TABLE IF EXISTS session_memory_daily_{old:%Y%m%d}", statements)
+
+    def test_clear_removes_counter(self):
+        self.memory.clear('s')
+        statements = [c[0][0] for c in self.mock_cursor.execute.call_args_list]
+        self.assertIn('DELETE FROM session_memory_counters WHERE session_id = %s', statements)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,146 @@
+"""
+Tests for the Redis-backed per-session state shared by all workers.
+"""
+
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+from services.session_state import SessionStateStore
+from services.tiered_session_memory import SESSION_MEMORY_MAX_TURNS
+
+
+class TestSessionSettings(unittest.TestCase):
+    def setUp(self):
+        self.redis = MagicMock()
+        self.pipe = self.redis.pipeline.return_value
+        self.store = SessionStateStore(redis_client=self.redis, ttl=60)
+
+    def test_validate_settings_coerces_and_drops_unknown(self):
+        settings = SessionStateStore.validate_settings({
+            "model": "test-deployment",
+            "max_completion_tokens": "600",
+            "multi_query": "false",
+            "mmr_rerank": 1,
+            "sub_queries": "two",
+            "__class__": "boom",
+            "memory": None,
+        })
+        self.assertEqual(
+            settings,
+            {"model": "test-deployment", "max_completion_tokens": 600, "multi_query": False, "mmr_rerank": True},
+        )
+
+    def test_numeric_settings_are_clamped(self):
+        settings = SessionStateStore.validate_settings({
+            "sub_queries": 1000,
+            "max_history": -5,
+            "max_completion_tokens": 10 ** 9,
+        })
+        self.assertEqual(settings, {"sub_queries": 5, "max_history": 0, "max_completion_tokens": 4096})
+        self.assertEqual(SessionStateStore.validate_settings({"max_completion_tokens": 0}), {"max_completion_tokens": 1})
+        self.assertEqual(SessionStateStore.validate_settings({"max_history": float("inf")}), {})
+
+    def test_max_history_is_capped_at_session_memory_turns(self):
+        settings = SessionStateStore.validate_settings({"max_history": SESSION_MEMORY_MAX_TURNS + 10})
+        self.assertEqual(settings, {"max_history": SESSION_MEMORY_MAX_TURNS})
+
+    def test_unconfigured_model_is_rejected(self):
+        self.assertEqual(SessionStateStore.validate_settings({"model": "gpt-4-32k-unlimited"}), {})
+        self.assertEqual(SessionStateStore.validate_settings({"model": ""}), {})
+
+    def test_stored_out_of_range_settings_are_clamped_on_load(self):
+        self.redis.hgetall.return_value = {"sub_queries": "1000", "model": json.dumps("other")}
+        self.assertEqual(self.store.load_settings("s1"), {"sub_queries": 5})
+
+    def test_save_settings_merges_and_refreshes_ttl(self):
+        self.pipe.execute.return_value = [
+            1, True, {"model": json.dumps("test-deployment"), "max_history": json.dumps(3)}
+        ]
+        settings = self.store.save_settings("s1", {"max_history": 3})
+
+        self.pipe.hset.assert_called_once_with("session:s1:settings", mapping={"max_history": "3"})
+        self.pipe.expire.assert_called_once_with("session:s1:settings", 60)
+        self.assertEqual(settings, {"model": "test-deployment", "max_history": 3})
+
+    def test_load_settings(self):
+        self.redis.hgetall.return_value = {"max_completion_tokens": "600", "bad": "{"}
+        self.assertEqual(self.store.load_settings("s1"), {"max_completion_tokens": 600})
+
+    def test_redis_errors_fall_back(self):
+        self.redis.hgetall.side_effect = ConnectionError("down")
+        self.pipe.execute.side_effect = ConnectionError("down")
+        self.assertEqual(self.store.load_settings("s1"), {})
+        self.assertEqual(self.store.save_settings("s1", {"max_history": "4"}), {"max_history": 4})
+
+
+class TestSessionCitationMap(unittest.TestCase):
+    def setUp(self):
+        self.redis = MagicMock()
+        self.pipe = self.redis.pipeline.return_value
+        self.store = SessionStateStore(redis_client=self.redis, ttl=60)
+
+    def test_add_keeps_first_entry_per_source(self):
+        self.store.add_citation_sources("s1", [{"id": "source_1", "title": "A"}, {"title": "no id"}])
+        self.pipe.hsetnx.assert_called_once_with(
+            "session:s1:citations:display", "source_1", json.dumps({"id": "source_1", "title": "A"})
+        )
+        self.pipe.expire.assert_called_once_with("session:s1:citations:display", 60)
+
+    def test_get_citation_map(self):
+        self.redis.hgetall.return_value = {"source_1": json.dumps({"id": "source_1"})}
+        self.assertEqual(self.store.get_citation_map("s1"), {"source_1": {"id": "source_1"}})
+
+
+class TestPendingTurn(unittest.TestCase):
+    def setUp(self):
+        self.redis = MagicMock()
+        self.store = SessionStateStore(redis_client=self.redis, ttl=60)
+
+    def test_mark_sets_expiring_marker(self):
+        self.store.mark_turn_pending("s1", timeout=30)
+        self.redis.set.assert_called_once_with("session:s1:turn_pending", "1", px=30000)
+
+    def test_wait_returns_once_marker_is_cleared(self):
+        self.redis.exists.side_effect = [1, 1, 0]
+        with patch("services.session_state.time.sleep") as sleep:
+            self.assertTrue(self.store.wait_for_turn("s1", timeout=5))
+        self.assertEqual(sleep.call_count, 2)
+
+    def test_wait_times_out(self):
+        self.redis.exists.return_value = 1
+        with patch("services.session_state.SESSION_TURN_POLL_INTERVAL", 0.01):
+            self.assertFalse(self.store.wait_for_turn("s1", timeout=0.05))
+
+    def test_wait_does_not_block_without_redis(self):
+        self.redis.exists.side_effect = ConnectionError("down")
+        self.assertTrue(self.store.wait_for_turn("s1", timeout=5))
+
+
+class TestAssistantSettings(unittest.TestCase):
+    def test_apply_settings(self):
+        from rag_assistant_simple_redis import EnhancedSimpleRedisRAGAssistant
+
+        assistant = EnhancedSimpleRedisRAGAssistant(
+            "s1",
+            memory=MagicMock(),
+            embedding_cache=MagicMock(),
+            vector_store=MagicMock(),
+            semantic_cache=MagicMock(),
+            search_cache=MagicMock(),
+            session_state=MagicMock(),
+        )
+        service = MagicMock(deployment_name="other-deployment")
+        with patch("rag_assistant_simple_redis.get_openai_service", return_value=service) as get_service:
+            assistant.apply_settings({"model": "other-deployment", "max_completion_tokens": 600, "unknown": 1})
+
+        get_service.assert_called_once_with("other-deployment")
+        self.assertIs(assistant.openai_svc, service)
+        self.assertIs(assistant.query_expander.openai_svc, service)
+        self.assertEqual(assistant.deployment_name, "other-deployment")
+        self.assertEqual(assistant.max_completion_tokens, 600)
+        self.assertFalse(hasattr(assistant, "unknown"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+import psycopg2
+
+from services.tiered_session_memory import DEAD_LETTER_KEY, PENDING_KEY, TieredSessionMemory
+
+
+class TestTieredSessionMemory(unittest.TestCase):
+    def setUp(self):
+        self.redis = MagicMock()
+        self.pipe = self.redis.pipeline.return_value
+        self.pipe.execute.return_value = [1, True, True, 1]
+        self.script = MagicMock(return_value=1)
+        self.redis.register_script.return_value = self.script
+        self.cold = MagicMock()
+        self.memory = TieredSessionMemory(
+            max_turns=3, redis_client=self.redis, cold=self.cold, flush_interval=0, batch_size=2
+        )
+
+    def test_store_turn_writes_hot_tier_and_journal_only(self):
+        self.memory.store_turn("s", "u", "b", "sum")
+        self.pipe.rpush.assert_any_call("session_memory:s", json.dumps({"user": "u", "assistant": "b", "summary": "sum"}))
+        self.pipe.ltrim.assert_called_once_with("session_memory:s", -3, -1)
+        journalled = json.loads(self.pipe.rpush.call_args_list[-1][0][1])
+        self.assertEqual(self.pipe.rpush.call_args_list[-1][0][0], PENDING_KEY)
+        self.assertEqual(journalled["session_id"], "s")
+        self.assertTrue(journalled["turn_id"])
+        self.cold.store_turn.assert_not_called()
+
+    def test_store_turn_falls_back_to_postgres_without_redis(self):
+        self.pipe.execute.side_effect = ConnectionError("down")
+        self.memory.store_turn("s", "u", "b")
+        self.cold.store_turn.assert_called_once_with("s", "u", "b", None)
+
+    def test_get_turns_reads_hot_tier(self):
+        self.redis.lrange.return_value = [json.dumps({"user": "u1", "assistant": "b1", "summary": None})]
+        self.assertEqual(self.memory.get_history("s", 5), [("u1", "b1")])
+        self.cold.get_turns.assert_not_called()
+
+    def test_get_turns_miss_loads_and_warms_from_postgres(self):
+        self.redis.lrange.return_value = []
+        turns = [{"user": "u1", "assistant": "b1", "summary": None}, {"user": "u2", "assistant": "b2", "summary": "s2"}]
+        self.cold.get_turns.return_value = turns
+        self.assertEqual(self.memory.get_turns("s", 1), turns[-1:])
+        self.cold.get_turns.assert_called_once_with("s", 3)
+        args = self.script.call_args[1]["args"]
+        self.assertEqual(args[1:], [json.dumps(t) for t in turns])
+
+    def test_flush_writes_batches_and_trims_journal(self):
+        entries = [json.dumps({"turn_id": str(i), "session_id": "s", "ts": 0}) for i in range(3)]
+        self.redis.set.return_value = True
+        self.redis.lrange.side_effect = [entries[:2], entries[2:], []]
+        self.assertEqual(self.memory.flush(), 3)
+        self.assertEqual(self.cold.store_turns.call_count, 2)
+        trims = [c for c in self.script.call_args_list if c[1]["keys"][0] == PENDING_KEY]
+        self.assertEqual([c[1]["args"][0] for c in trims], [2, 1])
+
+    def test_flush_failure_keeps_journal(self):
+        self.redis.set.return_value = True
+        self.redis.lrange.return_value = [json.dumps({"turn_id": "1", "session_id": "s", "ts": 0})]
+        self.cold.store_turns.side_effect = Exception("db down")
+        self.assertEqual(self.memory.flush(), 0)
+        trims = [c for c in self.script.call_args_list if c[1]["keys"][0] == PENDING_KEY]
+        self.assertEqual(trims, [])
+        self.assertEqual(self.memory.get_stats()["session_memory"]["flush_errors"], 1)
+
+    def test_flush_skipped_while_another_worker_holds_lock(self):
+        self.redis.set.return_value = None
+        self.assertEqual(self.memory.flush(), 0)
+        self.redis.lrange.assert_not_called()
+
+    def _trims(self):
+        return [c[1] for c in self.script.call_args_list if c[1]["keys"][0] == PENDING_KEY]
+
+    def test_invalid_entries_are_dead_lettered(self):
+        good = json.dumps({"turn_id": "1", "session_id": "s", "ts": 0, "user": "a\x00b"})
+        missing_ts = json.dumps({"turn_id": "2", "session_id": "s"})
+        self.redis.set.return_value = True
+        self.redis.lrange.side_effect = [[good, missing_ts, "{not json"], []]
+
+        self.assertEqual(self.memory.flush(), 1)
+
+        self.cold.store_turns.assert_called_once()
+        stored = self.cold.store_turns.call_args[0][0]
+        self.assertEqual([t["turn_id"] for t in stored], ["1"])
+        self.assertEqual(stored[0]["user"], "ab")
+        trim = self._trims()[0]
+        self.assertEqual(trim["keys"][2], DEAD_LETTER_KEY)
+        self.assertEqual(trim["args"][0], 3)
+        dead = [json.loads(d)["entry"] for d in trim["args"][4:]]
+        self.assertEqual(dead, [missing_ts, "{not json"])
+        self.assertEqual(self.memory.get_stats()["session_memory"]["dead_lettered"], 2)
+
+    def test_rejected_turn_is_dead_lettered_after_max_attempts(self):
+        good = json.dumps({"turn_id": "1", "session_id": "s", "ts": 0})
+        bad = json.dumps({"turn_id": "2", "session_id": "s", "ts": 0})
+        self.redis.set.return_value = True
+        self.redis.lrange.return_value = [good, bad]
+
+        def store_turns(turns):
+            if any(t["turn_id"] == "2" for t in turns):
+                raise psycopg2.DataError("invalid byte sequence")
+        self.cold.store_turns.side_effect = store_turns
+
+        with patch("services.tiered_session_memory.SESSION_MEMORY_FLUSH_MAX_ATTEMPTS", 3):
+            for _ in range(2):
+                self.assertEqual(self.memory.flush(), 0)
+            self.assertEqual(self._trims(), [])
+            self.redis.lrange.side_effect = [[good, bad], []]
+            self.assertEqual(self.memory.flush(), 1)
+
+        trim = self._trims()[0]
+        self.assertEqual(trim["args"][0], 2)
+        self.assertEqual([json.loads(d)["entry"] for d in trim["args"][4:]], [bad])
+
+    def test_connection_errors_never_dead_letter(self):
+        self.redis.set.return_value = True
+        self.redis.lrange.return_value = [json.dumps({"turn_id": "1", "session_id": "s", "ts": 0})]
+        self.cold.store_turns.side_effect = psycopg2.OperationalError("connection refused")
+        with patch("services.tiered_session_memory.SESSION_MEMORY_FLUSH_MAX_ATTEMPTS", 1):
+            for _ in range(3):
+                self.assertEqual(self.memory.flush(), 0)
+        self.assertEqual(self._trims(), [])
+
+    def test_clear_waits_for_flush_lock_before_deleting(self):
+        entry = json.dumps({"turn_id": "1", "session_id": "s", "ts": 0})
+        self.redis.set.side_effect = [None, None, True]
+        self.redis.lrange.side_effect = [[entry], []]
+        order = []
+        self.cold.store_turns.side_effect = lambda turns: order.append("flush")
+        self.cold.clear.side_effect = lambda sid: order.append("clear")
+        with patch("services.tiered_session_memory.time.sleep"):
+            self.memory.clear("s")
+        self.assertEqual(order, ["flush", "clear"])
+        unlocks = [c for c in self.script.call_args_list if c[1]["keys"] == ["session_memory:flush_lock"]]
+        self.assertEqual(len(unlocks), 1)
+
+    def test_clear_without_lock_still_clears_postgres(self):
+        self.redis.set.return_value = None
+        with patch("services.tiered_session_memory.SESSION_MEMORY_FLUSH_LOCK_TTL", 0):
+            self.memory.clear("s")
+        self.cold.store_turns.assert_not_called()
+        self.cold.clear.assert_called_once_with("s")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+"""
+Tests for the pluggable vector store backends.
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+import numpy as np
+from azure.core.exceptions import HttpResponseError
+
+from services.vector_store import AzureSearchVectorStore, NumpyVectorStore
+
+
+def _chunks(n):
+    return [
+        {"chunk": f"chunk {i}", "title": f"Doc {i}", "parent_id": f"p{i % 3}"}
+        for i in range(n)
+    ]
+
+
+class TestNumpyVectorStore(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.vectors = rng.standard_normal((50, 16)).astype(np.float32)
+        self.store = NumpyVectorStore(self.vectors, _chunks(50))
+
+    def test_returns_result_dicts_in_score_order(self):
+        results = self.store.search("q", self.vectors[12].tolist(), top=5)
+
+        self.assertEqual(len(results), 5)
+        self.assertEqual(results[0]["chunk"], "chunk 12")
+        self.assertEqual(set(results[0]), {"chunk", "title", "parent_id", "relevance"})
+        self.assertAlmostEqual(results[0]["relevance"], 1.0, places=5)
+        scores = [r["relevance"] for r in results]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_matches_exact_ranking(self):
+        query = np.random.default_rng(1).standard_normal(16)
+        normalized = self.vectors / np.linalg.norm(self.vectors, axis=1, keepdims=True)
+        expected = np.argsort(-(normalized @ query))[:8]
+
+        results = self.store.search("q", query.tolist(), top=8)
+        self.assertEqual([r["chunk"] for r in results], [f"chunk {i}" for i in expected])
+
+    def test_top_larger_than_store(self):
+        self.assertEqual(len(self.store.search("q", self.vectors[0].tolist(), top=500)), 50)
+
+    def test_save_and_load_round_trip(self):
+        with tempfile.TemporaryDirectory() as path:
+            self.store.save(path)
+            loaded = NumpyVectorStore.load(path)
+            query = self.vectors[3].tolist()
+            self.assertEqual(loaded.search("q", query), self.store.search("q", query))
+
+    def test_cache_id_follows_index_files(self):
+        with tempfile.TemporaryDirectory() as path:
+            self.store.save(path)
+            first = NumpyVectorStore.load(path).cache_id
+            self.assertEqual(NumpyVectorStore.load(path).cache_id, first)
+            self.assertTrue(first.startswith("numpy-"))
+
+            # Rebuilt index: same path, new files
+            NumpyVectorStore(self.vectors[:10], _chunks(10)).save(path)
+            os.utime(os.path.join(path, NumpyVectorStore.CHUNKS_FILE), ns=(0, 1))
+            self.assertNotEqual(NumpyVectorStore.load(path).cache_id, first)
+
+    def test_rejects_mismatched_inputs(self):
+        with self.assertRaises(ValueError):
+            NumpyVectorStore(self.vectors, _chunks(3))
+
+
+class TestAzureSearchVectorStore(unittest.TestCase):
+    def test_maps_search_documents(self):
+        client = MagicMock()
+        client.search.return_value = iter([{"chunk": "c", "parent_id": "p", "@search.score": 0.03}])
+        store = AzureSearchVectorStore(search_client=client, vector_field="text_vector")
+
+        results = store.search("query", [0.1, 0.2], top=8)
+
+        self.assertEqual(
+            results,
+            [{"chunk": "c", "title": "Untitled", "parent_id": "p", "relevance": 0.03}],
+        )
+        kwargs = client.search.call_args.kwargs
+        self.assertEqual(kwargs["search_text"], "query")
+        self.assertEqual(kwargs["top"], 8)
+        self.assertNotIn("text_vector", kwargs["select"])
+
+    def test_include_vectors_selects_vector_field(self):
+        client = MagicMock()
+        client.search.return_value = iter([{"chunk": "c", "parent_id": "p", "text_vector": [0.5, 0.5]}])
+        store = AzureSearchVectorStore(search_client=client, vector_field="text_vector")
+
+        results = store.search("query", [0.1, 0.2], top=8, include_vectors=True)
+
+        self.assertIn("text_vector", client.search.call_args.kwargs["select"])
+        np.testing.assert_allclose(results[0]["vector"], [0.5, 0.5])
+
+    def test_non_retrievable_vector_field_falls_back(self):
+        client = MagicMock()
+        client.search.side_effect = [
+            HttpResponseError("field not retrievable"),
+            iter([{"chunk": "c", "parent_id": "p"}]),
+        ]
+        store = AzureSearchVectorStore(search_client=client, vector_field="text_vector")
+
+        results = store.search("query", [0.1, 0.2], top=8, include_vectors=True)
+
+        self.assertNotIn("vector", results[0])
+        self.assertFalse(store._vectors_retrievable)
+
+
+if __name__ == '__main__':
+    unittest.main()